@@ -1,8 +1,30 @@
 #!/usr/bin/env python3
 """从 Excel 导出完整学校数据为 JSON，供 compass_application 抓取补全日期。
 Excel 更新后请运行: python3 export_school_data.py
-预览时需用本地服务器（如 python3 -m http.server 8000）以支持 fetch。"""
+预览时需用本地服务器（如 python3 -m http.server 8000）以支持 fetch。
+增量导出（未变化时不写文件，变化时生成补丁）: python3 export_school_data.py --incremental
+同时导出列式文件: python3 export_school_data.py --columnar
+生成 .gz/.br 预压缩副本与 ETag 清单: python3 export_school_data.py --compress
+按大学分片导出（前端按需加载）: python3 export_school_data.py --shards
+导出 n-gram 检索索引: python3 export_school_data.py --search-index
+导出分面位图（compass_filter 多条件筛选）: python3 export_school_data.py --facets
+导出日期区间索引（compass_application 按时间段查询）: python3 export_school_data.py --date-index
+监视 Excel 保存后自动增量导出: python3 scripts/watch_export.py
+已用 scripts/master_store.py 建立 SQLite 主库（school-master.db）时直接从主库导出，不再解析 Excel。
+school-master.json 每条记录带 data/entity_registry.json 中的 schoolId / departmentId（与 admission_score_model.json 一致）。
+
+导出按列整体处理（空值剔除、日期格式化、去首尾空格一次作用于整列），
+不再逐行逐格调用 to_js_value；输出与逐行版本逐字节一致。
+性能基准见 scripts/benchmarks/bench_export.py。"""
+import argparse
+import csv
 import json
+import sys
+import time
+from contextlib import contextmanager
+from json.encoder import encode_basestring
+
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
@@ -11,6 +33,11 @@ OUTPUT_JSON = Path(__file__).parent / "学校总览.json"
 OUTPUT_JSON_ASCII = Path(__file__).parent / "school-master.json"  # 部署用英文路径，避免 Render 等环境中文文件名不可用
 OUTPUT_CSV = Path(__file__).parent / "学校总览.csv"
 
+# 增量导出等辅助模块位于 scripts/
+sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+from entity_registry import load_registry  # noqa: E402
+from master_store import load_master  # noqa: E402
+
 COLUMN_MAP = {
     "大学": "name",
     "学部": "department",
@@ -37,6 +64,17 @@ COLUMN_MAP = {
     "特殊成绩要求": "specialRequirements",
 }
 
+# CSV 供 compass_search 使用的列（顺序即表头顺序）
+CSV_COLUMNS = ["大学", "学部", "学科", "位置", "文理", "方式", "第几期", "併願", "能使用EJU", "需要EJU科目", "英语", "JLPT", "校内考形式", "网上出愿开始时间", "网上出愿截止时间", "邮寄开始时间", "邮寄截止时间", "校内考时间1", "校内考时间2", "发榜时间"]
+
+# entity_registry 的编号，以 JSON 数字输出，插在 department 之后
+ID_KEYS = ("schoolId", "departmentId")
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# infer_dtype 结果属于这些类型时，整列 astype(str) 与逐格 str(v) 结果一致
+_PLAIN_KINDS = {"string", "empty", "integer", "floating", "mixed-integer-float", "decimal", "boolean"}
+
 
 def to_js_value(v):
     if pd.isna(v):
@@ -45,36 +83,228 @@ def to_js_value(v):
     if not s:
         return None
     if hasattr(v, "isoformat") and hasattr(v, "year"):  # datetime
-        return v.strftime("%Y-%m-%d %H:%M:%S") if hasattr(v, "strftime") else str(v)
+        return v.strftime(DATETIME_FORMAT) if hasattr(v, "strftime") else str(v)
     return s
 
 
-def main():
-    df = pd.read_excel(EXCEL_PATH, sheet_name="学校总览")
-    rows = []
-    for _, r in df.iterrows():
-        row = {}
-        for excel_col, js_key in COLUMN_MAP.items():
-            if excel_col in df.columns:
-                val = to_js_value(r[excel_col])
-                if val is not None:
-                    row[js_key] = val
-        if row.get("name"):
-            rows.append(row)
-    data = {"data": rows}
-    json_str = json.dumps(data, ensure_ascii=False, indent=0)
-    OUTPUT_JSON.write_text(json_str, encoding="utf-8")
-    OUTPUT_JSON_ASCII.write_text(json_str, encoding="utf-8")
-    print(f"已导出 {len(rows)} 条到 {OUTPUT_JSON} 与 {OUTPUT_JSON_ASCII}")
-    # 同时导出 CSV 供 compass_search 使用
-    cols = ["大学", "学部", "学科", "位置", "文理", "方式", "第几期", "併願", "能使用EJU", "需要EJU科目", "英语", "JLPT", "校内考形式", "网上出愿开始时间", "网上出愿截止时间", "邮寄开始时间", "邮寄截止时间", "校内考时间1", "校内考时间2", "发榜时间"]
-    import csv
-    with OUTPUT_CSV.open("w", encoding="utf-8-sig", newline="") as f:
+def normalize_column(col):
+    """整列版 to_js_value：返回 object 数组，空值/空白为 None。"""
+    mask = col.notna().to_numpy()
+    present = col[mask]
+    if pd.api.types.is_datetime64_any_dtype(col.dtype):
+        values = present.dt.strftime(DATETIME_FORMAT)
+    elif pd.api.types.infer_dtype(present, skipna=True) in _PLAIN_KINDS:
+        values = present.astype(str).str.strip()
+    else:
+        # 混有 datetime 等对象的列，逐个回退到 to_js_value
+        values = present.map(to_js_value)
+    out = np.full(len(col), None, dtype=object)
+    out[mask] = values.to_numpy(dtype=object)
+    out[out == ""] = None
+    return out
+
+
+def normalize_frame(df):
+    """把 学校总览 表转换为以 js 键为列名的规范化表（object 列，空值为 None），仅保留有大学名的行。
+
+    列顺序与 COLUMN_MAP 一致，因此 "name" 总是第一列。"""
+    columns = {
+        js_key: normalize_column(df[excel_col])
+        for excel_col, js_key in COLUMN_MAP.items()
+        if excel_col in df.columns
+    }
+    if "name" not in columns:
+        return pd.DataFrame(columns=list(columns), dtype=object)
+    keep = columns["name"] != None  # noqa: E711  逐元素比较
+    return pd.DataFrame({k: v[keep] for k, v in columns.items()}, dtype=object)
+
+
+def add_entity_ids(frame, registry=None):
+    """按 name / department 解析登记表编号，插入 schoolId / departmentId 两列（未登记为 None）。"""
+    if "name" not in frame.columns:
+        return frame
+    registry = registry or load_registry()
+    departments = frame["department"].tolist() if "department" in frame.columns else [None] * len(frame)
+    ids = registry.resolve_pairs(frame["name"].tolist(), departments)
+    at = list(frame.columns).index("department") + 1 if "department" in frame.columns else 1
+    frame = frame.copy()
+    for offset, (key, values) in enumerate(zip(ID_KEYS, ids)):
+        frame.insert(at + offset, key, pd.Series(values, index=frame.index, dtype=object))
+    return frame
+
+
+def render_objects(frame):
+    """整列拼出每条记录的 JSON 对象文本（与 indent=0 的 json.dumps 中单条记录一致）。"""
+    if frame.empty:
+        return []
+    fragments = []
+    for i, key in enumerate(frame.columns):
+        present = frame[key].notna().to_numpy()
+        values = frame[key].to_numpy(dtype=object)[present].tolist()
+        # 首列 name 必有值；其余字段自带 ",\n" 前缀，空字段为空串，整行直接拼接即可
+        prefix = ("" if i == 0 else ",\n") + json.dumps(key) + ": "
+        fragment = np.full(len(frame), "", dtype=object)
+        encode = str if key in ID_KEYS else encode_basestring
+        fragment[present] = list(map(prefix.__add__, map(encode, values)))
+        fragments.append(fragment)
+    return ["{\n" + body + "\n}" for body in map("".join, zip(*fragments))]
+
+
+def render_document(objects):
+    """把 render_objects 的结果拼成 {"data": [...]} 文本。"""
+    if not objects:
+        return json.dumps({"data": []}, ensure_ascii=False, indent=0)
+    return '{\n"data": [\n' + ",\n".join(objects) + "\n]\n}"
+
+
+def render_json(frame):
+    """按 json.dumps({"data": rows}, ensure_ascii=False, indent=0) 的格式整列拼出 JSON 文本。"""
+    return render_document(render_objects(frame))
+
+
+def write_csv(frame, path):
+    columns = [
+        frame[COLUMN_MAP.get(c, c)].fillna("").tolist() if COLUMN_MAP.get(c, c) in frame.columns else [""] * len(frame)
+        for c in CSV_COLUMNS
+    ]
+    with path.open("w", encoding="utf-8-sig", newline="") as f:
         w = csv.writer(f)
-        w.writerow(cols)
-        for r in rows:
-            w.writerow([r.get(COLUMN_MAP.get(c, c), "") or "" for c in cols])
-    print(f"已导出 CSV 到 {OUTPUT_CSV}")
+        w.writerow(CSV_COLUMNS)
+        w.writerows(zip(*columns))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="从 学部学校一览表.xlsx 导出 学校总览.json / school-master.json / 学校总览.csv")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量模式：记录每条记录的内容哈希，数据未变化时不写文件，变化时生成增量补丁（school-master-deltas/）")
+    parser.add_argument("--columnar", action="store_true",
+                        help="同时导出字典编码的列式文件 school-master.columnar.json")
+    parser.add_argument("--compress", action="store_true",
+                        help="为导出文件生成 .gz / .br 预压缩副本及 ETag 清单 school-master.manifest.json")
+    parser.add_argument("--shards", action="store_true",
+                        help="按大学分片导出到 school-master-shards/（含地区索引与总目录）")
+    parser.add_argument("--search-index", action="store_true",
+                        help="同时导出 n-gram 倒排索引 school-master.search-index.json")
+    parser.add_argument("--facets", action="store_true",
+                        help="同时导出分面位图与计数 school-master.facets.json")
+    parser.add_argument("--date-index", action="store_true",
+                        help="同时导出出愿窗口与考试日期的区间索引 school-master.dates.json")
+    return parser
+
+
+@contextmanager
+def timed_stage(timings, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def export(df, args, timings=None):
+    """把已读取的 学校总览 表按 args（build_parser 的结果）导出。
+
+    timings 为 dict 时按阶段累计耗时（秒），供 scripts/watch_export.py 报告每轮各阶段耗时。
+    返回是否写入了文件（增量模式下数据未变化时为 False）。"""
+    with timed_stage(timings, "normalize"):
+        frame = add_entity_ids(normalize_frame(df))
+        unresolved = int(frame["schoolId"].isna().sum()) if "schoolId" in frame.columns else 0
+        if unresolved:
+            print(f"⚠️  {unresolved} 条记录的大学未在登记表中，运行: python3 scripts/entity_registry.py build")
+    with timed_stage(timings, "render"):
+        objects = render_objects(frame)
+        json_str = render_document(objects)
+
+    outputs = [OUTPUT_JSON, OUTPUT_JSON_ASCII, OUTPUT_CSV]
+    if args.columnar:
+        import export_columnar
+        outputs.append(export_columnar.OUTPUT_COLUMNAR)
+    if args.compress:
+        import export_sidecars
+        outputs.append(export_sidecars.MANIFEST_PATH)
+    if args.shards:
+        import export_shards
+        outputs += [export_shards.SHARD_DIR / "catalog.json", export_shards.SHARD_DIR / "regions.json"]
+    if args.search_index:
+        import export_search_index
+        outputs.append(export_search_index.OUTPUT_INDEX)
+    if args.facets:
+        import export_facets
+        outputs.append(export_facets.OUTPUT_FACETS)
+    if args.date_index:
+        import export_date_index
+        outputs.append(export_date_index.OUTPUT_DATES)
+
+    if args.incremental:
+        import export_delta
+        with timed_stage(timings, "delta"):
+            delta = export_delta.prepare(objects, export_delta.record_keys(frame), export_delta.content_hash(json_str))
+        if not delta["changed"] and all(p.exists() for p in outputs):
+            print(f"数据未变化（版本 {delta['version']}），跳过写入")
+            return False
+
+    sidecars = {}  # 本轮写入、需要预压缩的文件 → 记录数（索引类文件为 None）
+    with timed_stage(timings, "write"):
+        OUTPUT_JSON.write_text(json_str, encoding="utf-8")
+        OUTPUT_JSON_ASCII.write_text(json_str, encoding="utf-8")
+        print(f"已导出 {len(frame)} 条到 {OUTPUT_JSON} 与 {OUTPUT_JSON_ASCII}")
+        # 同时导出 CSV 供 compass_search 使用
+        write_csv(frame, OUTPUT_CSV)
+        print(f"已导出 CSV 到 {OUTPUT_CSV}")
+        sidecars.update({OUTPUT_JSON: len(frame), OUTPUT_JSON_ASCII: len(frame), OUTPUT_CSV: len(frame)})
+    if args.columnar:
+        with timed_stage(timings, "columnar"):
+            size = export_columnar.write(frame)
+            print(f"已导出列式文件 {export_columnar.OUTPUT_COLUMNAR}（{size} 字节）")
+            sidecars[export_columnar.OUTPUT_COLUMNAR] = len(frame)
+    if args.shards:
+        with timed_stage(timings, "shards"):
+            stats = export_shards.write_shards(frame, objects)
+            print(f"已分片导出 {stats['universities']} 所大学到 {export_shards.SHARD_DIR}"
+                  f"（写入 {stats['written']}，未变化 {stats['unchanged']}，删除 {stats['removed']}）")
+    if args.search_index:
+        with timed_stage(timings, "search-index"):
+            fields = [f for f in export_search_index.INDEX_FIELDS if f in frame.columns]
+            grams, size = export_search_index.write(frame[fields].to_dict("records"))
+            print(f"已导出检索索引 {export_search_index.OUTPUT_INDEX}（{grams} 个 gram，{size} 字节）")
+            sidecars[export_search_index.OUTPUT_INDEX] = None
+    if args.facets:
+        with timed_stage(timings, "facets"):
+            # 按页面读到的 JSON 计算（空字段不出现，页面再补默认值）
+            values, size = export_facets.write(json.loads(json_str)["data"])
+            print(f"已导出分面位图 {export_facets.OUTPUT_FACETS}（{values} 个选项，{size} 字节）")
+            sidecars[export_facets.OUTPUT_FACETS] = None
+    if args.date_index:
+        with timed_stage(timings, "date-index"):
+            columns = {f: frame[f].tolist() for f in export_date_index.EVENT_FIELDS if f in frame.columns}
+            dates, size = export_date_index.write(columns, len(frame))
+            print(f"已导出日期索引 {export_date_index.OUTPUT_DATES}（{dates} 个日期，{size} 字节）")
+            sidecars[export_date_index.OUTPUT_DATES] = None
+    # 预压缩放在最后：只处理本轮已写入的文件，不会压缩上一轮留下的旧索引
+    if args.compress:
+        with timed_stage(timings, "compress"):
+            manifest = export_sidecars.write_sidecars(sidecars)
+            for name, entry in manifest["files"].items():
+                sizes = "，".join(f"{enc} {e['bytes']}" for enc, e in entry["encodings"].items())
+                print(f"已生成预压缩副本 {name}（原始 {entry['bytes']}，{sizes} 字节）")
+            if not export_sidecars.BROTLI_AVAILABLE:
+                print("⚠️  未安装 brotli，跳过 .br（pip install brotli）")
+    # 清单最后写：前面任何一步失败时清单仍是旧哈希，下次增量导出会重新写出全部文件
+    if args.incremental and delta["changed"]:
+        with timed_stage(timings, "delta"):
+            export_delta.commit(delta)
+        if delta["delta"]:
+            print(f"版本 {delta['version']}：新增 {delta['added']}、修改 {delta['modified']}、删除 {delta['removed']} 条，"
+                  f"补丁 {export_delta.DELTA_DIR / delta['delta']}")
+        else:
+            print(f"版本 {delta['version']}：已建立增量清单 {export_delta.DELTA_DIR}")
+    return True
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    export(load_master(EXCEL_PATH), args)
 
 
 if __name__ == "__main__":
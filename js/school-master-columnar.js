@@ -0,0 +1,57 @@
+/**
+ * 学校总览列式格式（school-master.columnar.json）解码
+ * 由 python3 export_school_data.py --columnar 生成，格式说明见 scripts/export_columnar.py
+ * 用法：SchoolMasterColumnar.decode(payload) → { data: [...] }，与 school-master.json 一致
+ */
+(function(global) {
+    var FORMAT = 'columnar-v1';
+
+    function pad(n) {
+        return n < 10 ? '0' + n : String(n);
+    }
+
+    /** 秒级时间戳 → "YYYY-MM-DD HH:MM:SS"（按 UTC，与导出端一致） */
+    function formatEpoch(seconds) {
+        var d = new Date(seconds * 1000);
+        return d.getUTCFullYear() + '-' + pad(d.getUTCMonth() + 1) + '-' + pad(d.getUTCDate()) +
+            ' ' + pad(d.getUTCHours()) + ':' + pad(d.getUTCMinutes()) + ':' + pad(d.getUTCSeconds());
+    }
+
+    function decodeColumn(column) {
+        var i, out;
+        if (column.encoding === 'dict') {
+            var dict = column.dict, codes = column.codes;
+            out = new Array(codes.length);
+            for (i = 0; i < codes.length; i++) out[i] = codes[i] < 0 ? null : dict[codes[i]];
+            return out;
+        }
+        if (column.encoding === 'epoch') {
+            var values = column.values;
+            out = new Array(values.length);
+            for (i = 0; i < values.length; i++) out[i] = values[i] == null ? null : formatEpoch(values[i]);
+            return out;
+        }
+        if (column.encoding === 'plain') return column.values;
+        throw new Error('未知的列编码: ' + column.encoding);
+    }
+
+    function decode(payload) {
+        if (!payload || payload.format !== FORMAT) {
+            throw new Error('不支持的格式: ' + (payload && payload.format));
+        }
+        var fields = payload.fields;
+        var columns = fields.map(function(f) { return decodeColumn(payload.columns[f]); });
+        var rows = new Array(payload.count);
+        for (var r = 0; r < payload.count; r++) {
+            var row = {};
+            for (var c = 0; c < fields.length; c++) {
+                var v = columns[c][r];
+                if (v != null) row[fields[c]] = v;
+            }
+            rows[r] = row;
+        }
+        return { data: rows };
+    }
+
+    global.SchoolMasterColumnar = { decode: decode, formatEpoch: formatEpoch };
+})(typeof window !== 'undefined' ? window : this);
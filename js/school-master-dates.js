@@ -0,0 +1,76 @@
+/**
+ * 学校总览日期索引（school-master.dates.json）按时间段查询
+ * 由 python3 export_school_data.py --date-index 生成，格式说明见 scripts/export_date_index.py
+ * 用法：var dates = SchoolMasterDates.create(datesJson);
+ *       dates.events('examDate', '2026-02-25') → 当天校内考的记录下标数组
+ *       dates.windows('online', '2025-12-01', '2025-12-07') → 该周内可网上出愿的记录下标数组
+ * 日期按 "YYYY-MM-DD[ HH:MM:SS]"（无时区，按 UTC）解析；只给开始日期时查当天，结束日期只写日期时包含当天全天。
+ */
+(function(global) {
+    var FORMAT = 'dates-v1';
+    var DAY = 86400;
+
+    function toEpoch(value) {
+        if (value instanceof Date) return Math.floor(value.getTime() / 1000);
+        var m = /^(\d{4})-(\d{2})-(\d{2})(?: (\d{2}):(\d{2}):(\d{2}))?$/.exec(String(value).trim());
+        if (!m) throw new Error('无法解析日期: ' + value);
+        return Date.UTC(+m[1], +m[2] - 1, +m[3], +(m[4] || 0), +(m[5] || 0), +(m[6] || 0)) / 1000;
+    }
+
+    function bounds(start, end) {
+        var lo = toEpoch(start);
+        if (end === undefined || end === null) {
+            // 只给 start：取它所在的那一天（带时刻也从当天 0:00 算起），同 export_date_index.parse_bounds
+            var day = lo - (((lo % DAY) + DAY) % DAY);
+            return [day, day + DAY - 1];
+        }
+        var hi = toEpoch(end);
+        if (typeof end === 'string' && end.trim().length === 10) hi += DAY - 1;
+        return [lo, hi];
+    }
+
+    /** 升序数组中第一个 > x（right）或 ≥ x（left）的位置 */
+    function bisect(arr, x, right) {
+        var lo = 0, hi = arr.length;
+        while (lo < hi) {
+            var mid = (lo + hi) >>> 1;
+            if (right ? arr[mid] <= x : arr[mid] < x) lo = mid + 1;
+            else hi = mid;
+        }
+        return lo;
+    }
+
+    function ascending(a, b) { return a - b; }
+
+    function create(payload) {
+        if (!payload || payload.format !== FORMAT) {
+            throw new Error('不支持的日期索引格式: ' + (payload && payload.format));
+        }
+
+        function events(field, start, end) {
+            var b = bounds(start, end), column = payload.events[field];
+            var i = bisect(column.t, b[0], false), j = bisect(column.t, b[1], true);
+            return column.ids.slice(i, j).sort(ascending);
+        }
+
+        function windows(name, start, end) {
+            var b = bounds(start, end), w = payload.windows[name], found = [];
+            var stack = [[0, w.starts.length]];
+            while (stack.length) {
+                var range = stack.pop(), lo = range[0], hi = range[1];
+                if (lo >= hi) continue;
+                var mid = (lo + hi) >>> 1;
+                if (w.maxEnd[mid] < b[0]) continue;
+                stack.push([lo, mid]);
+                if (w.starts[mid] > b[1]) continue;
+                if (w.ends[mid] >= b[0]) found.push(w.ids[mid]);
+                stack.push([mid + 1, hi]);
+            }
+            return found.sort(ascending);
+        }
+
+        return { count: payload.count, events: events, windows: windows, invalid: payload.invalid };
+    }
+
+    global.SchoolMasterDates = { create: create };
+})(typeof window !== 'undefined' ? window : this);
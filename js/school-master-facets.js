@@ -0,0 +1,115 @@
+/**
+ * 学校总览分面位图（school-master.facets.json）筛选与实时计数
+ * 由 python3 export_school_data.py --facets 生成，格式说明见 scripts/export_facets.py
+ * 用法：var facets = SchoolMasterFacets.create(facetsJson);
+ *       facets.query({ bunri: ['文'], region: ['東京都', '大阪府'] }) → 记录下标数组
+ *       facets.counts(selection) → { bunri: { 文: 1509, ... }, ... }（把该分面换成这一个选项后的命中数）
+ * 位图按 compass_filter 的筛选谓词逐选项计算；勾选后提前 return true 的行（能使用EJU / 第几期 为空）
+ * 记在各分面的 pass 位图中，按 payload.order（即谓词的检查顺序）处理
+ */
+(function(global) {
+    var FORMAT = 'facets-v2';
+
+    function popcount(x) {
+        x = x - ((x >>> 1) & 0x55555555);
+        x = (x & 0x33333333) + ((x >>> 2) & 0x33333333);
+        return (((x + (x >>> 4)) & 0x0F0F0F0F) * 0x01010101) >>> 24;
+    }
+
+    function decodeBitmap(encoded, words) {
+        var bits = new Uint32Array(words), data = encoded.data, i, id;
+        function set(n) { bits[n >>> 5] |= (1 << (n & 31)); }
+        if (encoded.encoding === 'runs') {
+            var pos = 0;
+            for (i = 0; i < data.length; i += 2) {
+                pos += data[i];
+                for (var k = 0; k < data[i + 1]; k++) set(pos + k);
+                pos += data[i + 1];
+            }
+        } else if (encoded.encoding === 'ids') {
+            id = 0;
+            for (i = 0; i < data.length; i++) {
+                id = i === 0 ? data[0] : id + data[i];
+                set(id);
+            }
+        } else if (encoded.encoding === 'bits') {
+            var raw = atob(data);
+            for (i = 0; i < raw.length; i++) bits[i >>> 2] |= raw.charCodeAt(i) << ((i & 3) * 8);
+        } else {
+            throw new Error('未知的位图编码: ' + encoded.encoding);
+        }
+        return bits;
+    }
+
+    function create(payload) {
+        if (!payload || payload.format !== FORMAT) {
+            throw new Error('不支持的分面格式: ' + (payload && payload.format));
+        }
+        var count = payload.count, words = Math.ceil(count / 32);
+        var order = payload.order, bitmaps = {}, passes = {};
+        Object.keys(payload.facets).forEach(function(field) {
+            var facet = payload.facets[field], values = facet.values;
+            bitmaps[field] = {};
+            Object.keys(values).forEach(function(v) { bitmaps[field][v] = decodeBitmap(values[v], words); });
+            passes[field] = facet.pass ? decodeBitmap(facet.pass, words) : new Uint32Array(words);
+        });
+
+        function all() {
+            var bits = new Uint32Array(words).fill(0xFFFFFFFF);
+            if (count % 32) bits[words - 1] = (1 << (count % 32)) - 1;
+            return bits;
+        }
+
+        /** 满足 selection 的位集：按谓词顺序，提前通过的行直接计入结果，其余行须通过本分面才继续 */
+        function mask(selection) {
+            var passed = new Uint32Array(words), alive = all();
+            order.forEach(function(field) {
+                var values = selection[field];
+                if (!values || !values.length) return;
+                var union = new Uint32Array(words), pass = passes[field], i;
+                values.forEach(function(v) {
+                    var b = bitmaps[field][v];
+                    if (b) for (i = 0; i < words; i++) union[i] |= b[i];
+                });
+                for (i = 0; i < words; i++) {
+                    passed[i] |= alive[i] & pass[i];
+                    alive[i] &= union[i];
+                }
+            });
+            for (var i = 0; i < words; i++) alive[i] |= passed[i];
+            return alive;
+        }
+
+        function query(selection) {
+            var bits = mask(selection), out = [];
+            for (var w = 0; w < words; w++) {
+                var x = bits[w];
+                while (x) {
+                    var low = x & -x;
+                    out.push(w * 32 + (31 - Math.clz32(low)));
+                    x ^= low;
+                }
+            }
+            return out;
+        }
+
+        function counts(selection) {
+            var out = {};
+            Object.keys(bitmaps).forEach(function(field) {
+                out[field] = {};
+                Object.keys(bitmaps[field]).forEach(function(v) {
+                    var one = Object.assign({}, selection), bits, n = 0;
+                    one[field] = [v];
+                    bits = mask(one);
+                    for (var i = 0; i < words; i++) n += popcount(bits[i]);
+                    out[field][v] = n;
+                });
+            });
+            return out;
+        }
+
+        return { count: count, query: query, counts: counts };
+    }
+
+    global.SchoolMasterFacets = { create: create };
+})(typeof window !== 'undefined' ? window : this);
@@ -0,0 +1,79 @@
+/**
+ * 学校总览 n-gram 倒排索引（school-master.search-index.json）查询
+ * 由 python3 export_school_data.py --search-index 生成，格式说明见 scripts/export_search_index.py
+ * 用法：var idx = SchoolMasterSearch.create(indexJson);
+ *       idx.candidates('東京大学') → 记录下标数组（升序）；查询词过短时返回 null，由调用方退回全表扫描
+ *       idx.normalize('广岛') → '広島'（与建索引时相同的规范化，可用于精确校验候选记录）
+ */
+(function(global) {
+    var FORMAT = 'ngram-v2';
+
+    /** NFKC、按 variants 表把简体 / 繁体逐字换成日本新字体、转小写（同 export_search_index.normalize_text） */
+    function normalizeText(text, variants) {
+        var s = String(text).normalize('NFKC');
+        if (variants) {
+            // 按码位逐字替换（与 Python 的 str.translate 一致，𠮷 等 BMP 以外的字不会被拆成代理对）
+            s = Array.from(s, function(ch) {
+                return variants.hasOwnProperty(ch) ? variants[ch] : ch;
+            }).join('');
+        }
+        return s.toLowerCase();
+    }
+
+    function deltaDecode(deltas) {
+        var out = new Array(deltas.length), total = 0;
+        for (var i = 0; i < deltas.length; i++) {
+            total = i === 0 ? deltas[0] : total + deltas[i];
+            out[i] = total;
+        }
+        return out;
+    }
+
+    /** 两个升序数组求交集 */
+    function intersect(a, b) {
+        var out = [], i = 0, j = 0;
+        while (i < a.length && j < b.length) {
+            if (a[i] === b[j]) { out.push(a[i]); i++; j++; }
+            else if (a[i] < b[j]) i++;
+            else j++;
+        }
+        return out;
+    }
+
+    function create(index) {
+        if (!index || index.format !== FORMAT) {
+            throw new Error('不支持的索引格式: ' + (index && index.format));
+        }
+        var postings = index.postings, variants = index.variants || {};
+        var minGram = Math.min.apply(null, index.gramSizes);
+        var maxGram = Math.max.apply(null, index.gramSizes);
+
+        function candidates(query) {
+            // 按码位切 gram，与 Python 的 grams() 一致
+            var q = Array.from(normalizeText(String(query).trim(), variants));
+            if (q.length < minGram) return null;
+            var size = Math.min(q.length, maxGram), seen = {}, lists = [];
+            for (var i = 0; i + size <= q.length; i++) {
+                var g = q.slice(i, i + size).join('');
+                if (seen[g]) continue;
+                seen[g] = true;
+                lists.push(postings[g] || []);
+            }
+            // 从最短的倒排表开始求交集
+            lists.sort(function(a, b) { return a.length - b.length; });
+            var result = deltaDecode(lists[0]);
+            for (var k = 1; k < lists.length && result.length; k++) {
+                result = intersect(result, deltaDecode(lists[k]));
+            }
+            return result;
+        }
+
+        function normalize(text) {
+            return normalizeText(text, variants);
+        }
+
+        return { count: index.count, candidates: candidates, normalize: normalize };
+    }
+
+    global.SchoolMasterSearch = { create: create, normalizeText: normalizeText };
+})(typeof window !== 'undefined' ? window : this);
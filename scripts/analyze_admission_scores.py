@@ -8,6 +8,7 @@
 - 年份权重：2024 > 2023 > 2022（留考难度与报考人数在变）。
 - 文理分开建模：文科重日语·文综，理科重数学·理综。
 - 输出：各科目 min / p25 / p50 / p75 及样本数 n。前端成绩匹配与各大学分数要求页使用 p50（中位数）作为参考分，无 p50 时用 min。
+- 大学、学部名经 entity_registry（data/entity_registry.json）解析，与主表、school-master.json 使用同一套 schoolId / departmentId。
 """
 
 import json
@@ -22,6 +23,8 @@ except ImportError:
     print("请安装: pip install openpyxl")
     raise
 
+from entity_registry import load_registry
+
 # 项目根目录
 ROOT = Path(__file__).resolve().parent.parent
 EXCEL_PATH = ROOT / "合格实绩.xlsx"
@@ -187,133 +190,19 @@ def stats_for_values(values_weights):
 # 科目键与 Excel 列名对应
 SUBJECT_KEYS = ["日语", "数学1", "数学2", "综合", "物理", "化学", "生物", "托福"]
 
-# 大学名规范化映射：将各种变体统一为标准形式
-# 格式：变体名 -> 标准名
-UNIVERSITY_NAME_NORMALIZATION = {
-    # 繁简统一（统一为简体或日文常用形式）
-    "東京大学": "東京大学",
-    "东京大学": "東京大学",
-    "国際基督教大学": "国際基督教大学",
-    "国际基督教大学": "国際基督教大学",
-    "国際基督教大学(ICU)": "国際基督教大学",
-    "関西学院大学": "関西学院大学",
-    "关西学院大学": "関西学院大学",
-    "順天堂大学": "順天堂大学",
-    "顺天堂大学": "順天堂大学",
-    "上智大學": "上智大学",
-    "上智大学": "上智大学",
-    "二松学舎大学": "二松学舎大学",
-    "二松学舍大学": "二松学舎大学",
-    "大東文化大学": "大東文化大学",
-    "大东文化大学": "大東文化大学",
-    "國學院大學": "国学院大学",
-    "国学院大学": "国学院大学",
-    "東京外国語大学": "東京外国語大学",
-    "东京外国语大学": "東京外国語大学",
-    "東京外國語大學": "東京外国語大学",
-    "関西大学": "関西大学",
-    "关西大学": "関西大学",
-    "亜細亜大学": "亜細亜大学",
-    "亚细亚大学": "亜細亜大学",
-    "京都産業大学": "京都産業大学",
-    "京都产业大学": "京都産業大学",
-    "千葉大学": "千葉大学",
-    "千叶大学": "千葉大学",
-    "岡山大学": "岡山大学",
-    "冈山大学": "岡山大学",
-    "岡山商科大学": "岡山商科大学",
-    "冈山商科大学": "岡山商科大学",
-    "北海道大学": "北海道大学",
-    "名古屋大学": "名古屋大学",
-    "名古屋市立大学": "名古屋市立大学",
-    "名古屋経済大学": "名古屋経済大学",
-    "名古屋经济大学": "名古屋経済大学",
-    "東京福祉大学": "東京福祉大学",
-    "东京福祉大学": "東京福祉大学",
-    "東海大学": "東海大学",
-    "东海大学": "東海大学",
-    "東洋大学": "東洋大学",
-    "东洋大学": "東洋大学",
-    "聖心女子大学": "聖心女子大学",
-    "圣心女子大学": "聖心女子大学",
-    "城西国際大学": "城西国際大学",
-    "城西国际大学": "城西国際大学",
-    "大阪公立大学": "大阪公立大学",
-    "大阪産業大学": "大阪産業大学",
-    "大阪产业大学": "大阪産業大学",
-    "京都先端科学大学": "京都先端科学大学",
-    "京都橘大学": "京都橘大学",
-    "十文字学園女子大学": "十文字学園女子大学",
-    "十文字学园女子大学": "十文字学園女子大学",
-    "千葉科学大学": "千葉科学大学",
-    "千叶科学大学": "千葉科学大学",
-    "国士舘大学": "国士舘大学",
-    "国士馆大学": "国士舘大学",
-    "埼玉大学": "埼玉大学",
-    "琦玉大学": "埼玉大学",
-    "一橋大学": "一橋大学",
-    "一桥大学": "一橋大学",
-    "九州大学": "九州大学",
-    "中央大学": "中央大学",
-    "中京大学": "中京大学",
-    "同志社大学": "同志社大学",
-    "南山大学": "南山大学",
-    "共立女子大学": "共立女子大学",
-    "多摩大学": "多摩大学",
-    "嘉悦大学": "嘉悦大学",
-    "フェリス女学院大学": "フェリス女学院大学",
-    "デジタルハリウッド大学": "デジタルハリウッド大学",
-    "北海道教育大学": "北海道教育大学",
-    "早稲田大学": "早稲田大学",
-    "早稻田大学": "早稲田大学",
-    "立命館大学": "立命館大学",
-    "立命馆大学": "立命館大学",
-    "武蔵野大学": "武蔵野大学",
-    "武藏野大学": "武蔵野大学",
-    "武蔵野美術大学": "武蔵野美術大学",
-    "武藏野美术大学": "武蔵野美術大学",
-    "愛知大学": "愛知大学",
-    "爱知大学": "愛知大学",
-    "福岡女子大学": "福岡女子大学",
-    "福冈女子大学": "福岡女子大学",
-}
-
-
 def normalize_university_name(name):
     """
-    规范化大学名称：统一繁简、日汉异体、去除括号变体等。
-    
+    规范化大学名称：经 entity_registry 把繁简、日汉异体、括号备注等写法统一为登记表中的规范名。
+
     Args:
         name: 原始大学名
-        
+
     Returns:
-        规范化后的大学名
+        规范化后的大学名（未登记时为去掉括号备注后的原名）
     """
-    if not name:
-        return ""
-    
-    # 去除首尾空格
-    name = name.strip()
-    if not name:
+    if not name or not name.strip():
         return ""
-    
-    # 去除常见的括号变体（如 "国際基督教大学(ICU)" -> "国際基督教大学"）
-    # 保留括号前的内容
-    name = re.sub(r'\([^)]*\)', '', name).strip()
-    
-    # 去除常见的后缀变体（如 "大学院" -> "大学"）
-    name = re.sub(r'大学院$', '大学', name)
-    
-    # 查找映射表
-    normalized = UNIVERSITY_NAME_NORMALIZATION.get(name)
-    if normalized:
-        return normalized
-    
-    # 如果没有直接匹配，尝试字符级别的繁简转换（作为后备）
-    # 这里可以添加更复杂的繁简转换逻辑，但先使用映射表更可靠
-    
-    # 返回原名称（如果映射表中没有）
-    return name
+    return load_registry().canonical_university(name.strip())
 
 
 def normalize_department_name(name):
@@ -346,24 +235,35 @@ def normalize_department_name(name):
 def build_model(all_records):
     """
     按 (大学, 学部, 文理) 分组，对每组各科目做加权统计。
-    返回结构：{ "bunka": { "学校名": { "学部名": { "subjects": {...}, "n": int } } }, "rika": {...} }
+    大学、学部经 entity_registry 解析：已登记的归并到主表的规范名，条目带与 school-master.json 相同的 schoolId / departmentId。
+    返回结构：{ "bunka": { "学校名": { "学部名": { "schoolId", "departmentId", "subjects": {...}, "n": int } } }, "rika": {...},
+               "schools": { "schoolId": "学校名" } }
     """
+    registry = load_registry()
     # group[(大学, 学部, 文理)] = list of record
     groups = defaultdict(list)
-    for r in all_records:
+    ids = {}
+    # 整列解析编号：同一写法只规范化、查找一次
+    school_ids, dept_ids = registry.resolve_pairs([r.get("大学", "").strip() for r in all_records],
+                                                  [r.get("学部", "").strip() for r in all_records])
+    for r, school_id, dept_id in zip(all_records, school_ids, dept_ids):
         # 规范化大学名和学部名
         raw_school = r.get("大学", "").strip()
         raw_dept = r.get("学部", "").strip()
-        normalized_school = normalize_university_name(raw_school)
-        normalized_dept = normalize_department_name(raw_dept)
-        
+        normalized_school = registry.university_name(school_id) if school_id is not None \
+            else normalize_university_name(raw_school)
+        normalized_dept = registry.department_name(dept_id) if dept_id is not None \
+            else normalize_department_name(raw_dept)
+
         key = (normalized_school, normalized_dept, r.get("bunri"))
         if not key[0]:
             continue
         groups[key].append(r)
+        ids[key[:2]] = (school_id, dept_id)
 
     bunka = {}
     rika = {}
+    schools = {}
 
     for (school, dept, bunri), records in groups.items():
         if not school:
@@ -388,10 +288,15 @@ def build_model(all_records):
         if not subjects:
             continue
 
-        entry = {
-            "subjects": subjects,
-            "n": len(records),
-        }
+        entry = {}
+        school_id, dept_id = ids[(school, dept)]
+        if school_id is not None:
+            entry["schoolId"] = school_id
+            schools[str(school_id)] = school
+        if dept_id is not None:
+            entry["departmentId"] = dept_id
+        entry["subjects"] = subjects
+        entry["n"] = len(records)
 
         if bunri == "文":
             if school not in bunka:
@@ -402,22 +307,13 @@ def build_model(all_records):
                 rika[school] = {}
             rika[school][dept or "(无学部名)"] = entry
 
-    return {"bunka": bunka, "rika": rika}
+    return {"bunka": bunka, "rika": rika, "schools": dict(sorted(schools.items(), key=lambda item: int(item[0])))}
 
 
-def main():
-    if not EXCEL_PATH.exists():
-        print(f"未找到文件: {EXCEL_PATH}")
-        print("将生成空模型结构，前端会回退到 recommendJP / recommendEN。")
-        model = {"bunka": {}, "rika": {}, "version": "1.0", "generatedAt": "no-data"}
-        OUT_DIR = OUTPUT_JSON.parent
-        OUT_DIR.mkdir(parents=True, exist_ok=True)
-        with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-            json.dump(model, f, ensure_ascii=False, indent=2)
-        return
-
+def load_records(path=EXCEL_PATH):
+    """读取 合格实绩.xlsx 全部工作表的合格样本。"""
     # 不用 read_only，否则部分 Excel 的 max_row 会错误变成 1
-    wb = openpyxl.load_workbook(EXCEL_PATH, data_only=True)
+    wb = openpyxl.load_workbook(path, data_only=True)
     all_records = []
     for sheet_name in wb.sheetnames:
         year, default_bunri = SHEET_CONFIG.get(sheet_name, (None, None))
@@ -429,7 +325,21 @@ def main():
         all_records.extend(recs)
         print(f"  {sheet_name}: 合格样本 {len(recs)} 条")
     wb.close()
+    return all_records
+
+
+def main():
+    if not EXCEL_PATH.exists():
+        print(f"未找到文件: {EXCEL_PATH}")
+        print("将生成空模型结构，前端会回退到 recommendJP / recommendEN。")
+        model = {"bunka": {}, "rika": {}, "schools": {}, "version": "1.0", "generatedAt": "no-data"}
+        OUT_DIR = OUTPUT_JSON.parent
+        OUT_DIR.mkdir(parents=True, exist_ok=True)
+        with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
+            json.dump(model, f, ensure_ascii=False, indent=2)
+        return
 
+    all_records = load_records()
     model = build_model(all_records)
     model["version"] = "1.0"
     model["generatedAt"] = __import__("datetime").datetime.now().isoformat()
@@ -441,6 +351,7 @@ def main():
 
     print(f"已写入: {OUTPUT_JSON}")
     print(f"  文科 学校数: {len(model['bunka'])}, 理科 学校数: {len(model['rika'])}")
+    print(f"  已对应登记表编号的学校: {len(model['schools'])}（其余运行 scripts/entity_registry.py check 查看）")
 
 
 if __name__ == "__main__":
@@ -9,6 +9,8 @@ from pathlib import Path
 from collections import Counter
 import json
 
+from master_store import MASTER_DB, exported_rows, load_master
+
 # 文件路径
 CSV_PATH = Path(__file__).parent.parent / "学校总览.csv"
 OUTPUT_DIR = Path(__file__).parent.parent / "standardization"
@@ -21,13 +23,16 @@ def analyze_selection_method_classification():
     print("=" * 60)
     print()
     
-    # 读取CSV
-    if not CSV_PATH.exists():
+    # 已建 SQLite 主库时直接读主库（只取会导出的行，与读 CSV 时结果一致），否则读导出的CSV
+    if MASTER_DB.exists():
+        print(f"📖 读取主库: {MASTER_DB}")
+        df = exported_rows(load_master())
+    elif CSV_PATH.exists():
+        print(f"📖 读取文件: {CSV_PATH}")
+        df = pd.read_csv(CSV_PATH, encoding='utf-8-sig')
+    else:
         print(f"❌ 找不到文件: {CSV_PATH}")
         return
-    
-    print(f"📖 读取文件: {CSV_PATH}")
-    df = pd.read_csv(CSV_PATH, encoding='utf-8-sig')
     print(f"   总记录数: {len(df)} 条")
     print()
     
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+主Excel 内容寻址备份库：同一内容只存一份，内容未变化时备份不占空间
+
+布局（默认 backups/workbooks/，与 backup-db.js 的 JSON 备份分开）：
+    objects/<sha256 前两位>/<sha256>.xlsx[.gz]   每个不同版本一份，--compress 时 gzip 压缩
+    log.jsonl                                   每次备份一行：
+        {"time": ..., "sha256": ..., "file": 相对仓库根的路径, "script": 触发备份的脚本, "size": 字节数, "new": 是否新版本}
+
+保留策略（prune）：最近 --keep-last 个不同版本、--keep-days 天内备份过的版本、
+最近 --keep-monthly 个月每月最后一个版本都保留，其余版本连同其日志一起删除。
+
+用法：
+    python3 scripts/backup_store.py backup                        # 手动备份 学部学校一览表.xlsx
+    python3 scripts/backup_store.py list                          # 列出备份（最新在前）
+    python3 scripts/backup_store.py restore @0                    # 恢复到最近一次备份（如上次合并前）；也可写哈希前缀，如 restore 3fa2c1
+    python3 scripts/backup_store.py restore 3fa2c1 --to /tmp/old.xlsx
+    python3 scripts/backup_store.py prune --dry-run               # 查看保留策略会删除哪些版本
+    python3 scripts/backup_store.py migrate                       # 把旧的 backups/学部学校一览表_时间.xlsx 导入备份库并删除
+    python3 scripts/backup_store.py verify                        # 校验每个版本的哈希
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from workbook_cache import file_hash
+
+ROOT = Path(__file__).resolve().parent.parent
+STORE_DIR = ROOT / "backups" / "workbooks"
+MAIN_EXCEL = ROOT / "学部学校一览表.xlsx"
+LEGACY_NAME = re.compile(r"^(?P<stem>.+)_(?P<stamp>\d{8}_\d{6})(?P<suffix>\.xlsx)$")
+
+
+class BackupStore:
+    """按 sha256 存放工作簿版本，并在 log.jsonl 中记录每次备份。"""
+
+    def __init__(self, root=STORE_DIR, compress=False):
+        self.root = Path(root)
+        self.compress = compress
+        self.log_path = self.root / "log.jsonl"
+
+    # ---------- 对象 ----------
+
+    def object_path(self, digest, suffix=".xlsx"):
+        """已存在的对象路径（压缩或未压缩）；都不存在时返回按当前设置应写入的路径。"""
+        base = self.root / "objects" / digest[:2] / f"{digest}{suffix}"
+        gz = base.with_name(base.name + ".gz")
+        if base.exists():
+            return base
+        if gz.exists() or self.compress:
+            return gz
+        return base
+
+    def _store_object(self, path, digest):
+        """把 path 的内容存为对象；已存在时不写，返回是否新写入。"""
+        target = self.object_path(digest, Path(path).suffix)
+        if target.exists():
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        try:
+            with open(path, "rb") as src:
+                if target.suffix == ".gz":
+                    with gzip.open(tmp, "wb", compresslevel=6) as dst:
+                        shutil.copyfileobj(src, dst, 1 << 20)
+                else:
+                    with open(tmp, "wb") as dst:
+                        shutil.copyfileobj(src, dst, 1 << 20)
+            os.replace(tmp, target)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return True
+
+    def _open_object(self, entry):
+        target = self.object_path(entry["sha256"], Path(entry["file"]).suffix)
+        if not target.exists():
+            raise FileNotFoundError(f"备份对象缺失: {target}")
+        return gzip.open(target, "rb") if target.suffix == ".gz" else open(target, "rb")
+
+    # ---------- 日志 ----------
+
+    def entries(self):
+        """全部备份记录，按时间先后。"""
+        if not self.log_path.exists():
+            return []
+        with open(self.log_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _append(self, entry):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _rewrite(self, entries):
+        tmp = self.log_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.log_path)
+
+    @staticmethod
+    def _relative(path):
+        path = Path(path).resolve()
+        try:
+            return str(path.relative_to(ROOT))
+        except ValueError:
+            return str(path)
+
+    # ---------- 操作 ----------
+
+    def backup(self, path, script=None, when=None, source=None):
+        """备份 path，返回日志记录；内容已有时只追加一行日志。source 为日志中记录的原工作簿路径（默认即 path）。"""
+        digest = file_hash(path)
+        entry = {
+            "time": (when or datetime.now()).isoformat(timespec="seconds"),
+            "sha256": digest,
+            "file": self._relative(source or path),
+            "script": script or Path(sys.argv[0]).name,
+            "size": os.path.getsize(path),
+            "new": self._store_object(path, digest),
+        }
+        self._append(entry)
+        return entry
+
+    def resolve(self, ref, file=None):
+        """@N（0 为最近一次）或至少 4 位的哈希前缀 → 对应的最近一条备份记录。"""
+        entries = [e for e in self.entries() if file is None or e["file"] == file]
+        if ref.startswith("@"):
+            n = int(ref[1:])
+            if not 0 <= n < len(entries):
+                raise LookupError(f"只有 {len(entries)} 条备份记录，没有 {ref}")
+            return entries[-1 - n]
+        if len(ref) < 4:
+            raise LookupError("哈希前缀至少 4 位")
+        digests = {e["sha256"] for e in entries if e["sha256"].startswith(ref.lower())}
+        if not digests:
+            raise LookupError(f"没有哈希以 {ref} 开头的备份")
+        if len(digests) > 1:
+            raise LookupError(f"哈希前缀 {ref} 不唯一: {', '.join(sorted(d[:12] for d in digests))}")
+        return [e for e in entries if e["sha256"] in digests][-1]
+
+    def restore(self, entry, dest=None):
+        """把备份写回 dest（默认原工作簿）；写回原工作簿时先备份其当前内容，恢复本身也可撤销。"""
+        original = ROOT / entry["file"]
+        dest = Path(dest) if dest else original
+        if dest.resolve() == original.resolve() and dest.exists():
+            self.backup(dest, script="restore")
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.stem}.{os.getpid()}.tmp{dest.suffix}")
+        try:
+            with self._open_object(entry) as src, open(tmp, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            if file_hash(tmp) != entry["sha256"]:
+                raise ValueError(f"备份对象 {entry['sha256'][:12]} 内容与哈希不符，未恢复")
+            os.replace(tmp, dest)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return dest
+
+    def retained(self, keep_last=20, keep_days=30, keep_monthly=12, now=None):
+        """按保留策略返回要保留的哈希集合。"""
+        now = now or datetime.now()
+        latest = {}  # 哈希 → 最近一次备份时间
+        for entry in self.entries():
+            latest[entry["sha256"]] = max(latest.get(entry["sha256"], ""), entry["time"])
+        by_time = sorted(latest, key=latest.get, reverse=True)
+        keep = set(by_time[:keep_last])
+        cutoff = (now - timedelta(days=keep_days)).isoformat(timespec="seconds")
+        keep.update(d for d in by_time if latest[d] >= cutoff)
+        months = {}
+        for digest in by_time:
+            months.setdefault(latest[digest][:7], digest)  # 每月最后一个版本
+        keep.update(months[m] for m in sorted(months, reverse=True)[:keep_monthly])
+        return keep
+
+    def prune(self, keep_last=20, keep_days=30, keep_monthly=12, dry_run=False):
+        """删除不在保留策略内的版本及其日志，返回 (删除的哈希列表, 释放字节数)。"""
+        entries = self.entries()
+        keep = self.retained(keep_last, keep_days, keep_monthly)
+        removed = sorted({e["sha256"] for e in entries} - keep)
+        freed = 0
+        for digest in removed:
+            suffix = Path(next(e["file"] for e in entries if e["sha256"] == digest)).suffix
+            target = self.object_path(digest, suffix)
+            if target.exists():
+                freed += target.stat().st_size
+                if not dry_run:
+                    target.unlink()
+        if removed and not dry_run:
+            self._rewrite([e for e in entries if e["sha256"] in keep])
+        return removed, freed
+
+    def verify(self):
+        """返回哈希不符或缺失的版本列表。"""
+        bad = []
+        for digest, entry in {e["sha256"]: e for e in self.entries()}.items():
+            try:
+                with self._open_object(entry) as f:
+                    h = hashlib.sha256()
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        h.update(chunk)
+                if h.hexdigest() != digest:
+                    bad.append(digest)
+            except (OSError, EOFError):
+                bad.append(digest)
+        return bad
+
+    def migrate(self, legacy_dir):
+        """导入 legacy_dir 下 <文件名>_YYYYMMDD_HHMMSS.xlsx 形式的旧备份，确认入库后删除原文件。"""
+        imported = []
+        for path in sorted(Path(legacy_dir).glob("*.xlsx")):
+            m = LEGACY_NAME.match(path.name)
+            if not m:
+                continue
+            when = datetime.strptime(m["stamp"], "%Y%m%d_%H%M%S")
+            # 日志里记原工作簿路径，restore 默认写回原处
+            entry = self.backup(path, script="legacy", when=when, source=ROOT / f"{m['stem']}{m['suffix']}")
+            path.unlink()
+            imported.append((path.name, entry))
+        # 旧备份按文件名时间导入，整理日志为时间顺序
+        if imported:
+            self._rewrite(sorted(self.entries(), key=lambda e: e["time"]))
+        return imported
+
+
+def format_size(n):
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+def cmd_list(store, args):
+    entries = [e for e in store.entries() if args.file is None or e["file"] == args.file]
+    if not entries:
+        print("（没有备份）")
+        return 0
+    versions = {e["sha256"] for e in entries}
+    print(f"{len(entries)} 次备份，{len(versions)} 个不同版本")
+    for n, entry in enumerate(reversed(entries[-args.limit:] if args.limit else entries)):
+        mark = "新版本" if entry["new"] else "未变化"
+        print(f"@{n:<3} {entry['time']}  {entry['sha256'][:12]}  {format_size(entry['size']):>8}  {mark}  "
+              f"{entry['script']}  {entry['file']}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="主Excel 内容寻址备份库")
+    parser.add_argument("--store", type=Path, default=STORE_DIR, help=f"备份库目录（默认 {STORE_DIR.relative_to(ROOT)}）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("backup", help="备份工作簿")
+    p.add_argument("path", type=Path, nargs="?", default=MAIN_EXCEL)
+    p.add_argument("--compress", action="store_true", help="新版本用 gzip 压缩存放")
+
+    p = sub.add_parser("list", help="列出备份，最新在前")
+    p.add_argument("-n", "--limit", type=int, default=30, help="最多显示条数（0 为全部）")
+    p.add_argument("--file", help="只看某个工作簿（相对仓库根的路径）")
+
+    p = sub.add_parser("restore", help="恢复备份（覆盖前先备份当前文件）")
+    p.add_argument("ref", help="@N（0 为最近一次）或哈希前缀")
+    p.add_argument("--to", type=Path, help="写到其他路径，默认写回原工作簿")
+    p.add_argument("--file", help="@N 只在该工作簿的备份中计数")
+
+    p = sub.add_parser("prune", help="按保留策略删除旧版本")
+    p.add_argument("--keep-last", type=int, default=20, help="保留最近 N 个不同版本（默认 20）")
+    p.add_argument("--keep-days", type=int, default=30, help="保留 N 天内备份过的版本（默认 30）")
+    p.add_argument("--keep-monthly", type=int, default=12, help="保留最近 N 个月每月最后一个版本（默认 12）")
+    p.add_argument("--dry-run", action="store_true")
+
+    p = sub.add_parser("migrate", help="导入旧的带时间戳备份文件并删除原文件")
+    p.add_argument("--from", dest="legacy_dir", type=Path, default=ROOT / "backups")
+
+    sub.add_parser("verify", help="校验每个版本的哈希")
+    args = parser.parse_args(argv)
+
+    store = BackupStore(args.store, compress=getattr(args, "compress", False))
+    if args.command == "backup":
+        entry = store.backup(args.path, script="backup_store.py")
+        print(describe(entry))
+    elif args.command == "list":
+        return cmd_list(store, args)
+    elif args.command == "restore":
+        try:
+            entry = store.resolve(args.ref, args.file)
+        except (LookupError, ValueError) as e:
+            print(f"❌ {e}")
+            return 1
+        dest = store.restore(entry, args.to)
+        print(f"✅ 已恢复 {entry['time']} 的版本 {entry['sha256'][:12]} 到 {dest}")
+        if args.to is None:
+            print("   覆盖前的内容已备份，可用 restore @0 撤销")
+    elif args.command == "prune":
+        removed, freed = store.prune(args.keep_last, args.keep_days, args.keep_monthly, args.dry_run)
+        verb = "将删除" if args.dry_run else "已删除"
+        print(f"{'📋' if args.dry_run else '✅'} {verb} {len(removed)} 个版本，释放 {format_size(freed)}")
+        for digest in removed:
+            print(f"   - {digest[:12]}")
+    elif args.command == "migrate":
+        imported = store.migrate(args.legacy_dir)
+        new = sum(1 for _, entry in imported if entry["new"])
+        print(f"✅ 导入 {len(imported)} 个旧备份，其中 {new} 个不同版本，其余内容重复只记日志")
+    elif args.command == "verify":
+        bad = store.verify()
+        if bad:
+            print(f"❌ {len(bad)} 个版本损坏或缺失: {', '.join(d[:12] for d in bad)}")
+            return 1
+        print(f"✅ {len({e['sha256'] for e in store.entries()})} 个版本哈希全部正确")
+    return 0
+
+
+def describe(entry):
+    if entry["new"]:
+        return f"✅ 已备份 {entry['file']}（版本 {entry['sha256'][:12]}，{format_size(entry['size'])}）"
+    return f"✅ 已备份 {entry['file']}（版本 {entry['sha256'][:12]}，内容未变化，不占空间）"
+
+
+if __name__ == "__main__":
+    sys.exit(main())
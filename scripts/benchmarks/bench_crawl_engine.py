@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取引擎基准：在本机启动几台模拟「大学网站」的 HTTP 服务（每个端口算一个主机），
+对比旧的逐条抓取 + 每条之后 sleep 与 fetch_engine.FetchEngine 的总耗时，并校验礼貌限速：
+
+- fast / slow：正常返回，响应延迟不同
+- flaky：每第 3 个请求返回 500
+- down：一直返回 503，连续失败 max_host_failures 次后其余 URL 应被跳过
+- refused：端口未监听，连接被拒绝
+
+校验项（按服务端记录的请求到达时刻）：同一主机相邻请求间隔 ≥ host_delay、同一主机同时最多 1 个请求、
+全局同时请求数 ≤ concurrency、结果与输入顺序一致、失败主机被跳过。任一项不满足时退出码为 1。
+
+用法：
+    python3 scripts/benchmarks/bench_crawl_engine.py
+    python3 scripts/benchmarks/bench_crawl_engine.py --urls 10 --host-delay 0.5 --concurrency 4 --no-legacy
+"""
+import argparse
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT / "scripts" / "crawlers"))
+
+from fetch_engine import FetchEngine, FetchResult, default_fetch, host_key  # noqa: E402
+from http_session import HttpSession  # noqa: E402
+
+# 不重试的会话：只测引擎本身的调度（重试见 bench_http_session.py）
+SESSION = HttpSession(retries=0)
+
+# 主机名 → (响应延迟秒数, 返回状态码的函数(第几个请求))
+BEHAVIOURS = {
+    "fast-1": (0.02, lambda n: 200),
+    "fast-2": (0.02, lambda n: 200),
+    "fast-3": (0.05, lambda n: 200),
+    "slow": (0.6, lambda n: 200),
+    "flaky": (0.05, lambda n: 500 if n % 3 == 2 else 200),
+    "down": (0.02, lambda n: 503),
+}
+PAGE = "<html><body><h1>外国人留学生入試</h1><p>出願期間 2026年1月5日〜1月16日</p></body></html>".encode("utf-8")
+
+
+class Recorder:
+    """服务端记录：每个主机的请求到达时刻、同时在处理的请求数峰值。"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.arrivals = defaultdict(list)
+        self.active = defaultdict(int)
+        self.peak = defaultdict(int)
+        self.total_active = 0
+        self.total_peak = 0
+
+    def enter(self, host):
+        with self.lock:
+            self.arrivals[host].append(time.monotonic())
+            self.active[host] += 1
+            self.total_active += 1
+            self.peak[host] = max(self.peak[host], self.active[host])
+            self.total_peak = max(self.total_peak, self.total_active)
+            return len(self.arrivals[host]) - 1
+
+    def leave(self, host):
+        with self.lock:
+            self.active[host] -= 1
+            self.total_active -= 1
+
+    def reset(self):
+        self.__init__()
+
+
+def start_server(name, latency, status_for, recorder):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            n = recorder.enter(name)
+            try:
+                time.sleep(latency)
+                status = status_for(n)
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(PAGE)))
+                self.end_headers()
+                self.wfile.write(PAGE)
+            finally:
+                recorder.leave(name)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def refused_port():
+    """找一个当前没有监听的端口。"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def legacy_crawl(urls, delay):
+    """旧实现：逐条抓取，每条之后 sleep。"""
+    results = []
+    for url in urls:
+        try:
+            results.append(default_fetch(url, timeout=5, session=SESSION))
+        except Exception as e:
+            results.append(FetchResult(url, error=str(e)))
+        time.sleep(delay)
+    return results
+
+
+def check(results, urls, recorder, names, args, engine):
+    problems = []
+    if [r.url for r in results] != urls:
+        problems.append("结果顺序与输入不一致")
+    for name in names:
+        arrivals = recorder.arrivals[name]
+        gaps = [b - a for a, b in zip(arrivals, arrivals[1:])]
+        if gaps and min(gaps) < args.host_delay - 0.02:
+            problems.append(f"{name}: 相邻请求间隔 {min(gaps):.3f}s < {args.host_delay}s")
+        if recorder.peak[name] > 1:
+            problems.append(f"{name}: 同时 {recorder.peak[name]} 个请求")
+    if recorder.total_peak > args.concurrency:
+        problems.append(f"全局同时 {recorder.total_peak} 个请求 > {args.concurrency}")
+    if len(recorder.arrivals["down"]) != engine.max_host_failures:
+        problems.append(f"down: 收到 {len(recorder.arrivals['down'])} 个请求，应在 {engine.max_host_failures} 次失败后跳过")
+    skipped = [r for r in results if r.error and "已跳过" in r.error]
+    expected_skipped = 2 * (args.urls - engine.max_host_failures)  # down + refused
+    if len(skipped) != expected_skipped:
+        problems.append(f"跳过 {len(skipped)} 个 URL，应为 {expected_skipped}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抓取引擎基准（本机模拟主机）")
+    parser.add_argument("--urls", type=int, default=8, help="每个主机的 URL 数（默认 8）")
+    parser.add_argument("--host-delay", type=float, default=0.3, help="同一主机请求间隔秒数（默认 0.3）")
+    parser.add_argument("--concurrency", type=int, default=4, help="全局并发（默认 4）")
+    parser.add_argument("--no-legacy", action="store_true", help="不运行旧的逐条 + sleep 实现")
+    args = parser.parse_args()
+
+    recorder = Recorder()
+    servers = {name: start_server(name, latency, status_for, recorder)
+               for name, (latency, status_for) in BEHAVIOURS.items()}
+    hosts = {name: f"http://127.0.0.1:{server.server_address[1]}" for name, server in servers.items()}
+    hosts["refused"] = f"http://127.0.0.1:{refused_port()}"
+    # 各主机的 URL 交错排列，与按学部顺序爬取时相同
+    urls = [f"{hosts[name]}/page/{i}" for i in range(args.urls) for name in hosts]
+    print(f"模拟 {len(hosts)} 个主机、{len(urls)} 个 URL（同一主机间隔 {args.host_delay}s，全局并发 {args.concurrency}）")
+
+    if not args.no_legacy:
+        start = time.perf_counter()
+        legacy = legacy_crawl(urls, args.host_delay)
+        t_legacy = time.perf_counter() - start
+        print(f"  旧实现（逐条 + sleep）: {t_legacy:.2f}s，成功 {sum(r.ok for r in legacy)} 个")
+        recorder.reset()
+
+    engine = FetchEngine(concurrency=args.concurrency, host_delay=args.host_delay,
+                         fetch=lambda url: default_fetch(url, timeout=5, session=SESSION))
+    start = time.perf_counter()
+    results = engine.run(urls)
+    t_engine = time.perf_counter() - start
+    print(f"  FetchEngine: {t_engine:.2f}s，成功 {sum(r.ok for r in results)} 个，"
+          f"失败 {engine.stats['failed']} 个，跳过 {engine.stats['skipped']} 个，礼貌等待 {engine.stats['politeWaits']} 次")
+    print(f"  服务端观测: 全局同时最多 {recorder.total_peak} 个请求，"
+          f"各主机最小间隔 {min(b - a for n in BEHAVIOURS for a, b in zip(recorder.arrivals[n], recorder.arrivals[n][1:])):.3f}s")
+
+    for server in servers.values():
+        server.shutdown()
+    problems = check(results, urls, recorder, [n for n in BEHAVIOURS], args, engine)
+    if problems:
+        for p in problems:
+            print(f"❌ {p}")
+        sys.exit(1)
+    print(f"✅ 礼貌限速、并发上限、结果顺序与失败主机跳过均符合预期（主机键如 {host_key(urls[0])}）")
+
+
+if __name__ == "__main__":
+    main()
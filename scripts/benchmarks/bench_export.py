@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出引擎基准：在合成的大表（默认 10 万行）上对比
+逐行版（iterrows + to_js_value）与整列版（normalize_frame + render_json）的耗时，
+并校验两者输出的 JSON / CSV 逐字节一致。
+
+用法：
+    python3 scripts/benchmarks/bench_export.py                 # 10 万行，内存中合成
+    python3 scripts/benchmarks/bench_export.py --rows 20000
+    python3 scripts/benchmarks/bench_export.py --xlsx /tmp/synthetic.xlsx   # 同时写出/读回真实工作簿
+"""
+import argparse
+import csv
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT))
+
+import export_school_data as export  # noqa: E402
+
+DATE_COLUMNS = ["网上出愿开始时间", "网上出愿截止时间", "邮寄开始时间", "邮寄截止时间", "校内考时间1", "校内考时间2", "发榜时间"]
+
+# 取值样本：含空白、前后空格、需转义的字符、数值与文本混排
+TEXT_SAMPLES = {
+    "大学": ["東京大学", "早稲田大学", " 慶應義塾大学 ", "京都大学", "大阪大学", "   ", None],
+    "学部": ["理科一類", "法学部", "経済学部", "文学部\n（夜間）", '商学部 "A"', None],
+    "学科": ["情報科学科", "国際関係学科", None, "", "機械\\工学科"],
+    "位置": ["東京都", "京都府", "大阪府", "愛知県", None],
+    "文理": ["文", "理", "文理", None],
+    "方式": ["外国人入試", "外国人特別選抜", "一般選抜", None],
+    "第几期": ["只有一期", "第1期", "第2期", None],
+    "併願": ["可", "不可", None],
+    "能使用EJU": ["当年6月or11月都可", "当年6月", None],
+    "需要EJU科目": ["日语, 数学コース2", "日语, 综合科目, 数学コース1", None],
+    "英语": ["要", "不要", 1.0, None],
+    "JLPT": ["要", "不要", "N1\t以上", None],
+    "必着/消印": ["必着", "消印有効", None],
+    "校内考形式": ["小论文, 面试（线下）", "面试（线上）", None],
+    "特殊成绩要求": ["数学1:150,日语:300", None, 300, 12.5],
+}
+
+
+def make_synthetic_frame(rows, seed=0):
+    """按 read_excel 产生的列类型合成一张 学校总览 表。"""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for col, samples in TEXT_SAMPLES.items():
+        picks = rng.integers(0, len(samples), rows)
+        data[col] = pd.Series([samples[i] for i in picks], dtype=object)
+    base = np.datetime64("2025-10-01T00:00:00")
+    for col in DATE_COLUMNS:
+        offsets = rng.integers(0, 200 * 24, rows).astype("timedelta64[h]")
+        values = pd.Series(base + offsets)
+        values[rng.random(rows) < 0.1] = pd.NaT
+        data[col] = values
+    # 与真实表一样夹带几列不导出的列
+    data["其他备注"] = pd.Series(rng.random(rows))
+    return pd.DataFrame(data)
+
+
+def legacy_export(df, csv_path):
+    """重构前的逐行实现，作为正确性与耗时的基线。"""
+    rows = []
+    for _, r in df.iterrows():
+        row = {}
+        for excel_col, js_key in export.COLUMN_MAP.items():
+            if excel_col in df.columns:
+                val = export.to_js_value(r[excel_col])
+                if val is not None:
+                    row[js_key] = val
+        if row.get("name"):
+            rows.append(row)
+    json_str = json.dumps({"data": rows}, ensure_ascii=False, indent=0)
+    with csv_path.open("w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(export.CSV_COLUMNS)
+        for r in rows:
+            w.writerow([r.get(export.COLUMN_MAP.get(c, c), "") or "" for c in export.CSV_COLUMNS])
+    return json_str
+
+
+def vectorized_export(df, csv_path):
+    frame = export.normalize_frame(df)
+    json_str = export.render_json(frame)
+    export.write_csv(frame, csv_path)
+    return json_str
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出引擎基准（逐行 vs 整列）")
+    parser.add_argument("--rows", type=int, default=100_000, help="合成行数（默认 100000）")
+    parser.add_argument("--xlsx", type=Path, help="把合成表写成工作簿并从中读回（计入解析耗时）")
+    parser.add_argument("--skip-legacy", action="store_true", help="只测整列版")
+    args = parser.parse_args()
+
+    df = make_synthetic_frame(args.rows)
+    if args.xlsx:
+        _, t_write = timed(lambda: df.to_excel(args.xlsx, sheet_name="学校总览", index=False))
+        df, t_read = timed(lambda: pd.read_excel(args.xlsx, sheet_name="学校总览"))
+        print(f"写入工作簿 {t_write:.2f}s，读回 {t_read:.2f}s（{args.xlsx}）")
+
+    print(f"合成数据: {len(df)} 行 × {len(df.columns)} 列")
+    with tempfile.TemporaryDirectory() as tmp:
+        vec_csv, old_csv = Path(tmp) / "vectorized.csv", Path(tmp) / "legacy.csv"
+        vec_json, t_vec = timed(vectorized_export, df, vec_csv)
+        print(f"  整列版: {t_vec:.3f}s")
+        if args.skip_legacy:
+            return
+        old_json, t_old = timed(legacy_export, df, old_csv)
+        print(f"  逐行版: {t_old:.3f}s")
+        print(f"  加速比: {t_old / t_vec:.1f}x")
+        if vec_json != old_json or vec_csv.read_bytes() != old_csv.read_bytes():
+            print("❌ 输出不一致")
+            sys.exit(1)
+        print(f"✅ 输出逐字节一致（JSON {len(vec_json.encode('utf-8'))} 字节，CSV {vec_csv.stat().st_size} 字节）")
+
+if __name__ == "__main__":
+    main()
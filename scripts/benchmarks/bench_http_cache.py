@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP 缓存基准：在本机启动一台模拟「大学网站」，对同一批 URL 连续爬取三轮，
+对比不经缓存与经 http_cache.HttpCache 时的服务端流量，并校验缓存语义：
+
+- /etag/<i>：带 ETag，If-None-Match 匹配时回 304
+- /lastmod/<i>：带 Last-Modified，If-Modified-Since 不早于它时回 304
+- /fresh/<i>：Cache-Control: max-age=60，新鲜期内不应再收到请求
+- /nostore/<i>：Cache-Control: no-store，每轮都应重新下载、不写入缓存
+- /changed/<i>：每轮内容与 ETag 都变，应每轮 200 并更新缓存
+- /missing/<i>：404，不缓存
+
+第三轮之后再以离线模式读一轮：已缓存的页面内容须与联网时一致，其余 URL 返回错误、服务端收不到请求。
+任一项不满足时退出码为 1。
+
+用法：
+    python3 scripts/benchmarks/bench_http_cache.py
+    python3 scripts/benchmarks/bench_http_cache.py --urls 50 --latency 0.05
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT / "scripts" / "crawlers"))
+
+from fetch_engine import FetchEngine, default_fetch  # noqa: E402
+from http_cache import HttpCache  # noqa: E402
+
+KINDS = ["etag", "lastmod", "fresh", "nostore", "changed", "missing"]
+BODY = "<html><body><h1>外国人留学生入試 {path}</h1><p>{filler}</p></body></html>"
+LAST_MODIFIED = time.time() - 86400
+
+
+class Site:
+    """服务端：按路径给出响应，记录每轮收到的 (路径类型, 状态码)。"""
+
+    def __init__(self, latency, size):
+        self.latency = latency
+        self.filler = "出願期間 2026年1月5日〜1月16日 " * (size // 40)
+        self.round = 0
+        self.lock = threading.Lock()
+        self.log = Counter()
+        self.bytes = 0
+
+    def respond(self, handler):
+        kind = handler.path.split("/")[1]
+        version = self.round if kind == "changed" else 0
+        body = BODY.format(path=f"{handler.path} v{version}", filler=self.filler).encode("utf-8")
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        status = 200
+        if kind in ("etag", "changed"):
+            headers["ETag"] = f'"{kind}-{version}"'
+            if handler.headers.get("If-None-Match") == headers["ETag"]:
+                status = 304
+        elif kind == "lastmod":
+            headers["Last-Modified"] = formatdate(LAST_MODIFIED, usegmt=True)
+            since = handler.headers.get("If-Modified-Since")
+            if since and parsedate_to_datetime(since).timestamp() >= int(LAST_MODIFIED):
+                status = 304
+        elif kind == "fresh":
+            headers["Cache-Control"] = "max-age=60"
+        elif kind == "nostore":
+            headers["Cache-Control"] = "no-store"
+        elif kind == "missing":
+            status = 404
+        if status == 304:
+            body = b""
+        with self.lock:
+            self.log[(kind, status)] += 1
+            self.bytes += len(body)
+        time.sleep(self.latency)
+        handler.send_response(status)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def next_round(self):
+        with self.lock:
+            log, sent = self.log, self.bytes
+            self.log, self.bytes = Counter(), 0
+            self.round += 1
+        return log, sent
+
+
+def start_server(site):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            site.respond(self)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def crawl(urls, fetch, lookup=None):
+    engine = FetchEngine(concurrency=8, host_delay=0, fetch=fetch, lookup=lookup)
+    start = time.perf_counter()
+    results = engine.run(urls)
+    return results, time.perf_counter() - start
+
+
+def expect(problems, label, log, expected):
+    got = {k: v for k, v in log.items() if v}
+    if got != expected:
+        problems.append(f"{label}: 服务端收到 {dict(sorted(got.items()))}，应为 {dict(sorted(expected.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP 缓存基准（本机模拟网站）")
+    parser.add_argument("--urls", type=int, default=20, help="每种路径的 URL 数（默认 20）")
+    parser.add_argument("--latency", type=float, default=0.02, help="服务端每个响应的延迟秒数（默认 0.02）")
+    parser.add_argument("--size", type=int, default=60_000, help="页面大小（字节，默认约 60KB）")
+    args = parser.parse_args()
+
+    site = Site(args.latency, args.size)
+    server = start_server(site)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/{kind}/{i}" for i in range(args.urls) for kind in KINDS]
+    n = args.urls
+    print(f"模拟网站: {len(urls)} 个 URL（{'、'.join(KINDS)} 各 {n} 个，页面约 {args.size // 1000}KB）")
+    problems = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 不经缓存：每轮都完整下载
+        for _ in range(2):
+            _, elapsed = crawl(urls, default_fetch)
+        log, sent = site.next_round()
+        print(f"  不经缓存（第 2 轮）: {elapsed:.2f}s，服务端发送 {sent / 1024 / 1024:.1f}MB")
+
+        cache = HttpCache(Path(tmp), offline=False)
+        reference = {}
+        for round_no in (1, 2, 3):
+            results, elapsed = crawl(urls, cache.fetch, cache.lookup)
+            log, sent = site.next_round()
+            sources = Counter(r.headers.get("X-Cache") for r in results)
+            print(f"  经缓存第 {round_no} 轮: {elapsed:.2f}s，服务端发送 {sent / 1024 / 1024:.1f}MB，"
+                  f"来源 {dict(sources)}")
+            for r in results:
+                if r.ok:
+                    reference[r.url] = r.content
+            if round_no == 1:
+                expect(problems, "第 1 轮", log, {(k, 404 if k == "missing" else 200): n for k in KINDS})
+            else:
+                expect(problems, f"第 {round_no} 轮", log, {
+                    ("etag", 304): n, ("lastmod", 304): n, ("nostore", 200): n,
+                    ("changed", 200): n, ("missing", 404): n})
+                if any(b"v0" in reference[f"{base}/changed/{i}"] for i in range(n)):
+                    problems.append(f"第 {round_no} 轮: /changed/ 仍返回旧内容")
+        print(f"  {cache.describe()}")
+
+        offline = HttpCache(Path(tmp), offline=True)
+        results, elapsed = crawl(urls, offline.fetch, offline.lookup)
+        log, _ = site.next_round()
+        print(f"  离线: {elapsed:.2f}s，{offline.describe()}")
+        expect(problems, "离线", log, {})
+        for r in results:
+            kind = r.url.split("/")[3]
+            if kind in ("nostore", "missing"):
+                if r.error is None:
+                    problems.append(f"离线: {r.url} 不应有缓存")
+            elif not r.ok or r.content != reference[r.url]:
+                problems.append(f"离线: {r.url} 与联网时内容不一致（{r!r}）")
+    server.shutdown()
+
+    if problems:
+        for p in problems[:20]:
+            print(f"❌ {p}")
+        sys.exit(1)
+    print("✅ 新鲜期内不发请求、过期页面 304 校验、no-store 与错误页不缓存、离线只读缓存均符合预期")
+
+
+if __name__ == "__main__":
+    main()
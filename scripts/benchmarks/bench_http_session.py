@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP 会话层基准：在本机启动几台支持 keep-alive 的模拟「大学网站」（HTTP/1.1，每个端口算一个主机，
+每条新连接先等 --handshake 秒模拟 TCP + TLS 握手），对比
+
+- 旧写法：每个请求单独 urllib.request.urlopen / requests.get（每次新建连接）
+- http_session.HttpSession：按主机复用连接
+
+并校验（按服务端记录）：
+- 会话层每个主机只建立少量连接（≤ 并发数），旧写法每个请求一条
+- retry 主机前两次返回 503（Retry-After: 0）：会话层重试后拿到 200，共 3 个请求
+- robots.txt：检查每个 URL 时每个主机只下载一次；新的 RobotsCache 读磁盘不再下载；ttl 过期后重新下载；
+  Disallow 的路径判为不允许
+任一项不满足时退出码为 1。
+
+用法：
+    python3 scripts/benchmarks/bench_http_session.py
+    python3 scripts/benchmarks/bench_http_session.py --urls 50 --handshake 0.1
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT / "scripts" / "crawlers"))
+
+from http_session import HEADERS, HttpSession, RobotsCache  # noqa: E402
+
+HOSTS = ["u-1", "u-2", "u-3", "retry"]
+PAGE = "<html><body><h1>外国人留学生入試</h1><p>出願期間 2026年1月5日〜1月16日</p></body></html>".encode("utf-8")
+ROBOTS_TXT = b"User-agent: *\nDisallow: /private/\n"
+
+
+class Recorder:
+    """服务端记录：每个主机的连接数、各路径的请求数。"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = defaultdict(int)
+        self.requests = defaultdict(int)
+
+    def count(self, table, key):
+        with self.lock:
+            table[key] += 1
+            return table[key]
+
+    def reset(self):
+        self.__init__()
+
+
+def start_server(name, handshake, recorder):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # 响应头与正文分两次写，不关 Nagle 时 keep-alive 连接上每次多等 40ms
+
+        def setup(self):
+            super().setup()
+            recorder.count(recorder.connections, name)
+            time.sleep(handshake)
+
+        def do_GET(self):
+            n = recorder.count(recorder.requests, (name, self.path))
+            status, body, headers = 200, PAGE, {"Content-Type": "text/html; charset=utf-8"}
+            if self.path == "/robots.txt":
+                body, headers = ROBOTS_TXT, {"Content-Type": "text/plain"}
+            elif name == "retry" and n <= 2:
+                status, headers = 503, {"Retry-After": "0"}
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def legacy_get(url):
+    """旧写法：每个请求新建连接。"""
+    with urllib.request.urlopen(urllib.request.Request(url, headers=HEADERS), timeout=5) as response:
+        return response.status
+
+
+def run(fetch, urls, workers):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        statuses = list(executor.map(fetch, urls))
+    return statuses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP 会话层基准（本机模拟主机）")
+    parser.add_argument("--urls", type=int, default=30, help="每个主机的 URL 数（默认 30）")
+    parser.add_argument("--handshake", type=float, default=0.03, help="每条新连接的模拟握手秒数（默认 0.03）")
+    parser.add_argument("--workers", type=int, default=3, help="并发线程数（默认 3）")
+    args = parser.parse_args()
+
+    recorder = Recorder()
+    servers = {name: start_server(name, args.handshake, recorder) for name in HOSTS}
+    hosts = {name: f"http://127.0.0.1:{server.server_address[1]}" for name, server in servers.items()}
+    urls = [f"{hosts[name]}/page/{i}" for i in range(args.urls) for name in HOSTS if name != "retry"]
+    print(f"模拟 {len(hosts)} 个主机、{len(urls)} 个 URL（新连接握手 {args.handshake}s，{args.workers} 个线程）")
+    problems = []
+
+    statuses, t_legacy = run(legacy_get, urls, args.workers)
+    legacy_connections = sum(recorder.connections.values())
+    print(f"  旧写法（每次新连接）: {t_legacy:.2f}s，{legacy_connections} 条连接")
+    recorder.reset()
+
+    session = HttpSession(backoff=0.05)
+    statuses, t_session = run(lambda url: session.get(url, timeout=5).status, urls, args.workers)
+    print(f"  HttpSession: {t_session:.2f}s，{sum(recorder.connections.values())} 条连接"
+          f"（{dict(recorder.connections)}）")
+    if statuses != [200] * len(urls):
+        problems.append("HttpSession 有请求未返回 200")
+    for name, count in recorder.connections.items():
+        if count > args.workers:
+            problems.append(f"{name}: 建立了 {count} 条连接，应不超过 {args.workers}")
+
+    response = session.get(f"{hosts['retry']}/page/0")
+    retried = recorder.requests["retry", "/page/0"]
+    print(f"  重试: 最终 {response.status}，服务端收到 {retried} 个请求，会话重试 {session.stats['retries']} 次")
+    if response.status != 200 or retried != 3:
+        problems.append(f"retry: 应在两次 503 后拿到 200（实际 {response.status}，{retried} 个请求）")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        robots = RobotsCache(session, root=Path(tmp))
+        checks = urls + [f"{hosts['u-1']}/private/{i}" for i in range(5)]
+        allowed, _ = run(robots.can_fetch, checks, args.workers)
+        fetched = {name: recorder.requests[name, "/robots.txt"] for name in HOSTS if name != "retry"}
+        print(f"  robots.txt: 检查 {len(checks)} 个 URL，服务端下载次数 {fetched}；{robots.describe()}")
+        if set(fetched.values()) != {1}:
+            problems.append(f"robots.txt 应每个主机只下载一次: {fetched}")
+        if allowed != [True] * len(urls) + [False] * 5:
+            problems.append("robots.txt 规则判断有误（/private/ 应不允许）")
+
+        again = RobotsCache(session, root=Path(tmp))
+        again.can_fetch(urls[0])
+        expired = RobotsCache(session, root=Path(tmp), ttl=0)
+        expired.can_fetch(urls[0])
+        print(f"  新实例读磁盘: {again.describe()}；ttl 过期: {expired.describe()}")
+        if again.stats["fetched"] != 0 or again.stats["disk"] != 1:
+            problems.append("新的 RobotsCache 应从磁盘读取、不下载")
+        if expired.stats["fetched"] != 1:
+            problems.append("ttl 过期后应重新下载")
+
+    session.close()
+    for server in servers.values():
+        server.shutdown()
+    if problems:
+        for p in problems:
+            print(f"❌ {p}")
+        sys.exit(1)
+    print("✅ 连接按主机复用、503 按退避重试、robots.txt 每个主机只获取一次且磁盘缓存按 ttl 生效")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词提取基准：在一批页面文本上对比旧的 extract_*（每个关键词一次 `in` + 现编 .{0,50}关键词.{0,50} 正则重扫全文）
+与 keyword_scanner.KeywordScanner（一个 Aho-Corasick 自动机一遍扫描、按位置切上下文）的吞吐量，
+并逐页校验两个爬虫（unified_crawler_framework、crawl_classification_info）所有 extract_* 的结果完全相同。
+
+语料：.cache/http/ 中缓存的 HTML 页面（爬取过之后就有）；不足 --pages 页时用关键词与招生页面常见语句
+合成补足（随机换行、关键词相邻 / 重叠、同一关键词多次出现）。另外先用小字母表随机文本对照 re 做一轮模糊校验。
+任一项不一致时退出码为 1。
+
+用法：
+    python3 scripts/benchmarks/bench_keyword_scan.py
+    python3 scripts/benchmarks/bench_keyword_scan.py --pages 500 --size 30000
+"""
+import argparse
+import html
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT / "scripts" / "crawlers"))
+
+import crawl_classification_info as cci  # noqa: E402
+import unified_crawler_framework as ucf  # noqa: E402
+from http_cache import CACHE_DIR  # noqa: E402
+from keyword_scanner import KeywordScanner  # noqa: E402
+
+FILLER = [
+    "外国人留学生を対象とした入学試験の概要は以下のとおりです。",
+    "出願期間 2026年1月5日〜1月16日（必着）",
+    "出願書類は所定の様式により提出してください。",
+    "日本留学試験の受験科目は学部ごとに異なります。",
+    "詳細は募集要項を確認してください。",
+    "Application period: January 5 - 16, 2026",
+    "合格発表 2026年2月20日 10:00",
+]
+
+
+def legacy_contexts(text, keywords):
+    """旧写法：关键词在文本中时现编正则重扫全文，最多取 3 处。"""
+    found = []
+    for keyword in keywords:
+        if keyword in text:
+            pattern = f'.{{0,50}}{re.escape(keyword)}.{{0,50}}'
+            matches = re.findall(pattern, text)
+            found.extend(matches[:3])
+    return found
+
+
+def legacy_unified(text):
+    """unified_crawler_framework 中旧 extract_* 的关键词部分（返回值与新实现的对应字段比较）。"""
+    periods = legacy_contexts(text, ucf.PERIOD_KEYWORDS)
+    methods = legacy_contexts(text, ucf.METHOD_KEYWORDS)
+    recommendation = None
+    if "推荐信" in text or "推薦" in text:
+        matches = re.findall(r'.{0,100}(推荐信|推薦).{0,100}', text)
+        if matches:
+            recommendation = matches[0]
+    english = next((k for k in ("TOEFL", "托福", "TOEIC", "IELTS") if k in text), None)
+    return {
+        "period": (periods[0] if periods else None, list(set(periods))),
+        "method": (methods[0] if methods else None, list(set(methods))),
+        "exam": any(k in text for k in ucf.EXAM_KEYWORDS),
+        "materials": [k for k in ucf.MATERIAL_KEYWORDS if k in text],
+        "recommendation": recommendation,
+        "eju": list(set(k for k in ucf.EJU_KEYWORDS if k in text)),
+        "english": "TOEFL" if english == "托福" else english,
+        "jlpt": ("JLPT" in text or "N1" in text or "N2" in text,
+                 "N1" if "N1" in text else "N2" if "N2" in text else None),
+    }
+
+
+def new_unified(crawler, text):
+    period = crawler.extract_period_info(text, None)
+    method = crawler.extract_selection_method_info(text, None)
+    materials = crawler.extract_application_materials_info(text, None)
+    scores = crawler.extract_score_requirements_info(text, None)
+    return {
+        "period": (period["原始表述"], period["所有可能的表述"]),
+        "method": (method["原始表述"], method["所有可能的表述"]),
+        "exam": crawler.extract_exam_info(text, None)["有无"] == "有",
+        "materials": materials["材料清单"],
+        "recommendation": materials["推荐信要求"],
+        "eju": scores["EJU科目"]["需要的科目"],
+        "english": scores["英语"]["成绩类型"],
+        "jlpt": (scores["JLPT"]["是否需要"] == "要", scores["JLPT"]["等级要求"]),
+    }
+
+
+def legacy_classification(text):
+    return [list(set(legacy_contexts(text, keywords)))
+            for keywords in (cci.PERIOD_KEYWORDS, cci.METHOD_KEYWORDS, cci.EXAM_KEYWORDS, cci.EJU_KEYWORDS)]
+
+
+def new_classification(text):
+    return [cci.extract_period_info(text, None), cci.extract_selection_method_info(text, None),
+            cci.extract_exam_info(text, None), cci.extract_eju_subjects_info(text, None)]
+
+
+def html_to_text(raw):
+    """没有 bs4 时的粗略正文提取：去 script/style 与标签，按行整理（与 extract_text_from_page 相近）。"""
+    raw = re.sub(r"(?is)<(script|style)\b.*?</\1>", " ", raw)
+    raw = html.unescape(re.sub(r"(?s)<[^>]+>", "\n", raw))
+    return "\n".join(line.strip() for line in raw.splitlines() if line.strip())
+
+
+def cached_pages(limit):
+    pages = []
+    for path in sorted((CACHE_DIR / "entries").glob("*.json")):
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            if "html" not in entry["headers"].get("Content-Type", ""):
+                continue
+            raw = (CACHE_DIR / "objects" / entry["sha256"][:2] / entry["sha256"]).read_bytes()
+        except (OSError, ValueError, KeyError):
+            continue
+        pages.append(html_to_text(raw.decode("utf-8", errors="replace")))
+        if len(pages) >= limit:
+            break
+    return pages
+
+
+def synthetic_page(rng, keywords, size):
+    lines, length = [], 0
+    while length < size:
+        parts = [rng.choice(FILLER)]
+        for _ in range(rng.randint(0, 3)):
+            keyword = rng.choice(keywords)
+            # 偶尔让关键词相邻、重叠（前期 + 前期選抜）
+            parts.insert(rng.randint(0, len(parts)), keyword * rng.randint(1, 2))
+        line = "".join(parts) if rng.random() < 0.7 else " ".join(parts)
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+
+def fuzz(rounds, rng):
+    """小字母表随机文本：contexts / spans 与 re.findall / re.finditer 逐条对照。"""
+    for _ in range(rounds):
+        keywords = list({"".join(rng.choice("abc") for _ in range(rng.randint(1, 3))) for _ in range(4)})
+        text = "".join(rng.choice("ab\nc") for _ in range(rng.randint(0, 80)))
+        width = rng.randint(0, 6)
+        scanner = KeywordScanner(keywords)
+        for keyword in keywords:
+            expected = re.findall(f'.{{0,{width}}}{re.escape(keyword)}.{{0,{width}}}', text)
+            if scanner.contexts(text, keyword, width) != expected:
+                return f"contexts({text!r}, {keyword!r}, {width})"
+        alternatives = keywords[:2]
+        pattern = f'.{{0,{width}}}({"|".join(map(re.escape, alternatives))}).{{0,{width}}}'
+        expected = [(m.start(), m.end(), m.group(1)) for m in re.finditer(pattern, text)]
+        if scanner.spans(text, alternatives, width) != expected:
+            return f"spans({text!r}, {alternatives!r}, {width})"
+    return None
+
+
+def timed(fn, pages):
+    start = time.perf_counter()
+    results = [fn(text) for text in pages]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="关键词提取基准（旧正则逐个扫描 vs Aho-Corasick 一遍扫描）")
+    parser.add_argument("--pages", type=int, default=200, help="语料页数（默认 200）")
+    parser.add_argument("--size", type=int, default=20_000, help="合成页面的字符数（默认 20000）")
+    parser.add_argument("--fuzz", type=int, default=2000, help="模糊校验轮数（默认 2000）")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    problem = fuzz(args.fuzz, rng)
+    if problem:
+        print(f"❌ 模糊校验不一致: {problem}")
+        sys.exit(1)
+    print(f"✅ 模糊校验 {args.fuzz} 轮与 re 一致")
+
+    pages = cached_pages(args.pages)
+    cached = len(pages)
+    keywords = sorted(set(ucf.KEYWORD_SCANNER.keywords) | set(cci.KEYWORD_SCANNER.keywords))
+    pages += [synthetic_page(rng, keywords, args.size) for _ in range(args.pages - cached)]
+    chars = sum(len(p) for p in pages)
+    print(f"语料: {len(pages)} 页（缓存 {cached} 页，合成 {len(pages) - cached} 页），共 {chars / 1e6:.1f}M 字符")
+
+    crawler = ucf.UnifiedCrawler()
+    for name, legacy, new in [
+        ("unified_crawler_framework", legacy_unified, lambda text: new_unified(crawler, text)),
+        ("crawl_classification_info", legacy_classification, new_classification),
+    ]:
+        expected, t_legacy = timed(legacy, pages)
+        got, t_new = timed(new, pages)
+        print(f"  {name}: 旧 {t_legacy:.2f}s（{len(pages) / t_legacy:.0f} 页/s），"
+              f"新 {t_new:.2f}s（{len(pages) / t_new:.0f} 页/s，{chars / t_new / 1e6:.1f}M 字符/s），"
+              f"{t_legacy / t_new:.1f}x")
+        wrong = [i for i, (a, b) in enumerate(zip(expected, got)) if a != b]
+        if wrong:
+            print(f"❌ {name}: {len(wrong)} 页结果不一致，例如第 {wrong[0]} 页")
+            sys.exit(1)
+    print(f"✅ 两个爬虫所有 extract_* 在 {len(pages)} 页上的结果与旧实现完全相同")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬取数据去重基准：在合成的主表（默认 3000 行）上对比
+旧版嵌套 iterrows（每个 爬取行 × 主表行 调用 is_duplicate）与哈希连接 find_new_rows 的耗时，
+校验两者判定的新数据一致，并展示哈希连接随爬取行数（默认到 10 万行）线性增长。
+
+用法：
+    python3 scripts/benchmarks/bench_merge_dedup.py
+    python3 scripts/benchmarks/bench_merge_dedup.py --master 3000 --sizes 1000 10000 100000 --legacy-rows 100
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from merge_crawled_data import CRAWL_SPEC  # noqa: E402
+from merge_engine import key_label, merge, row_keys  # noqa: E402
+
+UNIVERSITIES = [f"大学{i:05d}" for i in range(20000)]
+DEPARTMENTS = ["法学部", "経済学部", "文学部", "理学部", "工学部", "商学部", "教育学部", "国際学部"]
+
+
+def make_frame(rows, rng, universities):
+    """合成 学校总览 形状的表；大学名随机带首尾空格，检验键规范化。"""
+    unis = rng.choice(universities, rows)
+    pad = rng.random(rows) < 0.1
+    return pd.DataFrame({
+        "大学": [f" {u} " if p else u for u, p in zip(unis, pad)],
+        "学部": rng.choice(DEPARTMENTS, rows),
+        "学科": rng.choice(["", "情報科学科", "国際関係学科"], rows),
+        "位置": rng.choice(["東京都", "京都府", "大阪府"], rows),
+    }, dtype=object)
+
+
+def dedup_keys(df):
+    """每行规范化后的（大学, 学部）键：转为文本并去首尾空格，空值视为空串；已登记的写法换为规范名。"""
+    return [key_label(key) for key in row_keys(df, CRAWL_SPEC)]
+
+
+def find_new_rows(main_df, crawled_df):
+    """
+    merge_crawled_data 的哈希连接去重（merge_engine.merge + CRAWL_SPEC），整理成与旧版相同的返回值
+
+    Returns:
+        new_df: 需要新增的爬取行（同一键在爬取数据内多次出现时只保留第一次）
+        duplicate_count: 与主表重复的条数
+        batch_duplicates: 新键在爬取数据内部的重复，{键: [行下标, ...]}（第一个为保留的行）
+    """
+    merged_df, report = merge(main_df, crawled_df, CRAWL_SPEC)
+    added = {tuple(item["key"]) for item in report["added"]}
+    batch_duplicates = {
+        tuple(item["key"]): item["rows"] for item in report["incomingDuplicates"] if tuple(item["key"]) in added
+    }
+    return merged_df.iloc[len(main_df):], report["summary"]["matched"], batch_duplicates
+
+
+def legacy_new_rows(main_df, crawled_df):
+    """重构前 merge_data 的嵌套循环，作为正确性与耗时的基线。"""
+    def is_duplicate(row1, row2):
+        return (
+            row1.get("大学", "").strip() == row2.get("大学", "").strip() and
+            row1.get("学部", "").strip() == row2.get("学部", "").strip()
+        )
+
+    new_rows = []
+    for _, crawled_row in crawled_df.iterrows():
+        if not any(is_duplicate(crawled_row.to_dict(), main_row.to_dict()) for _, main_row in main_df.iterrows()):
+            new_rows.append(crawled_row)
+    return new_rows
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="爬取数据去重基准（嵌套循环 vs 哈希连接）")
+    parser.add_argument("--master", type=int, default=3000, help="主表行数（默认 3000）")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="爬取行数")
+    parser.add_argument("--legacy-rows", type=int, default=60, help="旧版只测这么多爬取行，再按线性外推")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    main_df = make_frame(args.master, rng, UNIVERSITIES[:2000])
+
+    # 正确性 + 旧版耗时
+    sample = make_frame(args.legacy_rows, rng, UNIVERSITIES[:4000])
+    sample = pd.concat([sample, sample.head(5)], ignore_index=True)  # 夹带爬取数据内部重复
+    legacy, t_legacy = timed(legacy_new_rows, main_df, sample)
+    (new_df, duplicate_count, batch_duplicates), _ = timed(find_new_rows, main_df, sample)
+    legacy_keys = sorted(dedup_keys(pd.DataFrame(legacy)))
+    # 旧版不识别爬取数据内部的重复，会把同一键的每一行都加入
+    expected = sorted(key for key, rows in batch_duplicates.items() for _ in rows[1:]) + sorted(dedup_keys(new_df))
+    if legacy_keys != sorted(expected) or duplicate_count != len(sample) - len(legacy):
+        print("❌ 哈希连接与嵌套循环的判定不一致")
+        sys.exit(1)
+    per_row = t_legacy / len(sample)
+    print(f"主表 {args.master} 行")
+    print(f"  嵌套循环: {len(sample)} 行 {t_legacy:.2f}s（每行 {per_row * 1000:.1f}ms）")
+    print(f"✅ {len(sample)} 行样本上新数据判定一致（新增 {len(new_df)}，与主表重复 {duplicate_count}，"
+          f"内部重复 {sum(len(r) - 1 for r in batch_duplicates.values())}）")
+
+    # 线性扩展
+    print("  哈希连接:")
+    for size in args.sizes:
+        crawled_df = make_frame(size, rng, UNIVERSITIES)
+        (new_df, duplicate_count, batch_duplicates), t = timed(find_new_rows, main_df, crawled_df)
+        print(f"    {size:>7} 行 {t:.3f}s（每行 {t / size * 1e6:.1f}µs；嵌套循环外推约 {per_row * size:.0f}s）"
+              f"  新增 {len(new_df)}，与主表重复 {duplicate_count}，内部重复 {len(batch_duplicates)} 组")
+
+
+if __name__ == "__main__":
+    main()
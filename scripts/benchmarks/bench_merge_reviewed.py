@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+审核数据合并基准：对比旧版逐条合并（每条审核行重算整表布尔掩码、.at 逐格写入、每条新记录 pd.concat 一次）
+与批量 upsert_reviewed 的耗时，并校验两者的更新数、新增数和合并后的整张表一致。
+
+合成数据覆盖：主表同一 大学+学部 多行、审核表同键多行（含新键）、空白值/纯空格值、学部为空、大学为空。
+
+用法：
+    python3 scripts/benchmarks/bench_merge_reviewed.py                        # 主表 3000 行，审核 1.5 万行（约 1 万行已确认）
+    python3 scripts/benchmarks/bench_merge_reviewed.py --master 3000 --reviewed 20000
+    python3 scripts/benchmarks/bench_merge_reviewed.py --real                 # 用真实主表，全部视为已确认
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from merge_engine import merge  # noqa: E402
+from merge_reviewed_data import MAIN_EXCEL, REVIEW_SPEC  # noqa: E402
+from workbook_cache import read_sheet  # noqa: E402
+
+DEPARTMENTS = ["法学部", "経済学部", "文学部", "理学部", "工学部"]
+
+
+def upsert_reviewed(df_main, df_confirmed):
+    """
+    merge_reviewed_data 的批量 upsert（merge_engine.merge + REVIEW_SPEC），返回与旧版相同的 (merged_df, 更新数, 新增数)
+
+    与逐条处理的结果一致：同键审核行中每列取最后一个非空值写入主表该键的每一行；
+    新键第一条整行追加，同键后续行再覆盖；学部为空的审核行每行单独追加。
+    """
+    merged_df, report = merge(df_main, df_confirmed, REVIEW_SPEC)
+    return merged_df, report["summary"]["updated"], report["summary"]["added"]
+
+
+def make_frames(master_rows, reviewed_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    n_unis = max(1, master_rows // 6)
+
+    def text(samples, rows):
+        return pd.Series([samples[i] for i in rng.integers(0, len(samples), rows)], dtype=object)
+
+    df_main = pd.DataFrame({
+        "大学": pd.Series([f"大学{i:05d}" for i in rng.integers(0, n_unis, master_rows)], dtype=object),
+        "学部": text(DEPARTMENTS, master_rows),
+        "学科": text(["情報科学科", "国際関係学科", None], master_rows),
+        "英语": text(["要", "不要", None], master_rows),
+        "推荐日语分数": pd.Series(rng.integers(200, 400, master_rows).astype(float)),
+        "校内考时间1": pd.Series(np.datetime64("2026-01-10") + rng.integers(0, 60, master_rows).astype("timedelta64[D]")),
+        "其他备注": text(["", "需推荐信", None], master_rows),
+    })
+    # 审核表：约一半为已有的大学，其余为新大学；审核表独有的列不会写入主表
+    uni_ids = rng.integers(0, n_unis * 2, reviewed_rows)
+    df_reviewed = pd.DataFrame({
+        "大学": pd.Series([f"大学{i:05d}" for i in uni_ids], dtype=object),
+        "学部": text(DEPARTMENTS + [None], reviewed_rows),
+        "学科": text(["情報科学科", "  ", "", None, "新学科"], reviewed_rows),
+        "英语": text(["要", "不要", None], reviewed_rows),
+        "推荐日语分数": pd.Series(np.where(rng.random(reviewed_rows) < 0.5, np.nan, rng.integers(200, 400, reviewed_rows))),
+        "校内考时间1": pd.Series(np.datetime64("2026-02-01") + rng.integers(0, 30, reviewed_rows).astype("timedelta64[D]")),
+        "审核状态": text(["已审核", "已确认", "需修改"], reviewed_rows),
+        "审核备注": text(["ok", None], reviewed_rows),
+    })
+    df_reviewed.loc[rng.random(reviewed_rows) < 0.01, "大学"] = None
+    df_reviewed.loc[rng.random(reviewed_rows) < 0.1, "校内考时间1"] = pd.NaT
+    return df_main, df_reviewed
+
+
+def legacy_upsert(df_main, df_confirmed):
+    """重构前 merge_reviewed_data 的逐条合并，作为正确性与耗时的基线。"""
+    main_columns = list(df_main.columns)
+    merged_df = df_main.copy()
+    update_count = 0
+    add_count = 0
+    for _, reviewed_row in df_confirmed.iterrows():
+        uni = reviewed_row.get("大学", "")
+        dept = reviewed_row.get("学部", "")
+        if not uni or pd.isna(uni):
+            continue
+        mask = (merged_df["大学"] == uni) & (merged_df["学部"] == dept)
+        matching_rows = merged_df[mask]
+        if len(matching_rows) > 0:
+            for idx in matching_rows.index:
+                for col in main_columns:
+                    if col in reviewed_row.index:
+                        reviewed_val = reviewed_row[col]
+                        if pd.notna(reviewed_val) and str(reviewed_val).strip():
+                            merged_df.at[idx, col] = reviewed_val
+                update_count += 1
+        else:
+            new_row = {}
+            for col in main_columns:
+                if col in reviewed_row.index:
+                    new_row[col] = reviewed_row[col]
+                else:
+                    new_row[col] = ""
+            merged_df = pd.concat([merged_df, pd.DataFrame([new_row])], ignore_index=True)
+            add_count += 1
+    return merged_df, update_count, add_count
+
+
+def cells(df):
+    """逐格取值（空值统一为 None），忽略列类型差异。"""
+    return [[None if pd.isna(v) else v for v in row] for row in df.astype(object).itertuples(index=False)]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="审核数据合并基准（逐条 vs 批量 upsert）")
+    parser.add_argument("--master", type=int, default=3000, help="合成主表行数（默认 3000）")
+    parser.add_argument("--reviewed", type=int, default=15000, help="合成审核表行数（默认 15000，约 1 万行为已确认）")
+    parser.add_argument("--real", action="store_true", help="用真实主表作为主表与审核表（全部视为已确认）")
+    parser.add_argument("--skip-legacy", action="store_true", help="只测批量版")
+    args = parser.parse_args()
+
+    if args.real:
+        df_main = read_sheet(MAIN_EXCEL, "学校总览")
+        df_confirmed = df_main.copy()
+    else:
+        df_main, df_reviewed = make_frames(args.master, args.reviewed)
+        df_confirmed = df_reviewed[df_reviewed["审核状态"].isin(["已审核", "已确认"])].copy()
+    print(f"主表 {len(df_main)} 行，已确认审核行 {len(df_confirmed)} 行")
+
+    (merged, updates, adds), t_new = timed(upsert_reviewed, df_main, df_confirmed)
+    print(f"  批量版: {t_new:.3f}s（更新 {updates}，新增 {adds}，合并后 {len(merged)} 行）")
+    if args.skip_legacy:
+        return
+    (old_merged, old_updates, old_adds), t_old = timed(legacy_upsert, df_main, df_confirmed)
+    print(f"  逐条版: {t_old:.3f}s（更新 {old_updates}，新增 {old_adds}）")
+    print(f"  加速比: {t_old / t_new:.1f}x")
+    if (updates, adds) != (old_updates, old_adds) or list(merged.columns) != list(old_merged.columns) \
+            or cells(merged) != cells(old_merged):
+        print("❌ 合并结果不一致")
+        sys.exit(1)
+    print("✅ 更新数、新增数与合并后的整张表一致")
+
+
+if __name__ == "__main__":
+    main()
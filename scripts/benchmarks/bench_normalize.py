@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+名称规范化基准：在合成的 合格实绩 导出（默认 10 万行）上对比
+逐行版（旧 normalize_university_name：两次正则 + 映射表精确查找）与
+整列版（name_normalizer.normalize_series + EntityRegistry.resolve_pairs）的耗时与解析率。
+
+合成数据取登记表中的大学 / 学部，随机改写为简体字、全角字母、夹空格、带括号备注等写法；
+整列版必须把每一行解析回原来的编号，并与逐个调用 normalize_name 的结果一致。
+
+用法：
+    python3 scripts/benchmarks/bench_normalize.py
+    python3 scripts/benchmarks/bench_normalize.py --rows 20000
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd  # noqa: F401  先导入，不计入 normalize_series 的耗时
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from entity_registry import EntityRegistry  # noqa: E402
+from name_normalizer import TRANSLATION, normalize_name, normalize_series  # noqa: E402
+
+# 新字体 → 一个简体 / 繁体写法，用于合成变体
+_REVERSE = {}
+for _code, _target in TRANSLATION.items():
+    _REVERSE.setdefault(ord(_target), chr(_code))
+_FULLWIDTH = {c: c + 0xFEE0 for c in range(0x21, 0x7F)}
+NOTES = ["（指定校推荐）", "(後期)", "（自己推薦）"]
+
+
+def variant(name, rng):
+    """随机改写一个名称。"""
+    kind = rng.integers(5)
+    if kind == 1:
+        return name.translate(_REVERSE)
+    if kind == 2:
+        return name.translate(_FULLWIDTH)
+    if kind == 3:
+        cut = int(rng.integers(1, max(len(name), 2)))
+        return f" {name[:cut]} {name[cut:]}"
+    if kind == 4 and "(" not in name and "（" not in name:
+        # 去括号备注时名称自带的括号也会去掉，只给不带括号的名称加备注
+        return name + NOTES[rng.integers(len(NOTES))]
+    return name
+
+
+def make_rows(registry, rows, rng):
+    departments = list(registry.departments.values())
+    picks = rng.integers(len(departments), size=rows)
+    universities, names, expected = [], [], []
+    for i in picks:
+        dept = departments[i]
+        university = registry.university_name(dept["universityId"])
+        universities.append(variant(university, rng))
+        names.append(variant(dept["name"], rng))
+        expected.append((dept["universityId"], dept["id"]))
+    return universities, names, expected
+
+
+def legacy_lookup_table(registry):
+    """旧实现的映射表：登记表中逐字记录的写法 → 规范名。"""
+    table = {}
+    for entry in registry.universities.values():
+        for name in [entry["name"], *entry["variants"]]:
+            table[name] = entry["name"]
+    return table
+
+
+def legacy_normalize(names, table):
+    """旧 normalize_university_name：每次调用都跑两次正则，再查映射表。"""
+    out = []
+    for name in names:
+        name = name.strip()
+        name = re.sub(r'\([^)]*\)', '', name).strip()
+        name = re.sub(r'大学院$', '大学', name)
+        out.append(table.get(name))
+    return out
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="名称规范化基准（逐行 vs 整列）")
+    parser.add_argument("--rows", type=int, default=100_000, help="合成行数（默认 100000）")
+    args = parser.parse_args()
+
+    registry = EntityRegistry.load()
+    rng = np.random.default_rng(0)
+    universities, departments, expected = make_rows(registry, args.rows, rng)
+    print(f"合成数据: {args.rows} 行（{len(set(universities))} 种大学写法，{len(set(departments))} 种学部写法）")
+
+    legacy, t_legacy = timed(legacy_normalize, universities, legacy_lookup_table(registry))
+    resolved = sum(v is not None for v in legacy)
+    print(f"  逐行版（正则 + 映射表）: {t_legacy:.3f}s，大学解析 {resolved}/{args.rows}（{resolved / args.rows:.1%}）")
+
+    normalize_name.cache_clear()
+    keys, t_keys = timed(normalize_series, universities)
+    print(f"  整列规范化 normalize_series: {t_keys:.3f}s")
+    normalize_name.cache_clear()
+    (uids, dids), t_resolve = timed(registry.resolve_pairs, universities, departments)
+    print(f"  整列解析 resolve_pairs（含两列规范化）: {t_resolve:.3f}s")
+
+    if keys.tolist() != [normalize_name(v) for v in universities]:
+        print("❌ 整列规范化与逐个 normalize_name 的结果不一致")
+        sys.exit(1)
+    wrong = [(u, d, e) for u, d, e, got in zip(universities, departments, expected, zip(uids, dids)) if got != e]
+    if wrong:
+        print(f"❌ {len(wrong)} 行未解析回原编号，例如: {wrong[:5]}")
+        sys.exit(1)
+    print(f"✅ {args.rows} 行全部解析回原来的大学、学部编号")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,41 +3,71 @@
 """
 爬取各大学官网的期数和选考方式分类信息
 目标：收集所有大学官网的实际表述，为建立标准分类体系提供数据基础
+
+探测招生页面时先查 http_cache.HttpCache（.cache/http/，与 unified_crawler_framework 共用）：不联网就能判断的
+（仍新鲜的缓存，或离线模式）直接采用，其余只发 HEAD，不下载正文。
+页面文本中的各类关键词由 keyword_scanner.KeywordScanner 一遍扫描找出，再直接切出上下文。
+robots.txt 经 http_session.ROBOTS 按主机缓存（本轮只获取一次，.cache/robots/ 中 1 天内有效）；
+请求都走 http_session 的共享会话，同一大学的请求复用连接，robots 规则也按同一个 User-Agent 判断。
+环境变量 CRAWL_OFFLINE=1 时只用缓存、不联网。
 """
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
 from pathlib import Path
 import json
 import time
-import re
 from datetime import datetime
 from collections import defaultdict
-from urllib.parse import urljoin, urlparse
-from urllib.robotparser import RobotFileParser
+from urllib.parse import urljoin
+
+from http_cache import HttpCache
+from http_session import HEADERS, ROBOTS, SESSION
+from keyword_scanner import KeywordScanner
 
 # 文件路径
 CSV_PATH = Path(__file__).parent.parent.parent / "学校总览.csv"
 OUTPUT_DIR = Path(__file__).parent.parent.parent / "crawled_data" / "classification_info"
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-# 请求配置
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-}
-
 # 延迟配置（避免对服务器造成压力）
 REQUEST_DELAY = 2  # 秒
 
+# 磁盘 HTTP 缓存（与 unified_crawler_framework 共用 .cache/http/）
+HTTP_CACHE = HttpCache()
+
+# 各类别的关键词（上下文提取见 _keyword_contexts）
+PERIOD_KEYWORDS = [
+    "前期", "後期", "後期", "第1期", "第2期", "第3期", "第4期",
+    "第一期", "第二期", "第三期", "第四期",
+    "Ⅰ期", "Ⅱ期", "Ⅲ期", "Ⅳ期",
+    "A方式", "B方式", "C方式",
+    "前期選抜", "後期選抜", "単独選抜",
+    "渡日前", "2月実施", "3月実施"
+]
+METHOD_KEYWORDS = [
+    "外国人入試", "外国人特別選抜", "外国人選抜",
+    "一般入試", "一般選抜",
+    "推薦入試", "推薦選抜", "学校推薦",
+    "AO入試", "AO選抜",
+    "総合型選抜", "総合評価型",
+    "EJU利用", "EJU利用型",
+    "校内考", "書類選考", "面接"
+]
+EXAM_KEYWORDS = [
+    "校内考", "校内試験", "面接", "小論文", "筆記試験",
+    "一次選考", "二次選考", "第一次", "第二次",
+    "書類選考のみ", "純書類"
+]
+EJU_KEYWORDS = [
+    "EJU", "日本留学試験", "日本語", "数学", "数学コース1", "数学コース2",
+    "総合科目", "物理", "化学", "生物", "理科"
+]
+# 所有类别的关键词放进一个自动机：每页一遍扫描
+KEYWORD_SCANNER = KeywordScanner([*PERIOD_KEYWORDS, *METHOD_KEYWORDS, *EXAM_KEYWORDS, *EJU_KEYWORDS])
+
 def check_robots_txt(url):
-    """检查robots.txt"""
+    """检查robots.txt（每个主机只获取一次）；按实际发请求的 User-Agent（http_session.HEADERS）判断"""
     try:
-        parsed = urlparse(url)
-        robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
-        rp = RobotFileParser()
-        rp.set_url(robots_url)
-        rp.read()
-        return rp.can_fetch(HEADERS['User-Agent'], url)
+        return ROBOTS.can_fetch(url, HEADERS['User-Agent'])
     except:
         return True  # 如果无法读取robots.txt，默认允许
 
@@ -84,95 +114,43 @@ def find_admission_page_url(university_name, base_url=None):
     for path in common_paths:
         url = urljoin(base_url, path)
         try:
-            response = requests.head(url, headers=HEADERS, timeout=5)
-            if response.status_code == 200:
+            # 缓存中已有（仍新鲜，或离线模式）时不联网；否则只发 HEAD 探测，不下载正文
+            cached = HTTP_CACHE.lookup(url)
+            if cached is not None:
+                if cached.ok:
+                    return url
+                continue
+            if SESSION.head(url, timeout=5).status == 200:
                 return url
         except:
             continue
     
     return None
 
+def _keyword_contexts(text, keywords):
+    """每个出现的关键词取最多3处前后各50字的上下文，去重"""
+    hits = KEYWORD_SCANNER.find(text)
+    found = []
+    for keyword in keywords:
+        if keyword in hits:
+            found.extend(KEYWORD_SCANNER.contexts(text, keyword, limit=3))  # 最多保存3个匹配
+    return list(set(found))  # 去重
+
 def extract_period_info(text, soup):
     """提取期数相关信息"""
-    period_keywords = [
-        "前期", "後期", "後期", "第1期", "第2期", "第3期", "第4期",
-        "第一期", "第二期", "第三期", "第四期",
-        "Ⅰ期", "Ⅱ期", "Ⅲ期", "Ⅳ期",
-        "A方式", "B方式", "C方式",
-        "前期選抜", "後期選抜", "単独選抜",
-        "渡日前", "2月実施", "3月実施"
-    ]
-    
-    found_periods = []
-    text_lower = text.lower()
-    
-    # 查找包含期数关键词的句子
-    for keyword in period_keywords:
-        if keyword in text:
-            # 尝试提取包含关键词的句子
-            pattern = f'.{{0,50}}{re.escape(keyword)}.{{0,50}}'
-            matches = re.findall(pattern, text)
-            found_periods.extend(matches[:3])  # 最多保存3个匹配
-    
-    return list(set(found_periods))  # 去重
+    return _keyword_contexts(text, PERIOD_KEYWORDS)
 
 def extract_selection_method_info(text, soup):
     """提取选考方式相关信息"""
-    method_keywords = [
-        "外国人入試", "外国人特別選抜", "外国人選抜",
-        "一般入試", "一般選抜",
-        "推薦入試", "推薦選抜", "学校推薦",
-        "AO入試", "AO選抜",
-        "総合型選抜", "総合評価型",
-        "EJU利用", "EJU利用型",
-        "校内考", "書類選考", "面接"
-    ]
-    
-    found_methods = []
-    text_lower = text.lower()
-    
-    for keyword in method_keywords:
-        if keyword in text:
-            pattern = f'.{{0,50}}{re.escape(keyword)}.{{0,50}}'
-            matches = re.findall(pattern, text)
-            found_methods.extend(matches[:3])
-    
-    return list(set(found_methods))
+    return _keyword_contexts(text, METHOD_KEYWORDS)
 
 def extract_exam_info(text, soup):
     """提取校内考相关信息"""
-    exam_keywords = [
-        "校内考", "校内試験", "面接", "小論文", "筆記試験",
-        "一次選考", "二次選考", "第一次", "第二次",
-        "書類選考のみ", "純書類"
-    ]
-    
-    found_exams = []
-    
-    for keyword in exam_keywords:
-        if keyword in text:
-            pattern = f'.{{0,50}}{re.escape(keyword)}.{{0,50}}'
-            matches = re.findall(pattern, text)
-            found_exams.extend(matches[:3])
-    
-    return list(set(found_exams))
+    return _keyword_contexts(text, EXAM_KEYWORDS)
 
 def extract_eju_subjects_info(text, soup):
     """提取EJU科目相关信息"""
-    eju_keywords = [
-        "EJU", "日本留学試験", "日本語", "数学", "数学コース1", "数学コース2",
-        "総合科目", "物理", "化学", "生物", "理科"
-    ]
-    
-    found_eju = []
-    
-    for keyword in eju_keywords:
-        if keyword in text:
-            pattern = f'.{{0,50}}{re.escape(keyword)}.{{0,50}}'
-            matches = re.findall(pattern, text)
-            found_eju.extend(matches[:3])
-    
-    return list(set(found_eju))
+    return _keyword_contexts(text, EJU_KEYWORDS)
 
 def crawl_university_info(university_name, department_name=None):
     """
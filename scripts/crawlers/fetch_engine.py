@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步抓取引擎：不同大学的网站并行抓取，同一网站仍按礼貌间隔逐个请求
+
+原来的爬虫逐条 requests.get，每个学部之后统一 time.sleep(2)：3000 行要一个半小时以上，
+而请求其实分散在几百个大学网站上。FetchEngine 用 asyncio 调度：
+
+- 全局并发上限（concurrency，默认 8）：同时进行的请求数
+- 按主机（URL 的 host:port）礼貌限速：同一主机同一时刻最多 per_host 个请求（默认 1），
+  相邻两次请求的开始时间至少相隔 host_delay 秒（默认 REQUEST_DELAY = 2）；
+  等待间隔时不占全局名额，其他主机照常抓取
+- 同一主机连续失败（连接错误、超时、5xx）达到 max_host_failures 次后，该主机剩下的 URL 直接记为失败，
+  不再拖慢整轮抓取
+- 实际请求是阻塞的 fetch 函数，在线程池中运行：默认经 http_session.SESSION（按主机复用 keep-alive 连接、
+  连接错误与 429 / 5xx 按退避重试；requests 未安装时退回标准库 http.client）；
+  可传入自定义 fetch（如 http_cache.HttpCache.fetch）；lookup 能直接给出结果的 URL（缓存仍新鲜、离线模式）
+  不发请求，也不占礼貌间隔
+
+结果按输入顺序返回 FetchResult（url、status、content、headers、error、elapsed、started）。
+本地模拟慢速 / 失败主机的测试见 scripts/benchmarks/bench_crawl_engine.py。
+
+用法：
+    engine = FetchEngine(concurrency=8, host_delay=2)
+    results = engine.run(urls)                  # 同步入口，内部 asyncio.run
+    results = await engine.fetch_all(urls)      # 已在事件循环中时
+"""
+import asyncio
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+
+from http_session import HEADERS, REQUEST_DELAY, SESSION, TIMEOUT  # noqa: F401  HEADERS 供调用方沿用
+
+
+class FetchResult:
+    """一次抓取的结果；error 不为 None 时表示连接失败、超时或被跳过（status 为 None）。"""
+
+    def __init__(self, url, status=None, content=b"", headers=None, error=None, elapsed=0.0, started=None):
+        self.url = url
+        self.status = status
+        self.content = content
+        # 响应头名统一为首字母大写（"etag" / "ETag" → "Etag"），HTTP/2 返回的小写头也能按名查找
+        self.headers = {str(k).title(): v for k, v in dict(headers or {}).items()}
+        self.error = error
+        self.elapsed = elapsed
+        self.started = started
+
+    @property
+    def ok(self):
+        return self.error is None and self.status == 200
+
+    def __repr__(self):
+        return f"FetchResult({self.url!r}, status={self.status}, error={self.error!r})"
+
+
+def default_fetch(url, timeout=TIMEOUT, headers=None, session=None):
+    """经共享会话（默认 http_session.SESSION）阻塞抓取一个 URL；HTTP 错误码（含 304）照常返回，不抛异常。
+
+    headers 追加到默认请求头（如条件请求的 If-None-Match）。"""
+    response = (session or SESSION).get(url, headers=headers, timeout=timeout)
+    return FetchResult(url, response.status, response.content, response.headers)
+
+
+def host_key(url):
+    return urlsplit(url).netloc.lower()
+
+
+def normalize_url(url):
+    """去重用的 URL：协议与主机小写、去掉 #片段、空路径补 /（同一页面的不同写法只抓取一次）。"""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", parts.query, ""))
+
+
+class HostState:
+    """一个主机的礼貌限速状态：并发名额、下次允许开始请求的时刻、连续失败次数。"""
+
+    def __init__(self, per_host):
+        self.slots = asyncio.Semaphore(per_host)
+        self.lock = asyncio.Lock()
+        self.next_start = 0.0
+        self.failures = 0
+
+
+class FetchEngine:
+    """按主机礼貌限速的并行抓取（见模块说明）。"""
+
+    def __init__(self, concurrency=8, host_delay=REQUEST_DELAY, per_host=1, max_host_failures=3,
+                 fetch=default_fetch, on_result=None, lookup=None):
+        self.concurrency = concurrency
+        self.host_delay = host_delay
+        self.per_host = per_host
+        self.max_host_failures = max_host_failures
+        self.fetch = fetch
+        # lookup(url) 返回 FetchResult 时直接使用、不发请求，也不占礼貌间隔（如 http_cache 中仍新鲜的页面）
+        self.lookup = lookup
+        self.on_result = on_result  # 每完成一个 URL 调用一次 on_result(index, result)，在事件循环线程中
+        self.stats = defaultdict(int)
+
+    async def _acquire(self, host, state):
+        """等到该主机的礼貌间隔到期、并拿到全局名额；返回实际开始时刻。"""
+        loop = asyncio.get_running_loop()
+        async with state.lock:
+            wait = state.next_start - loop.time()
+            if wait > 0:
+                self.stats["politeWaits"] += 1
+                await asyncio.sleep(wait)
+            await self.slots.acquire()
+            started = loop.time()
+            state.next_start = started + self.host_delay
+        return started
+
+    async def _fetch_one(self, index, url, states, executor):
+        result = self.lookup(url) if self.lookup else None
+        if result is not None:
+            self.stats["fromCache"] += 1
+            if self.on_result:
+                self.on_result(index, result)
+            return result
+        host = host_key(url)
+        state = states[host]
+        async with state.slots:
+            if self.max_host_failures and state.failures >= self.max_host_failures:
+                self.stats["skipped"] += 1
+                result = FetchResult(url, error=f"主机 {host} 连续失败 {state.failures} 次，已跳过")
+            else:
+                started = await self._acquire(host, state)
+                loop = asyncio.get_running_loop()
+                try:
+                    result = await loop.run_in_executor(executor, self.fetch, url)
+                except Exception as e:  # 连接错误、超时等
+                    result = FetchResult(url, error=f"{type(e).__name__}: {e}")
+                finally:
+                    self.slots.release()
+                result.started = time.time() - (loop.time() - started)
+                result.elapsed = loop.time() - started
+                failed = result.error is not None or (result.status or 0) >= 500
+                state.failures = state.failures + 1 if failed else 0
+                self.stats["failed" if failed else "fetched"] += 1
+        if self.on_result:
+            self.on_result(index, result)
+        return result
+
+    async def fetch_all(self, urls):
+        """并行抓取 urls，按输入顺序返回 FetchResult 列表。"""
+        self.slots = asyncio.Semaphore(self.concurrency)
+        states = defaultdict(lambda: HostState(self.per_host))
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            tasks = [self._fetch_one(i, url, states, executor) for i, url in enumerate(urls)]
+            return await asyncio.gather(*tasks)
+
+    def run(self, urls):
+        return asyncio.run(self.fetch_all(list(urls)))
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫共用的磁盘 HTTP 缓存（.cache/http/）：重新爬取时大多只需一次 304 往返，离线时完全不联网
+
+募集要項页面和 PDF 一年才改一次，每轮爬取却都从头下载。HttpCache.fetch(url)：
+- 正文按 sha256 存放在 objects/ 下（内容相同的页面只存一份），每个 URL 一个小 JSON 记录
+  （entries/<url 的 sha1>.json）：状态、正文哈希、ETag、Last-Modified、Cache-Control、上次校验时间
+- Cache-Control: max-age（或 Expires）内仍新鲜的页面直接从缓存返回，不发请求；
+  no-cache 每次都校验；no-store 不缓存
+- 过期的页面发条件请求（If-None-Match / If-Modified-Since），服务器回 304 时用缓存的正文，只更新校验时间
+- 只缓存 200 响应；连接失败时有缓存则退回缓存（X-Cache: stale）
+- 离线模式（offline=True，或环境变量 CRAWL_OFFLINE=1）：只读缓存，没有缓存的 URL 返回错误，不联网
+
+返回的 FetchResult 在 headers["X-Cache"] 中标明来源：hit / revalidated / miss / stale / offline。
+每个记录单独原子写入，fetch_engine 的多个线程可以同时使用同一个 HttpCache。
+
+用法：
+    cache = HttpCache()
+    page = cache.fetch(url)
+    engine = FetchEngine(fetch=cache.fetch, lookup=cache.lookup)
+
+    python3 scripts/crawlers/http_cache.py stats      # 记录数、正文数与占用空间
+    python3 scripts/crawlers/http_cache.py gc         # 删除没有记录引用的正文
+    python3 scripts/crawlers/http_cache.py clear
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+from fetch_engine import FetchResult, default_fetch, normalize_url
+
+CACHE_DIR = Path(__file__).resolve().parent.parent.parent / ".cache" / "http"
+# 随正文一起保存、从缓存返回时带上的响应头
+KEPT_HEADERS = ("Content-Type", "Etag", "Last-Modified", "Cache-Control", "Expires", "Date")
+_MAX_AGE = re.compile(r"(?:^|,)\s*max-age\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+
+def parse_cache_control(headers):
+    """返回 (no_store, no_cache, max_age 秒数或 None)；没有 max-age 时按 Expires - Date 计算。"""
+    value = headers.get("Cache-Control") or ""
+    directives = {d.strip().split("=")[0].lower() for d in value.split(",") if d.strip()}
+    match = _MAX_AGE.search(value)
+    max_age = int(match.group(1)) if match else None
+    if max_age is None and headers.get("Expires"):
+        try:
+            expires = parsedate_to_datetime(headers["Expires"]).timestamp()
+            date = parsedate_to_datetime(headers["Date"]).timestamp() if headers.get("Date") else time.time()
+            max_age = max(0, int(expires - date))
+        except (TypeError, ValueError):
+            max_age = 0  # 无法解析的 Expires 视为已过期
+    return "no-store" in directives, "no-cache" in directives, max_age
+
+
+class HttpCache:
+    """按 URL 记录校验信息、按内容哈希存正文的 HTTP 缓存（见模块说明）。"""
+
+    def __init__(self, root=CACHE_DIR, offline=None, fetch=default_fetch):
+        self.root = Path(root)
+        self.offline = os.environ.get("CRAWL_OFFLINE") == "1" if offline is None else offline
+        self._fetch = fetch  # 实际发请求的函数 fetch(url, headers=...)
+        self.lock = threading.Lock()
+        self.stats = {"hit": 0, "revalidated": 0, "miss": 0, "stale": 0, "offline": 0, "uncached": 0}
+
+    # ---------- 存储 ----------
+
+    def entry_path(self, url):
+        return self.root / "entries" / f"{hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()}.json"
+
+    def object_path(self, digest):
+        return self.root / "objects" / digest[:2] / digest
+
+    def load_entry(self, url):
+        try:
+            return json.loads(self.entry_path(url).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _write_atomic(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _save(self, url, page, entry=None):
+        """保存 200 响应（entry 为已有记录时沿用其正文，只更新校验信息）。"""
+        headers = {k: page.headers[k] for k in KEPT_HEADERS if page.headers.get(k)}
+        if entry is None:
+            digest = hashlib.sha256(page.content).hexdigest()
+            if not self.object_path(digest).exists():
+                self._write_atomic(self.object_path(digest), page.content)
+            entry = {"url": normalize_url(url), "status": page.status, "sha256": digest, "size": len(page.content),
+                     "fetchedAt": time.time()}
+        else:
+            # 304 只带部分响应头：沿用原来的，新给出的覆盖
+            headers = {**entry["headers"], **headers}
+        no_store, no_cache, max_age = parse_cache_control(headers)
+        entry.update(headers=headers, validatedAt=time.time(), maxAge=max_age, noCache=no_cache)
+        self._write_atomic(self.entry_path(url), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+        return entry
+
+    def _cached(self, url, entry, source):
+        """用缓存的正文组成 FetchResult；正文文件丢失时返回 None。"""
+        try:
+            content = self.object_path(entry["sha256"]).read_bytes()
+        except OSError:
+            return None
+        self._count(source)
+        return FetchResult(url, entry["status"], content, {**entry["headers"], "X-Cache": source})
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    # ---------- 查询 ----------
+
+    def is_fresh(self, entry, now=None):
+        if entry.get("noCache") or entry.get("maxAge") is None:
+            return False
+        return (now or time.time()) - entry["validatedAt"] < entry["maxAge"]
+
+    def lookup(self, url):
+        """不联网就能给出结果时返回 FetchResult（仍新鲜的缓存；离线模式下的缓存或「未缓存」错误），否则返回 None。"""
+        entry = self.load_entry(url)
+        if self.offline:
+            result = self._cached(url, entry, "offline") if entry else None
+            if result is None:
+                self._count("uncached")
+                result = FetchResult(url, error="离线模式：缓存中没有这个页面")
+            return result
+        if entry and self.is_fresh(entry):
+            return self._cached(url, entry, "hit")
+        return None
+
+    def fetch(self, url):
+        """经缓存抓取 url：新鲜则直接返回，过期则条件请求，304 时用缓存正文。"""
+        result = self.lookup(url)
+        if result is not None:
+            return result
+        entry = self.load_entry(url)
+        conditional = {}
+        if entry:
+            if entry["headers"].get("Etag"):
+                conditional["If-None-Match"] = entry["headers"]["Etag"]
+            if entry["headers"].get("Last-Modified"):
+                conditional["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        try:
+            page = self._fetch(url, headers=conditional)
+        except Exception:
+            stale = self._cached(url, entry, "stale") if entry else None
+            if stale is None:
+                raise
+            return stale
+        if page.status == 304 and entry:
+            entry = self._save(url, page, entry)
+            result = self._cached(url, entry, "revalidated")
+            if result is not None:
+                return result
+            # 正文文件丢失：去掉条件重新下载
+            page = self._fetch(url)
+        if page.status == 200 and not parse_cache_control(page.headers)[0]:
+            self._save(url, page)
+        self._count("miss")
+        page.headers["X-Cache"] = "miss"
+        return page
+
+    def describe(self):
+        total = sum(self.stats.values())
+        if not total:
+            return "HTTP 缓存未使用"
+        parts = {"hit": "新鲜命中", "revalidated": "304 校验", "miss": "下载", "stale": "联网失败用旧缓存",
+                 "offline": "离线命中", "uncached": "离线未缓存"}
+        return "HTTP 缓存: " + "，".join(f"{label} {self.stats[k]}" for k, label in parts.items() if self.stats[k])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="爬虫 HTTP 缓存")
+    parser.add_argument("--dir", type=Path, default=CACHE_DIR, help=f"缓存目录（默认 {CACHE_DIR}）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="记录数、正文数与占用空间")
+    sub.add_parser("gc", help="删除没有记录引用的正文")
+    sub.add_parser("clear", help="清空缓存")
+    args = parser.parse_args(argv)
+
+    entries = sorted((args.dir / "entries").glob("*.json"))
+    objects = sorted(p for p in (args.dir / "objects").glob("*/*") if p.is_file())
+    if args.command == "stats":
+        size = sum(p.stat().st_size for p in objects)
+        print(f"📊 {args.dir}: {len(entries)} 个 URL，{len(objects)} 份正文，{size / 1024 / 1024:.1f}MB")
+    elif args.command == "gc":
+        used = set()
+        for path in entries:
+            try:
+                used.add(json.loads(path.read_text(encoding="utf-8"))["sha256"])
+            except (OSError, ValueError, KeyError):
+                path.unlink(missing_ok=True)
+        removed = [p for p in objects if p.name not in used]
+        for path in removed:
+            path.unlink()
+        print(f"✅ 删除 {len(removed)} 份未引用的正文")
+    elif args.command == "clear":
+        shutil.rmtree(args.dir, ignore_errors=True)
+        print(f"✅ 已清空 {args.dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫共用的 HTTP 会话层：按主机复用连接（keep-alive）、失败按退避重试，以及按主机缓存的 robots.txt
+
+原来每次 requests.get / requests.head 都新建一次 TCP + TLS 连接，同一所大学的几十个请求各握手一次；
+check_robots_txt 每检查一个 URL 就重新下载、解析一次 robots.txt。现在：
+
+- HttpSession.get(url)：requests 可用时用一个共享的 requests.Session（HTTPAdapter 按主机维护连接池，
+  pool_connections 个主机、每主机最多 pool_maxsize 条连接）；未安装 requests 时退回标准库 http.client，
+  同样按 (协议, 主机) 保留空闲的 keep-alive 连接。服务器关闭了空闲连接时自动换新连接重发一次
+- 连接错误、超时与 429 / 5xx 响应最多重试 retries 次（默认 2），等待 backoff、2×backoff……秒
+  （默认 REQUEST_DELAY，不比礼貌间隔更频繁），服务器给出 Retry-After 时按它等待（最多 MAX_BACKOFF 秒）；
+  重试用尽后照常返回最后的响应或抛出异常
+- 跟随重定向（最多 MAX_REDIRECTS 次），HTTP 错误码照常返回、不抛异常
+- RobotsCache：robots.txt 按主机（协议 + host:port）在本轮内存中只下载、解析一次，
+  并写入 .cache/robots/ 供之后的运行在 ttl（默认 1 天）内直接使用；同一主机的并发检查只下载一次。
+  与 RobotFileParser.read 相同：401 / 403 视为全部禁止，其他 4xx 视为全部允许；
+  5xx 本轮视为全部禁止、连不上本轮视为全部允许，这两种不写入磁盘，下次运行重新获取
+
+SESSION / ROBOTS 是模块级共享实例，fetch_engine.default_fetch 与各爬虫都经它们发请求。
+
+用法：
+    from http_session import ROBOTS, SESSION
+    response = SESSION.get(url)            # HttpResponse(status, content, headers, url)
+    if ROBOTS.can_fetch(url): ...
+
+    python3 scripts/crawlers/http_session.py robots https://www.u-tokyo.ac.jp/ja/admissions/
+"""
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+# 可选依赖
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+REQUEST_DELAY = 2  # 同一主机相邻请求的最小间隔（秒），也是重试的初始等待
+TIMEOUT = 10
+RETRIES = 2
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_BACKOFF = 60
+MAX_REDIRECTS = 10
+POOL_CONNECTIONS = 100  # 保留连接池的主机数
+POOL_MAXSIZE = 10  # 每个主机最多保留的空闲连接
+ROBOTS_DIR = Path(__file__).resolve().parent.parent.parent / ".cache" / "robots"
+ROBOTS_TTL = 24 * 3600
+
+
+class HttpResponse:
+    """一次请求的响应（重定向后的最终 url）。"""
+
+    def __init__(self, status, content, headers, url):
+        self.status = status
+        self.content = content
+        self.headers = headers
+        self.url = url
+
+    def __repr__(self):
+        return f"HttpResponse({self.url!r}, status={self.status})"
+
+
+class ConnectionPool:
+    """http.client 的 keep-alive 连接池：按 (协议, host:port) 保留空闲连接。"""
+
+    def __init__(self, maxsize=POOL_MAXSIZE):
+        self.maxsize = maxsize
+        self.idle = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def acquire(self, scheme, netloc, timeout):
+        """返回 (连接, 是否为复用的空闲连接)。"""
+        with self.lock:
+            if self.idle[scheme, netloc]:
+                conn = self.idle[scheme, netloc].pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(netloc, timeout=timeout), False
+
+    def release(self, scheme, netloc, conn):
+        with self.lock:
+            if len(self.idle[scheme, netloc]) < self.maxsize:
+                self.idle[scheme, netloc].append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            conns = [c for group in self.idle.values() for c in group]
+            self.idle.clear()
+        for conn in conns:
+            conn.close()
+
+
+def _retry_after(headers):
+    """Retry-After 响应头（秒数或 HTTP 日期）对应的等待秒数；没有或无法解析时返回 None。"""
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpSession:
+    """共享连接池、带重试的 HTTP 会话（见模块说明）；多个线程可同时使用。"""
+
+    def __init__(self, retries=RETRIES, backoff=REQUEST_DELAY, pool_connections=POOL_CONNECTIONS,
+                 pool_maxsize=POOL_MAXSIZE, use_requests=REQUESTS_AVAILABLE):
+        self.retries = retries
+        self.backoff = backoff
+        self.use_requests = use_requests
+        if use_requests:
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+        else:
+            self.pool = ConnectionPool(pool_maxsize)
+        self.lock = threading.Lock()
+        self.stats = defaultdict(int)
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def _send_requests(self, method, url, headers, timeout):
+        response = self.session.request(method, url, headers=headers, timeout=timeout, allow_redirects=True)
+        return HttpResponse(response.status_code, response.content, response.headers, response.url)
+
+    def _send_once(self, method, url, headers, timeout):
+        """http.client 发一次请求（不跟随重定向）；复用的空闲连接已被服务器关闭时换新连接重发。"""
+        parts = urlsplit(url)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        while True:
+            conn, reused = self.pool.acquire(parts.scheme, parts.netloc, timeout)
+            try:
+                conn.request(method, path, headers=headers)
+                response = conn.getresponse()
+                content = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self.pool.release(parts.scheme, parts.netloc, conn)
+            if not reused:
+                self._count("connections")
+            return HttpResponse(response.status, content, response.headers, url)
+
+    def _send_http_client(self, method, url, headers, timeout):
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._send_once(method, url, headers, timeout)
+            location = response.headers.get("Location")
+            if response.status not in (301, 302, 303, 307, 308) or not location:
+                return response
+            url = urljoin(url, location)
+            if response.status == 303:
+                method = "GET"
+        raise http.client.HTTPException(f"重定向超过 {MAX_REDIRECTS} 次: {url}")
+
+    def request(self, method, url, headers=None, timeout=TIMEOUT):
+        """发请求并按需重试；headers 追加到默认请求头。"""
+        headers = {**HEADERS, **(headers or {})}
+        send = self._send_requests if self.use_requests else self._send_http_client
+        for attempt in range(self.retries + 1):
+            self._count("requests")
+            wait = self.backoff * 2 ** attempt
+            try:
+                response = send(method, url, headers, timeout)
+            except (OSError, http.client.HTTPException):  # 连接错误、超时（requests 的异常也是 OSError）
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+                retry_after = _retry_after(response.headers)
+                if retry_after is not None:
+                    wait = retry_after
+            self._count("retries")
+            time.sleep(min(wait, MAX_BACKOFF))
+
+    def get(self, url, headers=None, timeout=TIMEOUT):
+        return self.request("GET", url, headers, timeout)
+
+    def head(self, url, headers=None, timeout=TIMEOUT):
+        return self.request("HEAD", url, headers, timeout)
+
+    def close(self):
+        if self.use_requests:
+            self.session.close()
+        else:
+            self.pool.close()
+
+
+def robots_key(url):
+    """robots.txt 的缓存键：协议 + host:port（小写）。"""
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+class RobotsCache:
+    """按主机缓存的 robots.txt 规则：本轮内存中每个主机只获取一次，磁盘上 ttl 秒内有效（见模块说明）。"""
+
+    def __init__(self, session=None, root=ROBOTS_DIR, ttl=ROBOTS_TTL, offline=None):
+        self.session = session
+        self.root = Path(root)
+        self.ttl = ttl
+        # 离线时只用磁盘上的记录（过期的也用），没有记录的主机视为全部允许
+        self.offline = os.environ.get("CRAWL_OFFLINE") == "1" if offline is None else offline
+        self.parsers = {}  # 主机 → RobotFileParser
+        self.locks = defaultdict(threading.Lock)
+        self.lock = threading.Lock()
+        self.stats = defaultdict(int)
+
+    def path(self, key):
+        return self.root / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+    def _load(self, key):
+        try:
+            entry = json.loads(self.path(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not self.offline and time.time() - entry["fetchedAt"] >= self.ttl:
+            return None
+        return entry
+
+    def _save(self, key, entry):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _fetch(self, key):
+        """下载 robots.txt，返回 (记录, 是否写入磁盘)；记录为 {host, status, lines, fetchedAt}。"""
+        entry = {"host": key, "status": None, "lines": [], "fetchedAt": time.time()}
+        try:
+            response = (self.session or SESSION).get(f"{key}/robots.txt")
+        except (OSError, http.client.HTTPException):
+            return entry, False  # 连不上：本轮视为全部允许
+        entry["status"] = response.status
+        if response.status == 200:
+            entry["lines"] = response.content.decode("utf-8", errors="replace").splitlines()
+        return entry, response.status < 500
+
+    def _parser(self, entry):
+        """与 RobotFileParser.read 相同的规则构造解析器。"""
+        parser = RobotFileParser(f"{entry['host']}/robots.txt")
+        status = entry["status"]
+        if status is None:
+            parser.allow_all = True
+        elif status in (401, 403):
+            parser.disallow_all = True
+        elif 400 <= status < 500:
+            parser.allow_all = True
+        elif status >= 500:
+            parser.disallow_all = True
+        else:
+            parser.parse(entry["lines"])
+        return parser
+
+    def parser(self, url):
+        key = robots_key(url)
+        with self.lock:
+            host_lock = self.locks[key]
+        with host_lock:
+            if key in self.parsers:
+                self.stats["memory"] += 1
+                return self.parsers[key]
+            entry = self._load(key)
+            if entry is not None:
+                self.stats["disk"] += 1
+            elif self.offline:
+                entry = {"host": key, "status": None, "lines": []}
+            else:
+                entry, persist = self._fetch(key)
+                self.stats["fetched"] += 1
+                if persist:
+                    self._save(key, entry)
+            self.parsers[key] = self._parser(entry)
+            return self.parsers[key]
+
+    def can_fetch(self, url, user_agent=HEADERS['User-Agent']):
+        return self.parser(url).can_fetch(user_agent, url)
+
+    def describe(self):
+        return (f"robots.txt: {len(self.parsers)} 个主机，下载 {self.stats['fetched']} 次，"
+                f"磁盘缓存 {self.stats['disk']} 次，内存命中 {self.stats['memory']} 次")
+
+
+SESSION = HttpSession()
+ROBOTS = RobotsCache(SESSION)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP 会话层与 robots.txt 缓存")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("robots", help="按 robots.txt 检查 URL 是否允许抓取")
+    p.add_argument("urls", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "robots":
+        for url in args.urls:
+            print(f"{'✅' if ROBOTS.can_fetch(url) else '❌'} {url}")
+        print(f"📊 {ROBOTS.describe()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词多模式匹配：一个 Aho-Corasick 自动机一遍扫描页面文本，找出所有类别关键词的全部出现位置
+
+原来的 extract_* 每个类别循环关键词列表，每命中一个就现编 f'.{{0,50}}{关键词}.{{0,50}}' 正则、
+重新扫描整页：一页约 60 次全文扫描加正则编译，其中 .{0,50} 在每个位置都要回溯。现在：
+
+- KeywordScanner(关键词列表) 在导入时建好自动机（各爬虫把所有类别的关键词放进同一个）
+- find(text) 一遍扫描返回 {关键词: [起始位置, ...]}；包含、重叠的关键词（前期 / 前期選抜）都会找到。
+  同一段文本的结果缓存一份（各 extract_* 收到的是同一个 text 对象，整页只扫描一次）
+- contexts(text, 关键词, width=50, limit=3) 直接按出现位置切出前后各 width 个字符的上下文，
+  结果与 re.findall(f'.{{0,{width}}}{re.escape(关键词)}.{{0,{width}}}', text)[:limit] 完全相同：
+  上下文不跨行、向前尽量取满、多个出现落在同一窗口内时合并为一条（贪婪匹配取窗口内最后一个）、
+  下一条从上一条结尾之后开始
+- spans(text, [关键词, ...]) 对应多选一的正则 .{0,w}(甲|乙).{0,w}，返回 (开始, 结束, 命中的关键词)
+
+与旧写法逐条对照的正确性检查和吞吐量基准见 scripts/benchmarks/bench_keyword_scan.py。
+
+用法：
+    SCANNER = KeywordScanner([*PERIOD_KEYWORDS, *METHOD_KEYWORDS])
+    if "前期" in SCANNER.find(text):
+        found = SCANNER.contexts(text, "前期", limit=3)
+"""
+import re
+from collections import deque
+
+
+class KeywordScanner:
+    """多个关键词的 Aho-Corasick 自动机（见模块说明）；建好后只读，多个线程可同时使用。"""
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(k for k in keywords if k))
+        if any("\n" in k for k in self.keywords):
+            raise ValueError("关键词不能包含换行（上下文按行截取）")
+        goto, output = [{}], [[]]
+        for keyword in self.keywords:
+            state = 0
+            for ch in keyword:
+                if ch not in goto[state]:
+                    goto.append({})
+                    output.append([])
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            output[state].append(keyword)
+
+        # 按层 BFS 求失败链接，并把转移补全为确定自动机：delta[s] = 失败状态的转移 + 自己的转移
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            for ch, child in goto[state].items():
+                # 失败状态更浅，其 delta 与 output 已经算好
+                fail[child] = delta[fail[state]].get(ch, 0)
+                output[child] = output[child] + output[fail[child]]
+                queue.append(child)
+        # 每个状态命中的 (关键词, 长度)
+        self._delta = delta
+        self._output = [tuple((k, len(k)) for k in out) for out in output]
+        # 处于根状态时跳到下一个可能开始关键词的字符
+        self._first = re.compile("[" + "".join(re.escape(ch) for ch in goto[0]) + "]") if goto[0] else None
+        self._last = (None, {})
+
+    def find(self, text):
+        """一遍扫描 text，返回 {关键词: [起始位置（升序）]}，只含出现过的关键词。"""
+        last_text, last_hits = self._last
+        if text is last_text:
+            return last_hits
+        hits = {}
+        if self._first is not None:
+            delta, output, first = self._delta, self._output, self._first
+            state, i, n = 0, 0, len(text)
+            while i < n:
+                if not state:
+                    match = first.search(text, i)
+                    if match is None:
+                        break
+                    i = match.start()
+                state = delta[state].get(text[i], 0)
+                if output[state]:
+                    for keyword, length in output[state]:
+                        hits.setdefault(keyword, []).append(i - length + 1)
+                i += 1
+        self._last = (text, hits)
+        return hits
+
+    def spans(self, text, keywords, width=50, limit=None):
+        """等同 re.finditer(f'.{{0,{width}}}(关键词1|关键词2|…).{{0,{width}}}', text) 的前 limit 个匹配，
+        返回 [(开始, 结束, 命中的关键词)]；keywords 须都在自动机中。"""
+        hits = self.find(text)
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        occurrences = {}  # 位置 → 关键词；同一位置多个关键词都能匹配时与正则一样取列表中靠前的
+        for keyword in reversed(keywords):
+            for position in hits.get(keyword, ()):
+                occurrences[position] = keyword
+        positions = sorted(occurrences)
+        result, pos, i, n = [], 0, 0, len(text)
+        while i < len(positions) and (limit is None or len(result) < limit):
+            first = positions[i]
+            if first < pos:
+                i += 1
+                continue
+            line_end = text.find("\n", first)
+            if line_end < 0:
+                line_end = n
+            # 正则从 pos 起逐个位置尝试：最早能匹配的开始位置
+            start = max(pos, first - width, text.rfind("\n", 0, first) + 1)
+            # 贪婪的 .{0,width} 取窗口内（同一行）最后一个出现
+            while i + 1 < len(positions) and positions[i + 1] <= start + width and positions[i + 1] < line_end:
+                i += 1
+            keyword = occurrences[positions[i]]
+            end = positions[i] + len(keyword)
+            end += min(width, line_end - end)
+            result.append((start, end, keyword))
+            pos = end
+            i += 1
+        return result
+
+    def contexts(self, text, keyword, width=50, limit=None):
+        """等同 re.findall(f'.{{0,{width}}}{re.escape(keyword)}.{{0,{width}}}', text)[:limit]。"""
+        return [text[start:end] for start, end, _ in self.spans(text, [keyword], width, limit)]
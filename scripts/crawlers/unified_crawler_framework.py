@@ -3,14 +3,39 @@
 """
 统一爬取框架：一次性爬取所有需要的数据
 包括：基础信息、期数、选考方式、校内考、出愿时间、出愿材料、成绩要求、合格情况等
+
+页面由 fetch_engine.FetchEngine 并行抓取：不同大学的网站同时进行（--concurrency），
+同一网站相邻请求至少间隔 --host-delay 秒（默认 REQUEST_DELAY），不再每条之后全局 sleep。
+
+URL 映射表按大学给出招生页面，同一所大学的各学部指向同一个页面：先按规范化后的 URL 分组，
+每个页面只抓取、解析、运行 extract_* 一次，再把结果复制给映射到它的每个 大学/学部。
+各 extract_* 的关键词都在 keyword_scanner.KeywordScanner 的一个自动机里：每页一遍扫描，上下文直接按位置切出。
+
+页面经 http_cache.HttpCache（.cache/http/）抓取：仍新鲜的页面不发请求，过期的发条件请求，
+未改动的页面只需一次 304 往返；--offline 只用缓存、完全不联网（可反复调试 extract_* 逻辑），
+--no-cache 绕过缓存直接下载。
+
+用法：
+    python3 scripts/crawlers/unified_crawler_framework.py
+    python3 scripts/crawlers/unified_crawler_framework.py --concurrency 16 --host-delay 3
+    python3 scripts/crawlers/unified_crawler_framework.py --offline
 """
+import argparse
+import copy
 import json
 import re
+import time
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
 from typing import Dict, List, Optional, Any
 
+import pandas as pd
+
+from fetch_engine import REQUEST_DELAY, FetchEngine, FetchResult, default_fetch, normalize_url
+from http_cache import HttpCache
+from keyword_scanner import KeywordScanner
+
 # 可选依赖
 try:
     import requests
@@ -27,17 +52,45 @@ URL_MAPPING_PATH = Path(__file__).parent.parent.parent / "crawled_data" / "unive
 OUTPUT_DIR = Path(__file__).parent.parent.parent / "crawled_data" / "unified_crawl_results"
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-}
+DEFAULT_CONCURRENCY = 8  # 同时进行的请求数（分散在不同大学的网站上）
+
+# 期数关键词
+PERIOD_KEYWORDS = [
+    "前期", "後期", "後期", "第1期", "第2期", "第3期", "第4期",
+    "第一期", "第二期", "第三期", "第四期",
+    "Ⅰ期", "Ⅱ期", "Ⅲ期", "Ⅳ期",
+    "A方式", "B方式", "C方式",
+    "前期選抜", "後期選抜", "単独選抜",
+    "渡日前", "2月実施", "3月実施", "只有一期"
+]
+METHOD_KEYWORDS = [
+    "外国人入試", "外国人特別選抜", "外国人選抜",
+    "一般入試", "一般選抜",
+    "推薦入試", "推薦選抜", "学校推薦",
+    "AO入試", "AO選抜",
+    "総合型選抜", "総合評価型",
+    "EJU利用", "EJU利用型",
+    "校内考", "書類選考", "面接"
+]
+EXAM_KEYWORDS = ["校内考", "校内試験", "面接", "小論文", "筆記試験"]
+MATERIAL_KEYWORDS = ["入学志愿书", "成绩证明书", "毕业证明书", "推荐信", "研究计划书"]
+RECOMMENDATION_KEYWORDS = ["推荐信", "推薦"]
+EJU_KEYWORDS = ["日语", "日本語", "数学", "数学コース1", "数学コース2", "総合科目", "物理", "化学", "生物"]
+ENGLISH_KEYWORDS = ["TOEFL", "托福", "TOEIC", "IELTS"]
+JLPT_KEYWORDS = ["JLPT", "N1", "N2"]
 
-REQUEST_DELAY = 2  # 秒
+# 所有类别的关键词放进一个自动机：每页一遍扫描，各 extract_* 共用结果
+KEYWORD_SCANNER = KeywordScanner([
+    *PERIOD_KEYWORDS, *METHOD_KEYWORDS, *EXAM_KEYWORDS, *MATERIAL_KEYWORDS, *RECOMMENDATION_KEYWORDS,
+    *EJU_KEYWORDS, *ENGLISH_KEYWORDS, *JLPT_KEYWORDS
+])
 
 
 class UnifiedCrawler:
     """统一爬取框架"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[HttpCache] = None):
+        self.cache = cache  # None 时不经缓存，直接下载
         self.results = []
         self.statistics = {
             "total_processed": 0,
@@ -70,23 +123,12 @@ class UnifiedCrawler:
             "status": "not_found"
         }
         
-        # 期数关键词
-        period_keywords = [
-            "前期", "後期", "後期", "第1期", "第2期", "第3期", "第4期",
-            "第一期", "第二期", "第三期", "第四期",
-            "Ⅰ期", "Ⅱ期", "Ⅲ期", "Ⅳ期",
-            "A方式", "B方式", "C方式",
-            "前期選抜", "後期選抜", "単独選抜",
-            "渡日前", "2月実施", "3月実施", "只有一期"
-        ]
-        
+        hits = KEYWORD_SCANNER.find(text)
         found_periods = []
-        for keyword in period_keywords:
-            if keyword in text:
-                # 提取包含关键词的句子
-                pattern = f'.{{0,50}}{re.escape(keyword)}.{{0,50}}'
-                matches = re.findall(pattern, text)
-                found_periods.extend(matches[:3])
+        for keyword in PERIOD_KEYWORDS:
+            if keyword in hits:
+                # 提取包含关键词的句子（前后各 50 字，最多 3 处）
+                found_periods.extend(KEYWORD_SCANNER.contexts(text, keyword, limit=3))
         
         if found_periods:
             result["原始表述"] = found_periods[0]
@@ -103,22 +145,11 @@ class UnifiedCrawler:
             "status": "not_found"
         }
         
-        method_keywords = [
-            "外国人入試", "外国人特別選抜", "外国人選抜",
-            "一般入試", "一般選抜",
-            "推薦入試", "推薦選抜", "学校推薦",
-            "AO入試", "AO選抜",
-            "総合型選抜", "総合評価型",
-            "EJU利用", "EJU利用型",
-            "校内考", "書類選考", "面接"
-        ]
-        
+        hits = KEYWORD_SCANNER.find(text)
         found_methods = []
-        for keyword in method_keywords:
-            if keyword in text:
-                pattern = f'.{{0,50}}{re.escape(keyword)}.{{0,50}}'
-                matches = re.findall(pattern, text)
-                found_methods.extend(matches[:3])
+        for keyword in METHOD_KEYWORDS:
+            if keyword in hits:
+                found_methods.extend(KEYWORD_SCANNER.contexts(text, keyword, limit=3))
         
         if found_methods:
             result["原始表述"] = found_methods[0]
@@ -147,8 +178,8 @@ class UnifiedCrawler:
         }
         
         # 查找校内考相关信息
-        exam_keywords = ["校内考", "校内試験", "面接", "小論文", "筆記試験"]
-        has_exam = any(keyword in text for keyword in exam_keywords)
+        hits = KEYWORD_SCANNER.find(text)
+        has_exam = any(keyword in hits for keyword in EXAM_KEYWORDS)
         
         if has_exam:
             result["有无"] = "有"
@@ -188,24 +219,19 @@ class UnifiedCrawler:
         }
         
         # 查找材料相关关键词
-        material_keywords = ["入学志愿书", "成绩证明书", "毕业证明书", "推荐信", "研究计划书"]
-        found_materials = []
-        
-        for keyword in material_keywords:
-            if keyword in text:
-                found_materials.append(keyword)
+        hits = KEYWORD_SCANNER.find(text)
+        found_materials = [keyword for keyword in MATERIAL_KEYWORDS if keyword in hits]
         
         if found_materials:
             result["材料清单"] = found_materials
             result["status"] = "found"
         
         # 查找推荐信要求
-        if "推荐信" in text or "推薦" in text:
-            # 提取推荐信相关句子
-            pattern = r'.{0,100}(推荐信|推薦).{0,100}'
-            matches = re.findall(pattern, text)
-            if matches:
-                result["推荐信要求"] = matches[0]
+        if "推荐信" in hits or "推薦" in hits:
+            # 与 re.findall(r'.{0,100}(推荐信|推薦).{0,100}', text)[0] 相同：第一处匹配命中的关键词
+            spans = KEYWORD_SCANNER.spans(text, RECOMMENDATION_KEYWORDS, width=100, limit=1)
+            if spans:
+                result["推荐信要求"] = spans[0][2]
         
         return result
     
@@ -232,37 +258,34 @@ class UnifiedCrawler:
         }
         
         # 查找EJU科目
-        eju_keywords = ["日语", "日本語", "数学", "数学コース1", "数学コース2", "総合科目", "物理", "化学", "生物"]
-        found_eju = []
-        for keyword in eju_keywords:
-            if keyword in text:
-                found_eju.append(keyword)
+        hits = KEYWORD_SCANNER.find(text)
+        found_eju = [keyword for keyword in EJU_KEYWORDS if keyword in hits]
         
         if found_eju:
             result["EJU科目"]["需要的科目"] = list(set(found_eju))
             result["EJU科目"]["status"] = "found"
         
         # 查找英语要求
-        if "TOEFL" in text or "托福" in text:
+        if "TOEFL" in hits or "托福" in hits:
             result["英语"]["是否需要"] = "要"
             result["英语"]["成绩类型"] = "TOEFL"
             result["英语"]["status"] = "found"
-        elif "TOEIC" in text:
+        elif "TOEIC" in hits:
             result["英语"]["是否需要"] = "要"
             result["英语"]["成绩类型"] = "TOEIC"
             result["英语"]["status"] = "found"
-        elif "IELTS" in text:
+        elif "IELTS" in hits:
             result["英语"]["是否需要"] = "要"
             result["英语"]["成绩类型"] = "IELTS"
             result["英语"]["status"] = "found"
         
         # 查找JLPT要求
-        if "JLPT" in text or "N1" in text or "N2" in text:
+        if "JLPT" in hits or "N1" in hits or "N2" in hits:
             result["JLPT"]["是否需要"] = "要"
             # 提取等级
-            if "N1" in text:
+            if "N1" in hits:
                 result["JLPT"]["等级要求"] = "N1"
-            elif "N2" in text:
+            elif "N2" in hits:
                 result["JLPT"]["等级要求"] = "N2"
             result["JLPT"]["status"] = "found"
         
@@ -281,9 +304,9 @@ class UnifiedCrawler:
         
         return result
     
-    def crawl_university(self, university_name: str, department_name: str, url: str) -> Dict[str, Any]:
-        """爬取单个大学/学部的所有信息"""
-        result = {
+    def new_result(self, university_name: str, department_name: str, url: str) -> Dict[str, Any]:
+        """一个大学/学部的空结果"""
+        return {
             "university": university_name,
             "department": department_name,
             "crawled_at": datetime.now().isoformat(),
@@ -303,24 +326,22 @@ class UnifiedCrawler:
             },
             "status": "pending"
         }
-        
-        if not CRAWLER_AVAILABLE:
-            result["status"] = "error"
-            result["提取质量"]["提取问题"].append("缺少爬虫依赖库")
-            return result
-        
+    
+    def process_page(self, result: Dict[str, Any], page) -> Dict[str, Any]:
+        """解析抓取到的页面（fetch_engine.FetchResult），提取所有信息写入 result（不计入统计，见 record）"""
+        if page.started is not None:
+            result["crawled_at"] = datetime.fromtimestamp(page.started).isoformat()
         try:
-            # 访问页面
-            response = requests.get(url, headers=HEADERS, timeout=10)
-            response.encoding = 'utf-8'
+            if page.error is not None:
+                raise RuntimeError(page.error)
             
-            if response.status_code != 200:
+            if page.status != 200:
                 result["status"] = "error"
-                result["提取质量"]["提取问题"].append(f"HTTP错误: {response.status_code}")
+                result["提取质量"]["提取问题"].append(f"HTTP错误: {page.status}")
                 return result
             
             # 解析HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = BeautifulSoup(page.content, 'html.parser')
             text = extract_text_from_page(soup)
             
             # 提取所有信息
@@ -341,16 +362,39 @@ class UnifiedCrawler:
             result["提取质量"]["完整度"] = found_fields / total_fields
             
             result["status"] = "success"
-            self.statistics["successful"] += 1
             
         except Exception as e:
             result["status"] = "error"
             result["提取质量"]["提取问题"].append(str(e))
-            self.statistics["failed"] += 1
         
         return result
     
-    def crawl_from_excel(self):
+    def record(self, result: Dict[str, Any]):
+        """保存一个大学/学部的结果并计入统计"""
+        self.results.append(result)
+        self.statistics["total_processed"] += 1
+        self.statistics["successful" if result["status"] == "success" else "failed"] += 1
+    
+    def crawl_university(self, university_name: str, department_name: str, url: str) -> Dict[str, Any]:
+        """爬取单个大学/学部的所有信息（单独调试用；批量爬取见 crawl_from_excel）"""
+        result = self.new_result(university_name, department_name, url)
+        
+        if not CRAWLER_AVAILABLE:
+            result["status"] = "error"
+            result["提取质量"]["提取问题"].append("缺少爬虫依赖库")
+            return result
+        
+        started = time.time()
+        try:
+            page = self.cache.fetch(url) if self.cache else default_fetch(url)
+        except Exception as e:
+            page = FetchResult(url, error=str(e))
+        page.started = started
+        result = self.process_page(result, page)
+        self.statistics["successful" if result["status"] == "success" else "failed"] += 1
+        return result
+    
+    def crawl_from_excel(self, concurrency=DEFAULT_CONCURRENCY, host_delay=REQUEST_DELAY):
         """从Excel读取数据并爬取"""
         print("=" * 60)
         print("统一爬取框架")
@@ -378,7 +422,8 @@ class UnifiedCrawler:
         print(f"   URL映射数: {len(url_mapping)} 所大学")
         print()
         
-        # 爬取每个大学/学部
+        # 收集每个大学/学部的URL
+        jobs = []
         for _, row in df.iterrows():
             uni = row["大学"]
             dept = row["学部"]
@@ -394,14 +439,48 @@ class UnifiedCrawler:
             if not url:
                 print(f"⚠️  跳过 {uni} - {dept}: 没有URL")
                 continue
-            
-            print(f"🕷️  爬取: {uni} - {dept}")
-            result = self.crawl_university(uni, dept, url)
-            self.results.append(result)
-            self.statistics["total_processed"] += 1
-            
-            # 延迟
-            time.sleep(REQUEST_DELAY)
+            jobs.append((uni, dept, url))
+        
+        # 同一页面只抓取一次：按规范化的 URL 分组
+        groups = defaultdict(list)  # 规范化 URL → 指向它的 jobs 下标
+        for i, (_, _, url) in enumerate(jobs):
+            groups[normalize_url(url)].append(i)
+        urls = list(groups)
+        if urls:
+            print(f"🔗 {len(jobs)} 个大学/学部共指向 {len(urls)} 个不同页面（平均每页 {len(jobs) / len(urls):.1f} 个学部）")
+        
+        # 并行抓取：不同网站同时进行，同一网站按礼貌间隔
+        print(f"🕷️  爬取 {len(urls)} 个页面（并发 {concurrency}，同一网站间隔 {host_delay:g} 秒）")
+        
+        def report(index, page):
+            members = groups[urls[index]]
+            uni, dept, _ = jobs[members[0]]
+            more = f" 等 {len(members)} 个学部" if len(members) > 1 else ""
+            status = page.status if page.error is None else page.error
+            print(f"🕷️  [{index + 1}/{len(urls)}] {uni} - {dept}{more}: {status}（{page.elapsed:.1f}s）")
+        
+        if self.cache:
+            engine = FetchEngine(concurrency=concurrency, host_delay=host_delay, on_result=report,
+                                 fetch=self.cache.fetch, lookup=self.cache.lookup)
+        else:
+            engine = FetchEngine(concurrency=concurrency, host_delay=host_delay, on_result=report)
+        start = time.perf_counter()
+        pages = engine.run(urls)
+        print(f"   抓取用时 {time.perf_counter() - start:.1f}s，礼貌等待 {engine.stats['politeWaits']} 次，"
+              f"跳过连续失败主机的 URL {engine.stats['skipped']} 个")
+        if self.cache:
+            print(f"   {self.cache.describe()}")
+        
+        # 每个页面解析、提取一次，结果复制给映射到它的每个大学/学部（按原来的行顺序保存）
+        start = time.perf_counter()
+        shared = {}
+        for url, page in zip(urls, pages):
+            shared[url] = self.process_page(self.new_result(None, None, url), page)
+        print(f"   解析用时 {time.perf_counter() - start:.1f}s（{len(urls)} 个页面）")
+        for uni, dept, url in jobs:
+            result = copy.deepcopy(shared[normalize_url(url)])
+            result.update(university=uni, department=dept, source_url=url)
+            self.record(result)
         
         # 保存结果
         self.save_results()
@@ -474,5 +553,16 @@ if __name__ == "__main__":
         print("或者先运行数据提取脚本（不需要爬虫库）：")
         print("  python3 scripts/crawlers/simple_crawl_classification.py")
     else:
-        crawler = UnifiedCrawler()
-        crawler.crawl_from_excel()
+        parser = argparse.ArgumentParser(description="统一爬取框架")
+        parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                            help=f"同时进行的请求数（默认 {DEFAULT_CONCURRENCY}）")
+        parser.add_argument("--host-delay", type=float, default=REQUEST_DELAY,
+                            help=f"同一网站相邻请求的最小间隔秒数（默认 {REQUEST_DELAY}）")
+        parser.add_argument("--offline", action="store_true",
+                            help="只用 HTTP 缓存中的页面，不联网（也可设环境变量 CRAWL_OFFLINE=1）")
+        parser.add_argument("--no-cache", action="store_true", help="不经 HTTP 缓存，直接下载")
+        args = parser.parse_args()
+        if args.offline and args.no_cache:
+            parser.error("--offline 需要使用缓存，不能与 --no-cache 同时指定")
+        crawler = UnifiedCrawler(None if args.no_cache else HttpCache(offline=True if args.offline else None))
+        crawler.crawl_from_excel(args.concurrency, args.host_delay)
@@ -3,106 +3,232 @@
 """
 创建完整的审核表格，供老师在飞书多维表格中审核
 包含：现有Excel的所有字段 + 爬取的新字段 + 审核状态字段
+
+逐行流式写出：主表每一行直接写入 openpyxl 只写模式（write_only）的工作簿和 CSV，不再先拼一张
+现有 + 新增 + 审核字段的完整 DataFrame，内存只随主表本身增长。两个文件先写临时文件，全部写完再替换。
+
+可只输出需要审核的行（审核备注中写明原因）：
+- --missing：关键字段为空（默认 REQUIRED_COLUMNS，也可指定列名）
+- --stale-days N：最近一次爬取（crawled_data/unified_crawl_results 中按登记表编号匹配）早于 N 天或从未爬取
+两个条件都给出时满足任一即输出。不加条件时输出全部行。
+
+用法：
+    python3 scripts/create_review_table.py
+    python3 scripts/create_review_table.py --missing                       # 只输出关键字段缺失的行
+    python3 scripts/create_review_table.py --missing 发榜时间 校内考时间1
+    python3 scripts/create_review_table.py --missing --stale-days 180
 """
-import pandas as pd
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime, timedelta
 from pathlib import Path
-from datetime import datetime
+
+import pandas as pd
+from openpyxl import Workbook
+
+from entity_registry import CRAWL_RESULTS_DIR, load_registry
+from master_store import load_master, master_path
 
 # 文件路径
 EXCEL_PATH = Path(__file__).parent.parent / "学部学校一览表.xlsx"
 OUTPUT_EXCEL = Path(__file__).parent.parent / "crawled_data" / "审核表格_完整版.xlsx"
 OUTPUT_CSV = Path(__file__).parent.parent / "crawled_data" / "审核表格_完整版.csv"
+SHEET_NAME = "审核表格"
+
+# 新字段（从爬取数据中获取）
+NEW_COLUMNS = [
+    # 成绩要求详细字段
+    "英语成绩类型",  # TOEFL/TOEIC/IELTS
+    "英语成绩推荐分数",  # 具体分数要求
+    "JLPT等级",  # N1/N2等
+    "JLPT分数要求",  # 具体分数要求
+    "EJU推荐分数",  # JSON格式，包含各科目推荐分数
+    # 出愿材料详细字段
+    "出愿材料清单",  # 完整的材料清单
+    "推荐信要求详细",  # 需要几封、谁写等
+    "出愿流程详细",  # 详细的出愿步骤
+    # 合格情况详细字段
+    "报录比（2024）",  # 2024年报录比
+    "报录比（2023）",  # 2023年报录比
+    "报录比（2022）",  # 2022年报录比
+    "合格者成绩分布",  # 如果有公开的话
+    # 数据来源字段
+    "数据来源",  # 爬取/手动/合并
+    "爬取时间",  # 爬取的时间戳
+    "爬取URL",  # 爬取的网址
+]
+
+# 审核字段
+REVIEW_COLUMNS = [
+    "审核状态",  # 待审核/已审核/需修改/已确认
+    "审核人",  # 审核的老师姓名
+    "审核时间",  # 审核的时间
+    "审核备注",  # 审核时的备注说明
+    "数据质量评分",  # 1-5分，数据完整性和准确性评分
+]
+
+# --missing 不指定列名时检查的关键字段
+REQUIRED_COLUMNS = ["网上出愿开始时间", "网上出愿截止时间", "校内考形式", "校内考时间1", "发榜时间", "英语", "JLPT", "能使用EJU"]
+
+
+def is_blank(value):
+    return value is None or value is pd.NaT or (isinstance(value, float) and value != value) or \
+        (isinstance(value, str) and not value.strip())
+
+
+def load_crawl_times():
+    """各次爬取结果中每个学部最近一次的 (爬取时间, URL)，按登记表的 (大学编号, 学部编号) 索引。"""
+    items = []
+    for path in sorted(CRAWL_RESULTS_DIR.glob("crawl_results_*.json")):
+        items += [item for item in json.loads(path.read_text(encoding="utf-8")) if item.get("crawled_at")]
+    if not items:
+        return {}
+    uids, dids = load_registry().resolve_pairs([i.get("university") for i in items], [i.get("department") for i in items])
+    latest = {}
+    for item, uid, did in zip(items, uids, dids):
+        if did is None:
+            continue
+        crawled_at = datetime.fromisoformat(item["crawled_at"])
+        if (uid, did) not in latest or crawled_at > latest[(uid, did)][0]:
+            latest[(uid, did)] = (crawled_at, item.get("source_url") or "")
+    return latest
+
+
+class CellFormatter:
+    """单元格 → (Excel 值, CSV 文本)，与原先 DataFrame.to_excel / to_csv 的输出一致。"""
 
-def create_review_table():
-    """创建完整的审核表格"""
+    def __init__(self, df):
+        # to_csv 对整列都是零点的日期时间列只写日期
+        self.date_only = {
+            i for i, col in enumerate(df.columns)
+            if str(df[col].dtype).startswith("datetime64") and (df[col].dropna() == df[col].dropna().dt.normalize()).all()
+        }
+
+    def __call__(self, i, value):
+        if is_blank(value) and not isinstance(value, str):
+            return None, ""
+        if isinstance(value, pd.Timestamp):
+            text = value.strftime("%Y-%m-%d") if i in self.date_only else str(value)
+            return value.to_pydatetime(), text
+        if hasattr(value, "item"):  # numpy 标量
+            value = value.item()
+        return value, str(value)
+
+
+def review_rows(df, crawl_times=None, missing_columns=None, stale_before=None):
+    """逐行生成 (Excel 行, CSV 行)；给出 missing_columns / stale_before 时只生成需要审核的行，原因写入审核备注。"""
+    crawl_times = crawl_times or {}
+    keys = [None] * len(df)
+    if crawl_times or stale_before is not None:
+        keys = list(zip(*load_registry().resolve_pairs(df["大学"], df["学部"])))
+    positions = [df.columns.get_loc(c) for c in missing_columns or []]
+    filtering = bool(missing_columns) or stale_before is not None
+    fmt = CellFormatter(df)
+    for key, values in zip(keys, df.itertuples(index=False, name=None)):
+        crawled_at, url = crawl_times.get(key, (None, ""))
+        reasons = []
+        blank = [df.columns[i] for i in positions if is_blank(values[i])]
+        if blank:
+            reasons.append("缺少: " + "、".join(blank))
+        if stale_before is not None:
+            if crawled_at is None:
+                reasons.append("未爬取")
+            elif crawled_at < stale_before:
+                reasons.append(f"爬取于 {crawled_at:%Y-%m-%d}，已过期")
+        if filtering and not reasons:
+            continue
+        cells = [fmt(i, v) for i, v in enumerate(values)]
+        extra = {"数据来源": "现有数据", "审核状态": "待审核", "审核备注": "；".join(reasons)}
+        if crawled_at is not None:
+            extra["爬取时间"] = crawled_at.isoformat(timespec="seconds")
+            extra["爬取URL"] = url
+        tail = [extra.get(c, "") for c in NEW_COLUMNS + REVIEW_COLUMNS]
+        yield [c[0] for c in cells] + [v or None for v in tail], [c[1] for c in cells] + tail
+
+
+def write_review_table(header, rows, excel_path=OUTPUT_EXCEL, csv_path=OUTPUT_CSV):
+    """把 (Excel 行, CSV 行) 流式写入只写模式工作簿与 CSV，返回行数；写完后两个文件一起替换。"""
+    tmp_excel = excel_path.with_name(f".{excel_path.stem}.{os.getpid()}.tmp{excel_path.suffix}")
+    tmp_csv = csv_path.with_name(f".{csv_path.stem}.{os.getpid()}.tmp{csv_path.suffix}")
+    count = 0
+    try:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(SHEET_NAME)
+        ws.append(header)
+        with open(tmp_csv, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            writer.writerow(header)
+            for excel_row, csv_row in rows:
+                ws.append(excel_row)
+                writer.writerow(csv_row)
+                count += 1
+        wb.save(tmp_excel)
+        os.replace(tmp_excel, excel_path)
+        os.replace(tmp_csv, csv_path)
+    finally:
+        tmp_excel.unlink(missing_ok=True)
+        tmp_csv.unlink(missing_ok=True)
+    return count
+
+
+def create_review_table(missing_columns=None, stale_days=None):
+    """创建完整的审核表格；missing_columns / stale_days 见模块说明。"""
     print("=" * 60)
     print("创建完整审核表格")
     print("=" * 60)
     print()
     
     # 读取现有Excel
-    if not EXCEL_PATH.exists():
+    if not master_path(EXCEL_PATH).exists():
         print(f"❌ 找不到Excel文件: {EXCEL_PATH}")
         return False
     
     print("📖 读取现有Excel...")
-    df = pd.read_excel(EXCEL_PATH, sheet_name="学校总览")
+    df = load_master(EXCEL_PATH)
     print(f"   现有数据: {len(df)} 条")
     print(f"   现有字段: {len(df.columns)} 个")
     print()
     
-    # 定义完整的字段列表（现有字段 + 新字段 + 审核字段）
-    # 现有字段（保持原有顺序）
+    # 完整的字段列表（现有字段保持原有顺序 + 新字段 + 审核字段）
     existing_columns = list(df.columns)
-    
-    # 新字段（从爬取数据中获取）
-    new_columns = [
-        # 成绩要求详细字段
-        "英语成绩类型",  # TOEFL/TOEIC/IELTS
-        "英语成绩推荐分数",  # 具体分数要求
-        "JLPT等级",  # N1/N2等
-        "JLPT分数要求",  # 具体分数要求
-        "EJU推荐分数",  # JSON格式，包含各科目推荐分数
-        # 出愿材料详细字段
-        "出愿材料清单",  # 完整的材料清单
-        "推荐信要求详细",  # 需要几封、谁写等
-        "出愿流程详细",  # 详细的出愿步骤
-        # 合格情况详细字段
-        "报录比（2024）",  # 2024年报录比
-        "报录比（2023）",  # 2023年报录比
-        "报录比（2022）",  # 2022年报录比
-        "合格者成绩分布",  # 如果有公开的话
-        # 数据来源字段
-        "数据来源",  # 爬取/手动/合并
-        "爬取时间",  # 爬取的时间戳
-        "爬取URL",  # 爬取的网址
-    ]
-    
-    # 审核字段
-    review_columns = [
-        "审核状态",  # 待审核/已审核/需修改/已确认
-        "审核人",  # 审核的老师姓名
-        "审核时间",  # 审核的时间
-        "审核备注",  # 审核时的备注说明
-        "数据质量评分",  # 1-5分，数据完整性和准确性评分
-    ]
-    
-    # 合并所有字段
-    all_columns = existing_columns + new_columns + review_columns
-    
-    # 创建新的DataFrame，包含所有字段
-    df_review = pd.DataFrame(index=df.index, columns=all_columns)
-    
-    # 复制现有数据
-    for col in existing_columns:
-        df_review[col] = df[col]
-    
-    # 初始化新字段为空
-    for col in new_columns + review_columns:
-        df_review[col] = ""
-    
-    # 设置默认审核状态
-    df_review["审核状态"] = "待审核"
-    df_review["数据来源"] = "现有数据"
+    all_columns = existing_columns + NEW_COLUMNS + REVIEW_COLUMNS
     
     print("📊 表格结构:")
     print(f"   - 总字段数: {len(all_columns)} 个")
     print(f"   - 现有字段: {len(existing_columns)} 个")
-    print(f"   - 新增字段: {len(new_columns)} 个")
-    print(f"   - 审核字段: {len(review_columns)} 个")
+    print(f"   - 新增字段: {len(NEW_COLUMNS)} 个")
+    print(f"   - 审核字段: {len(REVIEW_COLUMNS)} 个")
     print()
     
-    # 保存为Excel（供飞书导入）
-    print("💾 保存Excel文件...")
-    with pd.ExcelWriter(OUTPUT_EXCEL, engine='openpyxl') as writer:
-        df_review.to_excel(writer, sheet_name="审核表格", index=False)
+    if missing_columns:
+        unknown = [c for c in missing_columns if c not in df.columns]
+        if unknown:
+            print(f"⚠️  主表没有这些列，不检查: {'、'.join(unknown)}")
+        missing_columns = [c for c in missing_columns if c in df.columns]
+        if not missing_columns:
+            # 要求了按空字段筛选却没有一列可查：不能退回输出全部记录
+            print("❌ --missing 指定的列都不在主表中，未生成审核表格")
+            return False
+    crawl_times = load_crawl_times()
+    stale_before = None if stale_days is None else datetime.now() - timedelta(days=stale_days)
+    if missing_columns or stale_before is not None:
+        print("🔍 只输出需要审核的行:")
+        if missing_columns:
+            print(f"   - 字段为空: {'、'.join(missing_columns)}")
+        if stale_before is not None:
+            print(f"   - 爬取早于 {stale_before:%Y-%m-%d} 或从未爬取（有爬取记录的学部 {len(crawl_times)} 个）")
+        print()
     
+    # 逐行写出 Excel（供飞书导入）和 CSV（飞书也支持CSV导入）
+    print("💾 保存Excel和CSV文件...")
+    rows = review_rows(df, crawl_times, missing_columns, stale_before)
+    count = write_review_table(all_columns, rows)
     print(f"   ✅ Excel已保存: {OUTPUT_EXCEL}")
-    
-    # 同时保存为CSV（飞书也支持CSV导入）
-    print("💾 保存CSV文件...")
-    df_review.to_csv(OUTPUT_CSV, index=False, encoding='utf-8-sig')
     print(f"   ✅ CSV已保存: {OUTPUT_CSV}")
+    print(f"   共 {count} / {len(df)} 条记录")
     print()
     
     # 生成字段说明文档
@@ -155,4 +281,11 @@ def create_review_table():
     return True
 
 if __name__ == "__main__":
-    create_review_table()
+    parser = argparse.ArgumentParser(description="创建完整的审核表格")
+    parser.add_argument("--missing", nargs="*", metavar="列名",
+                        help=f"只输出这些字段有空值的行（不写列名时为 {'、'.join(REQUIRED_COLUMNS)}）")
+    parser.add_argument("--stale-days", type=int, help="只输出最近一次爬取早于 N 天或从未爬取的行")
+    args = parser.parse_args()
+    missing = REQUIRED_COLUMNS if args.missing == [] else args.missing
+    if create_review_table(missing, args.stale_days) is False:
+        sys.exit(1)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+主Excel的预写编辑日志（学部学校一览表.editlog.jsonl）：合并只追加逐行 upsert，整表重写留给 compact 一次完成
+
+未建 SQLite 主库时，合并脚本原来每次都原子重写整个 学部学校一览表.xlsx，哪怕只改了几行；
+两位老师先后运行脚本时，后保存的一方还会用自己读到的旧表覆盖前一方的写入。现在：
+
+- save_master(df, base=读入的主表) 只比较 df 与 base，把有变化的行追加为日志中的一批（一行 JSON），耗时与变化量成正比
+- 每行 upsert 以 [大学, 学部, 同键第几行] 定位：该行存在则只改记录的单元格，不存在则整行追加，
+  所以并发的两次合并各自只写自己改的格；同一格以后写入的一批为准，同时新增的同键行不会重复
+- 追加与压实都持有 .学部学校一览表.editlog.lock 的排他锁（fcntl / msvcrt），读取持共享锁，
+  任何时候读到的都是「工作簿 + 已完整写入的批次」；写到一半中断的末行不完整，读取时忽略
+- load_master 读 Excel 后重放日志，所以导出、审核表、分析脚本在压实前就能看到合并结果
+- compact 在锁内把日志写回工作簿（先备份到 backup_store）并删除日志：一批合并只重写一次整表
+
+日志行格式：
+    {"batch": 3, "time": "...", "source": "merge_reviewed_data.py",
+     "rows": [{"key": ["東京大学", "法学部", 0], "values": {"网上出愿截止时间": {"$datetime": "..."}}}, ...]}
+单元格值的编码与 master_store 相同（空值为 null，日期时间带 $datetime / $date 标记）。
+
+已建主库时不使用本日志：主库本身在事务内逐行 upsert。
+
+用法：
+    python3 scripts/edit_log.py status                  # 尚未压实的批次
+    python3 scripts/edit_log.py compact                 # 写回 学部学校一览表.xlsx 并清空日志
+    python3 scripts/edit_log.py compact --export        # 写回后再运行 export_school_data.py
+"""
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from backup_store import BackupStore
+from master_store import KEY_COLUMNS, MAIN_EXCEL, SHEET_NAME, decode_value, encode_row, encode_value
+from merge_engine import write_workbook
+from workbook_cache import read_sheet
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 文件锁：Linux / macOS 用 fcntl（支持共享锁），Windows 用 msvcrt（只有排他锁）
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    import msvcrt
+    FCNTL_AVAILABLE = False
+
+
+def _key(value):
+    value = encode_value(value)
+    return None if value is None else str(value)
+
+
+def row_keys(df):
+    """每行的定位键 [大学, 学部, 同键第几行]（按表内顺序从 0 数）。"""
+    keys = list(zip(*(df[c].map(_key) for c in KEY_COLUMNS))) if len(df) else []
+    seen = defaultdict(int)
+    result = []
+    for key in keys:
+        result.append([*key, seen[key]])
+        seen[key] += 1
+    return result
+
+
+def _differs(old, new):
+    """两列逐格比较（object 数组），空值与空值视为相同。"""
+    old_na, new_na = pd.isna(old), pd.isna(new)
+    try:
+        equal = np.asarray(old == new, dtype=bool)
+    except (TypeError, ValueError):
+        equal = np.array([bool(a == b) if not (pd.isna(a) or pd.isna(b)) else False for a, b in zip(old, new)])
+    return (old_na != new_na) | (~old_na & ~new_na & ~equal)
+
+
+def diff_rows(base, df):
+    """df 相对 base 的逐行 upsert 列表；df 的前 len(base) 行须与 base 逐行对应（合并只改值、在末尾追加新行）。
+
+    df 删了行或列时无法表示为 upsert，返回 None（调用方改为整表重写）。"""
+    if len(df) < len(base) or any(c not in df.columns for c in [*base.columns, *KEY_COLUMNS]):
+        return None
+    n = len(base)
+    changed = defaultdict(dict)
+    for col in df.columns:
+        new = df[col].to_numpy(dtype=object)[:n]
+        mask = _differs(base[col].to_numpy(dtype=object), new) if col in base.columns else ~pd.isna(new)
+        for i in np.flatnonzero(mask):
+            changed[i][str(col)] = encode_value(new[i])
+    base_keys = row_keys(base)
+    rows = [{"key": base_keys[i], "values": changed[i]} for i in sorted(changed)]
+    if len(df) > n:
+        columns = [str(c) for c in df.columns]
+        for key, values in zip(row_keys(df)[n:], df.iloc[n:].itertuples(index=False, name=None)):
+            rows.append({"key": key, "values": encode_row(columns, values)})
+    return rows
+
+
+def _set_cells(df, positions, col, values):
+    """按行位置批量写入一列；取值与原列类型不兼容时先转为 object 列（同 merge_engine）。"""
+    try:
+        df.iloc[positions, df.columns.get_loc(col)] = values
+    except (TypeError, ValueError):
+        df[col] = df[col].astype(object)
+        df.iloc[positions, df.columns.get_loc(col)] = values
+
+
+def apply_batches(frame, batches):
+    """按顺序把日志批次重放到 frame 上，返回 (新表, {updated, inserted, changedCells})。"""
+    columns = list(frame.columns)
+    index = defaultdict(list)  # (大学, 学部) → [行位置]
+    for position, key in enumerate(row_keys(frame)):
+        index[tuple(key[:-1])].append(position)
+    n = len(frame)
+    updates, appended = defaultdict(dict), []
+    stats = {"updated": 0, "inserted": 0, "changedCells": 0}
+    for batch in batches:
+        for row in batch["rows"]:
+            *key, occurrence = row["key"]
+            positions = index[tuple(key)]
+            values = {c: decode_value(v) for c, v in row["values"].items()}
+            columns.extend(c for c in values if c not in columns)
+            if occurrence < len(positions):
+                position = positions[occurrence]
+                target = updates[position] if position < n else appended[position - n]
+                target.update(values)
+                stats["updated"] += 1
+                stats["changedCells"] += len(values)
+            else:
+                positions.append(n + len(appended))
+                appended.append(values)
+                stats["inserted"] += 1
+
+    result = frame.reindex(columns=columns) if len(columns) > len(frame.columns) else frame.copy()
+    by_column = defaultdict(lambda: ([], []))
+    for position, values in updates.items():
+        for col, value in values.items():
+            by_column[col][0].append(position)
+            by_column[col][1].append(value)
+    for col, (positions, values) in by_column.items():
+        _set_cells(result, positions, col, values)
+    if appended:
+        result = pd.concat([result, pd.DataFrame(appended, columns=columns)], ignore_index=True)
+    return result, stats
+
+
+class EditLog:
+    """一个工作簿的编辑日志；日志与锁文件放在工作簿旁边。"""
+
+    def __init__(self, excel_path=MAIN_EXCEL, sheet_name=SHEET_NAME):
+        self.excel_path = Path(excel_path)
+        self.sheet_name = sheet_name
+        self.path = self.excel_path.with_name(f"{self.excel_path.stem}.editlog.jsonl")
+        self.lock_path = self.excel_path.with_name(f".{self.excel_path.stem}.editlog.lock")
+
+    @contextmanager
+    def locked(self, exclusive=True):
+        """持有锁文件的锁；fcntl 不可用时共享锁也按排他锁处理。"""
+        with open(self.lock_path, "a+b") as f:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def batches(self):
+        """已完整写入的批次；末行不完整（写入中断）时忽略。调用方应持有锁。"""
+        if not self.path.exists():
+            return []
+        batches = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    batches.append(json.loads(line))
+                except ValueError:
+                    print(f"⚠️  {self.path.name} 中有一行不完整（写入中断？），已忽略")
+        return batches
+
+    def pending(self):
+        with self.locked(exclusive=False):
+            return self.batches()
+
+    def read(self):
+        """工作簿 + 日志重放后的主表；没有日志时就是工作簿本身（经 workbook_cache）。"""
+        if not self.path.exists():
+            return read_sheet(self.excel_path, self.sheet_name)
+        with self.locked(exclusive=False):
+            frame = read_sheet(self.excel_path, self.sheet_name)
+            batches = self.batches()
+        return apply_batches(frame, batches)[0] if batches else frame
+
+    def append(self, rows, source):
+        """在排他锁内追加一批 upsert（一行 JSON，写完 fsync），返回 {batch: 批号, pending: 待写回批数}；
+        rows 为空时不写，batch 为 None。"""
+        stats = {"batch": None}
+        with self.locked():
+            batches = self.batches()
+            stats["pending"] = len(batches)
+            if not rows:
+                return stats
+            stats["batch"] = max((b["batch"] for b in batches), default=0) + 1
+            line = json.dumps({"batch": stats["batch"], "time": datetime.now().isoformat(timespec="seconds"),
+                               "source": source, "rows": rows}, ensure_ascii=False, separators=(",", ":"))
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            stats["pending"] += 1
+        return stats
+
+    def compact(self, backup=True):
+        """在排他锁内把日志写回工作簿并删除日志；返回重放统计（含 batches），没有日志时返回 None。"""
+        with self.locked():
+            batches = self.batches()
+            if not batches:
+                self.path.unlink(missing_ok=True)
+                return None
+            frame, stats = apply_batches(read_sheet(self.excel_path, self.sheet_name), batches)
+            if backup:
+                stats["backup"] = BackupStore().backup(self.excel_path)
+            write_workbook(frame, self.excel_path, self.sheet_name)
+            self.path.unlink()
+        stats["batches"] = len(batches)
+        stats["rows"] = len(frame)
+        return stats
+
+    def rewrite(self, df):
+        """整表重写（df 已含日志中的修改，如经 load_master 读入）并删除日志。"""
+        with self.locked():
+            write_workbook(df, self.excel_path, self.sheet_name)
+            self.path.unlink(missing_ok=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="主Excel的预写编辑日志")
+    parser.add_argument("--excel", type=Path, default=MAIN_EXCEL, help=f"工作簿（默认 {MAIN_EXCEL.name}）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="尚未压实的批次")
+    p = sub.add_parser("compact", help="把日志写回工作簿并清空日志")
+    p.add_argument("--export", action="store_true", help="写回后运行 export_school_data.py")
+    p.add_argument("--no-backup", action="store_true", help="写回前不备份工作簿")
+    args = parser.parse_args(argv)
+
+    log = EditLog(args.excel)
+    if args.command == "status":
+        batches = log.pending()
+        if not batches:
+            print(f"✅ {args.excel.name} 没有待写回的修改")
+            return 0
+        print(f"📊 {log.path.name}: {len(batches)} 批、{sum(len(b['rows']) for b in batches)} 行 upsert 待写回")
+        for b in batches:
+            print(f"   #{b['batch']:<4} {b['time']} {b['source'] or '':<28} {len(b['rows'])} 行")
+        print("   写回: python3 scripts/edit_log.py compact")
+    elif args.command == "compact":
+        stats = log.compact(backup=not args.no_backup)
+        if stats is None:
+            print(f"✅ {args.excel.name} 没有待写回的修改")
+        else:
+            print(f"✅ 已把 {stats['batches']} 批修改写回 {args.excel.name}：更新 {stats['updated']} 行"
+                  f"（{stats['changedCells']} 格），新增 {stats['inserted']} 行，共 {stats['rows']} 行")
+            if "backup" in stats:
+                print(f"   写回前的工作簿已备份: {stats['backup']['sha256'][:12]}")
+        if args.export:
+            sys.path.insert(0, str(ROOT))
+            import export_school_data
+            export_school_data.main([])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
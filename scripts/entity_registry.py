@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大学 / 学部实体登记表（data/entity_registry.json）：给每所大学、每个学部分配稳定的整数编号，并登记所有已知写法
+
+主表、爬取结果、合格实绩.xlsx 中同一所大学常有繁简、日汉异体、括号备注等不同写法。
+各脚本不再各自维护映射表，统一经本模块把写法解析为编号，再按编号连接：
+    merge_engine       MergeSpec(resolve_entities=True) 的 大学/学部 键按编号匹配
+    export_school_data school-master.json 每条记录带 schoolId / departmentId
+    analyze_admission_scores  合格实绩按编号归并到主表的规范名，模型条目带同样的 schoolId / departmentId
+    export_search_index       大学名的所有已知写法都收进检索索引
+    master_store.save_master  合并写入主表后自动登记新出现的大学、学部
+
+格式（format = "entities-v1"，每个实体一行，便于审阅 diff）：
+    {"format": "entities-v1",
+     "universities": [{"id": 1, "name": "東京大学", "variants": ["东京大学"]}, ...],
+     "departments": [{"id": 1, "universityId": 1, "name": "法学部", "variants": []}, ...]}
+
+- 编号只增不改：已登记的实体保持原编号，新实体取当前最大编号 + 1（含已合并的编号，不会复用）
+- 学部按所属大学登记，不同大学的同名学部是不同实体
+- 解析：写法经 name_normalizer 规范化（NFKC、简繁统一为日本新字体、去空白）后查哈希表（O(1)）；
+  查不到时再去掉括号备注（如 "(ICU)"、"(後期)"）重查，大学名还把末尾的「大学院」换成「大学」
+- 规范化后相同的两个实体（如 静冈大学 / 静岡大学）由 build 合并：保留一个编号，另一个记为
+  {"id": ..., "name": ..., "mergedInto": 保留的编号}，其写法并入保留的实体
+
+用法：
+    python3 scripts/entity_registry.py build                       # 登记主表中尚未登记的大学、学部，合并重复实体
+    python3 scripts/entity_registry.py check                       # 列出主表、爬取结果、合格实绩中无法解析的写法
+    python3 scripts/entity_registry.py add-variant 早稲田大学 早大   # 登记大学的其它写法
+    python3 scripts/entity_registry.py add-variant 法学部 法律学部 --university 早稲田大学
+    python3 scripts/entity_registry.py lookup 东京大学 法学部
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+from name_normalizer import TRANSLATION, normalize_name, normalize_series
+
+ROOT = Path(__file__).resolve().parent.parent
+REGISTRY_PATH = ROOT / "data" / "entity_registry.json"
+CRAWL_RESULTS_DIR = ROOT / "crawled_data" / "unified_crawl_results"
+URL_MAPPING_PATH = ROOT / "crawled_data" / "university_urls.json"
+FORMAT = "entities-v1"
+
+_BRACKETED = re.compile(r"\([^)]*\)|（[^）]*）")
+
+
+def name_key(name):
+    """写法的查找键（name_normalizer.normalize_name）；空值为空串。"""
+    return normalize_name(name)
+
+
+def clean_university_name(name):
+    """去掉括号备注、把末尾的「大学院」换成「大学」（如 "国際基督教大学(ICU)" -> "国際基督教大学"）。"""
+    if name is None or name != name:
+        return ""
+    name = _BRACKETED.sub("", str(name)).strip()
+    return re.sub(r"大学院$", "大学", name)
+
+
+class EntityRegistry:
+    def __init__(self, payload=None, path=REGISTRY_PATH):
+        payload = payload or {"format": FORMAT, "universities": [], "departments": []}
+        if payload.get("format") != FORMAT:
+            raise ValueError(f"不支持的格式: {payload.get('format')}")
+        self.path = path
+        self.universities = {}   # id → {"id", "name", "variants"}
+        self.departments = {}    # id → {"id", "universityId", "name", "variants"}
+        self.merged = {"universities": {}, "departments": {}}   # 已合并的编号 → {"id", "name", "mergedInto"}
+        self._university_index = {}   # 写法键 → 大学编号
+        self._department_index = {}   # (大学编号, 写法键) → 学部编号
+        for section, entities in (("universities", self.universities), ("departments", self.departments)):
+            for entry in payload[section]:
+                if "mergedInto" in entry:
+                    self.merged[section][entry["id"]] = entry
+                else:
+                    entities[entry["id"]] = entry
+        self._reindex()
+
+    def _reindex(self):
+        """重建写法索引；规范化后相同的写法指向编号较小的实体（build 时再合并）。"""
+        self._university_index = {}
+        self._department_index = {}
+        for uid in sorted(self.universities):
+            entry = self.universities[uid]
+            for name in [entry["name"], *entry["variants"]]:
+                self._university_index.setdefault(name_key(name), uid)
+        for did in sorted(self.departments):
+            entry = self.departments[did]
+            for name in [entry["name"], *entry["variants"]]:
+                self._department_index.setdefault((entry["universityId"], name_key(name)), did)
+
+    @classmethod
+    def load(cls, path=REGISTRY_PATH):
+        path = Path(path)
+        if not path.exists():
+            return cls(path=path)
+        return cls(json.loads(path.read_text(encoding="utf-8")), path=path)
+
+    # ---------- 解析 ----------
+
+    def university_id(self, name, key=None):
+        """大学写法 → 编号；未登记返回 None。key 为已算好的 name_key(name)。"""
+        key = name_key(name) if key is None else key
+        uid = self._university_index.get(key)
+        if uid is None and key:
+            uid = self._university_index.get(name_key(clean_university_name(name)))
+        return uid
+
+    def department_id(self, university_id, name, key=None):
+        """学部写法 → 编号（在 university_id 所属大学内查找，查不到时去掉括号备注重查）；未登记或学部名为空返回 None。"""
+        if university_id is None:
+            return None
+        key = name_key(name) if key is None else key
+        did = self._department_index.get((university_id, key))
+        if did is None and key:
+            did = self._department_index.get((university_id, normalize_name(name, strip_brackets=True)))
+        return did
+
+    def resolve(self, university, department=None):
+        """(大学写法, 学部写法) → (大学编号, 学部编号)，未登记的部分为 None。"""
+        uid = self.university_id(university)
+        return uid, self.department_id(uid, department)
+
+    def resolve_pairs(self, universities, departments):
+        """整列解析，返回 (大学编号列表, 学部编号列表)；两列先整列规范化（normalize_series），同一对键只查一次。"""
+        universities, departments = list(universities), list(departments)
+        university_keys = normalize_series(universities).tolist()
+        department_keys = normalize_series(departments).tolist()
+        cache = {}
+        uids, dids = [], []
+        for name, department, ukey, dkey in zip(universities, departments, university_keys, department_keys):
+            ids = cache.get((ukey, dkey))
+            if ids is None:
+                uid = self.university_id(name, ukey)
+                ids = cache[(ukey, dkey)] = (uid, self.department_id(uid, department, dkey))
+            uids.append(ids[0])
+            dids.append(ids[1])
+        return uids, dids
+
+    def university_name(self, university_id):
+        return self.universities[university_id]["name"]
+
+    def department_name(self, department_id):
+        return self.departments[department_id]["name"]
+
+    def canonical_university(self, name):
+        """已登记时返回规范名，否则返回去掉括号备注后的原写法。"""
+        uid = self.university_id(name)
+        return self.university_name(uid) if uid is not None else clean_university_name(name)
+
+    def university_variants(self, name):
+        """该大学的规范名与所有已登记写法（未登记时只有 name 本身）。"""
+        uid = self.university_id(name)
+        if uid is None:
+            return {name}
+        entry = self.universities[uid]
+        return {name, entry["name"], *entry["variants"]}
+
+    # ---------- 登记 ----------
+
+    def add_university(self, name):
+        """登记大学（已能解析时返回已有编号），返回编号。"""
+        uid = self._university_index.get(name_key(name))
+        if uid is not None:
+            return uid
+        name = str(name).strip()
+        if not name:
+            raise ValueError("大学名为空")
+        uid = max([*self.universities, *self.merged["universities"]], default=0) + 1
+        self.universities[uid] = {"id": uid, "name": name, "variants": []}
+        self._university_index[name_key(name)] = uid
+        return uid
+
+    def add_department(self, university_id, name):
+        """登记学部（已能解析时返回已有编号），返回编号。"""
+        did = self._department_index.get((university_id, name_key(name)))
+        if did is not None:
+            return did
+        name = str(name).strip()
+        if not name:
+            raise ValueError("学部名为空")
+        did = max([*self.departments, *self.merged["departments"]], default=0) + 1
+        self.departments[did] = {"id": did, "universityId": university_id, "name": name, "variants": []}
+        self._department_index[(university_id, name_key(name))] = did
+        return did
+
+    def add_university_variant(self, university_id, variant):
+        """登记大学的其它写法；该写法已指向另一所大学时抛出 ValueError。返回是否新增。"""
+        key = name_key(variant)
+        owner = self._university_index.get(key)
+        if owner == university_id:
+            return False
+        if owner is not None:
+            raise ValueError(f"「{variant}」已登记为 {self.university_name(owner)}（#{owner}）")
+        self.universities[university_id]["variants"].append(str(variant).strip())
+        self._university_index[key] = university_id
+        return True
+
+    def add_department_variant(self, department_id, variant):
+        """登记学部的其它写法；该写法已指向同一大学的另一学部时抛出 ValueError。返回是否新增。"""
+        entry = self.departments[department_id]
+        key = (entry["universityId"], name_key(variant))
+        owner = self._department_index.get(key)
+        if owner == department_id:
+            return False
+        if owner is not None:
+            raise ValueError(f"「{variant}」已登记为 {self.department_name(owner)}（#{owner}）")
+        entry["variants"].append(str(variant).strip())
+        self._department_index[key] = department_id
+        return True
+
+    def register_pairs(self, universities, departments):
+        """登记各行尚未登记的大学、学部（按出现顺序编号），返回 (新增大学数, 新增学部数)。"""
+        new_universities = new_departments = 0
+        seen = set()
+        for university, department in zip(universities, departments):
+            key = (name_key(university), name_key(department))
+            if key in seen or not key[0]:
+                continue
+            seen.add(key)
+            uid = self._university_index.get(key[0])
+            if uid is None:
+                uid = self.add_university(university)
+                new_universities += 1
+            if key[1] and (uid, key[1]) not in self._department_index:
+                self.add_department(uid, department)
+                new_departments += 1
+        return new_universities, new_departments
+
+    # ---------- 合并 ----------
+
+    def duplicates(self):
+        """规范化后写法相同的大学：[(保留的编号, [并入的编号, ...]), ...]。
+
+        优先保留名称本身已是规范写法（NFKC、新字体下不变）的实体，其次保留编号小的。"""
+        parent = {uid: uid for uid in self.universities}
+
+        def find(uid):
+            while parent[uid] != uid:
+                uid = parent[uid]
+            return uid
+
+        owners = {}
+        for uid in sorted(self.universities):
+            entry = self.universities[uid]
+            for name in [entry["name"], *entry["variants"]]:
+                other = owners.setdefault(name_key(name), uid)
+                parent[find(uid)] = find(other)
+        groups = {}
+        for uid in self.universities:
+            groups.setdefault(find(uid), []).append(uid)
+        result = []
+        for ids in groups.values():
+            if len(ids) < 2:
+                continue
+            keep = min(ids, key=lambda i: (not _is_canonical(self.universities[i]["name"]), i))
+            result.append((keep, sorted(set(ids) - {keep})))
+        return sorted(result)
+
+    def merge_university(self, keep, merged):
+        """把大学 merged 并入 keep：写法与学部并入，同名学部再合并；merged 记为 mergedInto。"""
+        source = self.universities.pop(merged)
+        target = self.universities[keep]
+        target["variants"] += [n for n in [source["name"], *source["variants"]] if n not in target["variants"]]
+        self.merged["universities"][merged] = {"id": merged, "name": source["name"], "mergedInto": keep}
+        by_key = {}
+        for did in sorted(self.departments):
+            entry = self.departments[did]
+            if entry["universityId"] == keep:
+                by_key.setdefault(name_key(entry["name"]), did)
+        for did in sorted(d for d, e in self.departments.items() if e["universityId"] == merged):
+            entry = self.departments[did]
+            owner = by_key.get(name_key(entry["name"]))
+            if owner is None:
+                entry["universityId"] = keep
+                by_key[name_key(entry["name"])] = did
+                continue
+            kept = self.departments[owner]
+            kept["variants"] += [n for n in [entry["name"], *entry["variants"]]
+                                 if n != kept["name"] and n not in kept["variants"]]
+            del self.departments[did]
+            self.merged["departments"][did] = {"id": did, "name": entry["name"], "mergedInto": owner}
+        self._reindex()
+
+    def merge_duplicates(self):
+        """合并所有重复的大学，返回 duplicates() 的结果。"""
+        found = self.duplicates()
+        for keep, merged in found:
+            for uid in merged:
+                self.merge_university(keep, uid)
+        return found
+
+    def canonical_id(self, section, entity_id):
+        """已合并的编号换成最终保留的编号。"""
+        while entity_id in self.merged[section]:
+            entity_id = self.merged[section][entity_id]["mergedInto"]
+        return entity_id
+
+    # ---------- 读写 ----------
+
+    def to_payload(self):
+        def entries(section, live):
+            merged = self.merged[section]
+            return [live[i] if i in live else merged[i] for i in sorted([*live, *merged])]
+        return {
+            "format": FORMAT,
+            "universities": entries("universities", self.universities),
+            "departments": entries("departments", self.departments),
+        }
+
+    def save(self, path=None):
+        """原子写回；每个实体单独一行。"""
+        path = Path(path or self.path)
+        payload = self.to_payload()
+        lines = ['{"format": ' + json.dumps(FORMAT) + ",\n"]
+        for i, section in enumerate(("universities", "departments")):
+            entries = ",\n".join(json.dumps(e, ensure_ascii=False) for e in payload[section])
+            lines.append(f'"{section}": [\n{entries}\n]' + (",\n" if i == 0 else "\n"))
+        lines.append("}\n")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text("".join(lines), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+def _is_canonical(name):
+    """名称在 NFKC 与新字体转换下不变。"""
+    return unicodedata.normalize("NFKC", name).translate(TRANSLATION) == name
+
+
+_CACHE = {}
+
+
+def load_registry(path=REGISTRY_PATH):
+    """读取登记表；文件未变化时复用同一个实例（watch_export 等长时间运行的进程每轮调用也只解析一次）。"""
+    path = Path(path)
+    stamp = path.stat().st_mtime_ns if path.exists() else None
+    cached = _CACHE.get(path)
+    if cached is None or cached[0] != stamp:
+        cached = _CACHE[path] = (stamp, EntityRegistry.load(path))
+    return cached[1]
+
+
+def register_master(df, path=REGISTRY_PATH):
+    """主表写入后登记新出现的大学、学部并保存，返回 (新增大学数, 新增学部数)。"""
+    if "大学" not in df.columns or "学部" not in df.columns:
+        return 0, 0
+    registry = load_registry(path)
+    added = registry.register_pairs(df["大学"].tolist(), df["学部"].tolist())
+    if any(added):
+        registry.save()
+        _CACHE[Path(path)] = (Path(path).stat().st_mtime_ns, registry)
+    return added
+
+
+# ---------- 命令行 ----------
+
+def _crawl_pairs():
+    """最新一次爬取结果与 URL 映射表中的 (大学, 学部) 写法。"""
+    pairs = []
+    files = sorted(CRAWL_RESULTS_DIR.glob("crawl_results_*.json"), key=lambda p: p.stat().st_mtime)
+    if files:
+        items = json.loads(files[-1].read_text(encoding="utf-8"))
+        pairs += [(item.get("university"), item.get("department")) for item in items]
+    if URL_MAPPING_PATH.exists():
+        pairs += [(name, None) for name in json.loads(URL_MAPPING_PATH.read_text(encoding="utf-8"))]
+    return pairs
+
+
+def _admission_pairs():
+    import analyze_admission_scores
+    if not analyze_admission_scores.EXCEL_PATH.exists():
+        return []
+    return [(r.get("大学"), r.get("学部")) for r in analyze_admission_scores.load_records()]
+
+
+def unresolved(registry, pairs):
+    """返回 (无法解析的大学写法计数, 大学可解析但学部无法解析的 (规范大学名, 学部写法) 计数)。"""
+    universities, departments = Counter(), Counter()
+    pairs = [(u, d) for u, d in pairs if name_key(u)]
+    uids, dids = registry.resolve_pairs([u for u, _ in pairs], [d for _, d in pairs])
+    for (university, department), uid, did in zip(pairs, uids, dids):
+        if uid is None:
+            universities[str(university).strip()] += 1
+        elif did is None and name_key(department):
+            departments[(registry.university_name(uid), str(department).strip())] += 1
+    return universities, departments
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="大学 / 学部实体登记表")
+    parser.add_argument("--registry", type=Path, default=REGISTRY_PATH, help="登记表路径（默认 data/entity_registry.json）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="登记主表中尚未登记的大学、学部，合并重复实体")
+    p = sub.add_parser("check", help="列出各数据源中无法解析的写法")
+    p.add_argument("-n", "--limit", type=int, default=20, help="每类最多列出多少个（默认 20）")
+    p = sub.add_parser("add-variant", help="登记其它写法")
+    p.add_argument("name", help="已登记的规范名（或任一已知写法）")
+    p.add_argument("variant")
+    p.add_argument("--university", help="登记学部写法时所属的大学")
+    p = sub.add_parser("lookup", help="解析写法")
+    p.add_argument("university")
+    p.add_argument("department", nargs="?")
+    args = parser.parse_args(argv)
+
+    registry = EntityRegistry.load(args.registry)
+    if args.command == "build":
+        from master_store import load_master
+        df = load_master()
+        for keep, merged in registry.merge_duplicates():
+            names = "、".join(f"{registry.merged['universities'][m]['name']}（#{m}）" for m in merged)
+            print(f"🔀 {names} 并入 {registry.university_name(keep)}（#{keep}）")
+        added = registry.register_pairs(df["大学"].tolist(), df["学部"].tolist())
+        registry.save()
+        print(f"✅ 新登记大学 {added[0]} 所、学部 {added[1]} 个；共 {len(registry.universities)} 所大学、"
+              f"{len(registry.departments)} 个学部 → {args.registry}")
+    elif args.command == "check":
+        from master_store import load_master
+        df = load_master()
+        sources = {
+            "主表": list(zip(df["大学"].tolist(), df["学部"].tolist())),
+            "爬取结果": _crawl_pairs(),
+            "合格实绩": _admission_pairs(),
+        }
+        failed = False
+        for keep, merged in registry.duplicates():
+            failed = True
+            names = "、".join(f"{registry.university_name(i)}（#{i}）" for i in [keep, *merged])
+            print(f"⚠️  规范化后相同的大学: {names}")
+        for source, pairs in sources.items():
+            universities, departments = unresolved(registry, pairs)
+            if not universities and not departments:
+                print(f"✅ {source}: {len(pairs)} 行全部可解析")
+                continue
+            failed = failed or source == "主表"
+            print(f"⚠️  {source}: {len(pairs)} 行中 {sum(universities.values())} 行大学无法解析"
+                  f"（{len(universities)} 种写法），{sum(departments.values())} 行学部无法解析（{len(departments)} 种写法）")
+            for name, n in universities.most_common(args.limit):
+                print(f"     · {name} ×{n}")
+            for (university, department), n in departments.most_common(args.limit):
+                print(f"     · {university} / {department} ×{n}")
+        if failed:
+            print("   主表有未登记的写法或重复实体，运行: python3 scripts/entity_registry.py build")
+            return 1
+    elif args.command == "add-variant":
+        try:
+            if args.university:
+                uid = registry.university_id(args.university)
+                did = registry.department_id(uid, args.name)
+                if did is None:
+                    print(f"❌ 未登记的学部: {args.university} / {args.name}")
+                    return 1
+                added = registry.add_department_variant(did, args.variant)
+                target = f"{registry.university_name(uid)} / {registry.department_name(did)}（#{did}）"
+            else:
+                uid = registry.university_id(args.name)
+                if uid is None:
+                    print(f"❌ 未登记的大学: {args.name}")
+                    return 1
+                added = registry.add_university_variant(uid, args.variant)
+                target = f"{registry.university_name(uid)}（#{uid}）"
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        if added:
+            registry.save()
+            print(f"✅ 已登记「{args.variant}」→ {target}")
+        else:
+            print(f"「{args.variant}」已是 {target} 的写法")
+    elif args.command == "lookup":
+        uid, did = registry.resolve(args.university, args.department)
+        if uid is None:
+            print(f"❌ 未登记的大学: {args.university}")
+            return 1
+        print(f"大学 #{uid} {registry.university_name(uid)}")
+        if args.department:
+            print(f"学部 #{did} {registry.department_name(did)}" if did is not None else f"❌ 未登记的学部: {args.department}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学校总览列式格式（school-master.columnar.json）：每个字段一列，低基数字段做字典编码
+
+格式（format = "columnar-v1"）：
+    {
+      "format": "columnar-v1",
+      "count": 3028,
+      "fields": ["name", "department", ...],          # 与 COLUMN_MAP 顺序一致
+      "columns": {
+        "region": {"encoding": "dict", "dict": ["東京都", ...], "codes": [0, 0, 3, -1, ...]},
+        "mailStart": {"encoding": "epoch", "values": [1764547200, null, ...]},
+        "major": {"encoding": "plain", "values": ["情報科学科", null, ...]}
+      }
+    }
+
+- dict：codes 为字典下标，-1 表示空值；字典按出现次数降序，常见值编码最短
+- epoch：日期按 "YYYY-MM-DD HH:MM:SS"（无时区，按 UTC 换算）转为秒级时间戳，null 表示空值
+- plain：原样保存，null 表示空值
+
+decode() 还原出的行对象与 school-master.json 中的 data 完全一致（键顺序相同、空字段省略）。
+前端解码见 js/school-master-columnar.js。
+
+用法：
+    python3 export_school_data.py --columnar                   # 导出时同时写出列式文件
+    python3 scripts/export_columnar.py --verify               # 校验列式文件可还原为 school-master.json
+"""
+import argparse
+import json
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+FORMAT = "columnar-v1"
+OUTPUT_COLUMNAR = Path(__file__).parent.parent / "school-master.columnar.json"
+SOURCE_JSON = Path(__file__).parent.parent / "school-master.json"
+
+# 明确做字典编码的低基数字段；其余字段若不同取值不超过一半也会字典编码
+CATEGORICAL_FIELDS = {"region", "bunri", "selectionMethod", "period", "combined", "ejuPeriod", "examFormat"}
+DATE_FIELDS = {"mailStart", "mailEnd", "mailStartDate", "mailEndDate", "examDate", "examDate2", "announcementDate"}
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _to_epoch(value):
+    """日期文本转秒级时间戳；无法无损还原时返回 None。"""
+    try:
+        dt = datetime.strptime(value, DATETIME_FORMAT)
+    except ValueError:
+        return None
+    if dt.strftime(DATETIME_FORMAT) != value:
+        return None
+    return int(dt.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _from_epoch(seconds):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime(DATETIME_FORMAT)
+
+
+def encode_column(field, values):
+    """编码单列（values 中空值为 None）。"""
+    if field in DATE_FIELDS:
+        epochs = [None if v is None else _to_epoch(v) for v in values]
+        # 含非标准日期文本（如「未定」）时退回普通编码
+        if all(e is not None or v is None for e, v in zip(epochs, values)):
+            return {"encoding": "epoch", "values": epochs}
+    counts = Counter(v for v in values if v is not None)
+    if field in CATEGORICAL_FIELDS or len(counts) * 2 <= len(values):
+        dictionary = [v for v, _ in counts.most_common()]
+        lookup = {v: i for i, v in enumerate(dictionary)}
+        return {"encoding": "dict", "dict": dictionary, "codes": [-1 if v is None else lookup[v] for v in values]}
+    return {"encoding": "plain", "values": list(values)}
+
+
+def encode(frame):
+    """把 export_school_data.normalize_frame 的结果编码为列式 payload。"""
+    columns = {}
+    for field in frame.columns:
+        values = [None if v is None or v != v else v for v in frame[field].tolist()]
+        columns[field] = encode_column(field, values)
+    return {"format": FORMAT, "count": len(frame), "fields": list(frame.columns), "columns": columns}
+
+
+def decode_column(column, count):
+    """解码单列，返回长度为 count 的列表（空值为 None）。"""
+    encoding = column["encoding"]
+    if encoding == "dict":
+        dictionary = column["dict"]
+        return [None if c < 0 else dictionary[c] for c in column["codes"]]
+    if encoding == "epoch":
+        return [None if v is None else _from_epoch(v) for v in column["values"]]
+    if encoding == "plain":
+        return list(column["values"])
+    raise ValueError(f"未知的列编码: {encoding}")
+
+
+def decode(payload):
+    """还原为行对象列表，与 school-master.json 的 data 一致。"""
+    if payload.get("format") != FORMAT:
+        raise ValueError(f"不支持的格式: {payload.get('format')}")
+    count = payload["count"]
+    fields = payload["fields"]
+    columns = [decode_column(payload["columns"][f], count) for f in fields]
+    rows = []
+    for values in zip(*columns):
+        rows.append({f: v for f, v in zip(fields, values) if v is not None})
+    return rows
+
+
+def write(frame, path=OUTPUT_COLUMNAR):
+    payload = encode(frame)
+    text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    path.write_text(text, encoding="utf-8")
+    return len(text.encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="学校总览列式格式工具")
+    parser.add_argument("--verify", action="store_true", help="校验列式文件可还原为 school-master.json")
+    parser.add_argument("--columnar", type=Path, default=OUTPUT_COLUMNAR)
+    parser.add_argument("--source", type=Path, default=SOURCE_JSON)
+    args = parser.parse_args()
+
+    if not args.verify:
+        parser.print_help()
+        return
+    with open(args.columnar, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    with open(args.source, "r", encoding="utf-8") as f:
+        expected = json.load(f)["data"]
+    rows = decode(payload)
+    if rows != expected or [list(r) for r in rows] != [list(r) for r in expected]:
+        print(f"❌ 还原结果与 {args.source.name} 不一致")
+        sys.exit(1)
+    print(f"✅ {len(rows)} 条记录还原一致（列式 {args.columnar.stat().st_size} 字节，"
+          f"原文件 {args.source.stat().st_size} 字节）")
+
+
+if __name__ == "__main__":
+    main()
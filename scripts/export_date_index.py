@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学校总览日期索引（school-master.dates.json），供 compass_application 按时间段查询出愿窗口与考试日期
+
+导出时把所有日期一次性解析为整数（"YYYY-MM-DD HH:MM:SS" 按 UTC 换算的秒级时间戳），并建立：
+- events：单点日期（出愿开始/截止、邮寄开始/截止、校内考、发榜），每个字段一组按时间升序的
+  [时间, 记录 id] 数组；「某天有哪些考试」= 二分定位区间两端，O(log n + k)
+- windows：出愿窗口（网上 mailStart~mailEnd、邮寄 mailStartDate~mailEndDate），按开始时间升序，
+  并附隐式平衡树每个节点子树内的最大截止时间 maxEnd（区间树）；
+  「这一周内哪些项目可以出愿」= 开始 ≤ 周末 且 截止 ≥ 周初，O(log n + k)
+- invalid：开始晚于截止的窗口（Excel 填写有误），不进入区间树，单独列出便于核对
+
+记录 id 为 school-master.json 中 data 的下标。查询结果均为升序记录 id，与逐行扫描一致。
+
+用法：
+    python3 export_school_data.py --date-index
+    python3 scripts/export_date_index.py event examDate 2026-02-25              # 当天的校内考
+    python3 scripts/export_date_index.py window online 2025-12-01 2025-12-07    # 该周内可网上出愿
+    python3 scripts/export_date_index.py --check                                # 随机区间与逐行扫描比对
+"""
+import argparse
+import bisect
+import json
+import random
+import sys
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+FORMAT = "dates-v1"
+OUTPUT_DATES = Path(__file__).parent.parent / "school-master.dates.json"
+SOURCE_JSON = Path(__file__).parent.parent / "school-master.json"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+DATE_FORMAT = "%Y-%m-%d"
+
+EVENT_FIELDS = ["mailStart", "mailEnd", "mailStartDate", "mailEndDate", "examDate", "examDate2", "announcementDate"]
+# 窗口名 → (开始字段, 截止字段)
+WINDOW_FIELDS = {
+    "online": ("mailStart", "mailEnd"),
+    "mail": ("mailStartDate", "mailEndDate"),
+}
+
+
+def to_epoch(value):
+    """日期文本 / date / datetime → 秒级时间戳（无时区，按 UTC 换算）；无法解析时返回 None。"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime(value.year, value.month, value.day)
+    else:
+        text = str(value).strip()
+        for fmt in (DATETIME_FORMAT, DATE_FORMAT):
+            try:
+                dt = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return None
+    return int(dt.replace(tzinfo=timezone.utc).timestamp())
+
+
+def from_epoch(seconds):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime(DATETIME_FORMAT)
+
+
+def parse_bounds(start, end=None):
+    """查询区间 [start, end]（闭区间，秒）。只给 start 时取它所在的那一天（0:00–23:59:59，带时刻也一样）；
+    end 只写日期时包含当天全天。"""
+    lo = to_epoch(start)
+    if lo is None:
+        raise ValueError(f"无法解析日期: {start}")
+    if end is None:
+        day = lo - lo % 86400
+        return day, day + 86400 - 1
+    hi = to_epoch(end)
+    if hi is None:
+        raise ValueError(f"无法解析日期: {end}")
+    if (isinstance(end, str) and len(end.strip()) == len("YYYY-MM-DD")) or type(end) is date:
+        hi += 86400 - 1
+    return lo, hi
+
+
+# ---------- 导出 ----------
+
+def _max_end_tree(ends):
+    """隐式平衡树：区间 [lo, hi) 的根为 (lo + hi) // 2，maxEnd[根] = 该子树内最大截止时间。"""
+    max_end = [0] * len(ends)
+
+    def build(lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        best = ends[mid]
+        for child in (build(lo, mid), build(mid + 1, hi)):
+            if child is not None and child > best:
+                best = child
+        max_end[mid] = best
+        return best
+
+    build(0, len(ends))
+    return max_end
+
+
+def build_index(columns, count):
+    """columns：{js 键: 与记录顺序一致的日期文本列表（空值为 None）}。"""
+    epochs = {field: [to_epoch(v) for v in columns.get(field, [None] * count)] for field in EVENT_FIELDS}
+
+    events = {}
+    for field in EVENT_FIELDS:
+        pairs = sorted((t, rid) for rid, t in enumerate(epochs[field]) if t is not None)
+        events[field] = {"t": [t for t, _ in pairs], "ids": [rid for _, rid in pairs]}
+
+    windows, invalid = {}, {}
+    for name, (start_field, end_field) in WINDOW_FIELDS.items():
+        rows, bad = [], []
+        for rid, (s, e) in enumerate(zip(epochs[start_field], epochs[end_field])):
+            if s is None or e is None:
+                continue
+            if s > e:
+                bad.append(rid)
+            else:
+                rows.append((s, e, rid))
+        rows.sort()
+        ends = [e for _, e, _ in rows]
+        windows[name] = {
+            "start": start_field,
+            "end": end_field,
+            "starts": [s for s, _, _ in rows],
+            "ends": ends,
+            "ids": [rid for _, _, rid in rows],
+            "maxEnd": _max_end_tree(ends),
+        }
+        invalid[name] = bad
+    return {"format": FORMAT, "count": count, "events": events, "windows": windows, "invalid": invalid}
+
+
+def write(columns, count, path=OUTPUT_DATES):
+    payload = build_index(columns, count)
+    text = json.dumps(payload, separators=(",", ":"))
+    path.write_text(text, encoding="utf-8")
+    return sum(len(e["t"]) for e in payload["events"].values()), len(text.encode("utf-8"))
+
+
+# ---------- 查询 ----------
+
+class DateIndex:
+    """查询已导出的日期索引。start / end 可为 "YYYY-MM-DD"、"YYYY-MM-DD HH:MM:SS"、date 或 datetime。"""
+
+    def __init__(self, payload):
+        if payload.get("format") != FORMAT:
+            raise ValueError(f"不支持的日期索引格式: {payload.get('format')}")
+        self.count = payload["count"]
+        self._events = payload["events"]
+        self._windows = payload["windows"]
+        self.invalid = payload["invalid"]
+
+    @classmethod
+    def load(cls, path=OUTPUT_DATES):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def events(self, field, start, end=None):
+        """field 日期落在 [start, end] 内的记录 id；不给 end 时为 start 当天。"""
+        lo, hi = parse_bounds(start, end)
+        column = self._events[field]
+        i = bisect.bisect_left(column["t"], lo)
+        j = bisect.bisect_right(column["t"], hi)
+        return sorted(column["ids"][i:j])
+
+    def windows(self, name, start, end=None):
+        """窗口 name 与 [start, end] 有交集（开始 ≤ end 且 截止 ≥ start）的记录 id；不给 end 时为 start 当天。"""
+        lo, hi = parse_bounds(start, end)
+        window = self._windows[name]
+        starts, ends, max_end = window["starts"], window["ends"], window["maxEnd"]
+        found = []
+        stack = [(0, len(starts))]
+        while stack:
+            a, b = stack.pop()
+            if a >= b:
+                continue
+            mid = (a + b) // 2
+            if max_end[mid] < lo:
+                continue  # 整棵子树都在查询区间开始之前截止
+            stack.append((a, mid))
+            if starts[mid] > hi:
+                continue  # 按开始时间排序，右子树同样晚于查询区间结束
+            if ends[mid] >= lo:
+                found.append(window["ids"][mid])
+            stack.append((mid + 1, b))
+        return sorted(found)
+
+
+def record_epochs(records):
+    """逐行扫描用：每条记录各日期字段的时间戳。"""
+    return [{field: to_epoch(r.get(field)) for field in EVENT_FIELDS} for r in records]
+
+
+def brute_force_events(rows, field, start, end=None):
+    """逐行扫描（对照用），语义同 DateIndex.events。rows 为 record_epochs 的结果。"""
+    lo, hi = parse_bounds(start, end)
+    return [rid for rid, row in enumerate(rows) if row[field] is not None and lo <= row[field] <= hi]
+
+
+def brute_force_windows(rows, name, start, end=None):
+    """逐行扫描（对照用），语义同 DateIndex.windows。rows 为 record_epochs 的结果。"""
+    lo, hi = parse_bounds(start, end)
+    start_field, end_field = WINDOW_FIELDS[name]
+    out = []
+    for rid, row in enumerate(rows):
+        s, e = row[start_field], row[end_field]
+        if s is not None and e is not None and s <= e and s <= hi and e >= lo:
+            out.append(rid)
+    return out
+
+
+def check_parity(index, records, rounds=500, seed=0):
+    """随机生成单日与多日区间，比对索引与逐行扫描；返回第一个不一致的查询，全部一致时返回 None。"""
+    rng = random.Random(seed)
+    rows = record_epochs(records)
+    times = [t for row in rows for t in row.values() if t is not None]
+    first = datetime.fromtimestamp(min(times), tz=timezone.utc).date() - timedelta(days=7)
+    last = datetime.fromtimestamp(max(times), tz=timezone.utc).date() + timedelta(days=7)
+    span = (last - first).days
+    for _ in range(rounds):
+        day = first + timedelta(days=rng.randint(0, span))
+        end = None if rng.random() < 0.5 else day + timedelta(days=rng.randint(0, 30))
+        for field in EVENT_FIELDS:
+            if index.events(field, day, end) != brute_force_events(rows, field, day, end):
+                return ("event", field, day, end)
+        for name in WINDOW_FIELDS:
+            if index.windows(name, day, end) != brute_force_windows(rows, name, day, end):
+                return ("window", name, day, end)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用日期索引按时间段查询学校总览")
+    parser.add_argument("kind", nargs="?", choices=["event", "window"], help="event：单点日期；window：出愿窗口")
+    parser.add_argument("field", nargs="?", help=f"event 取 {'/'.join(EVENT_FIELDS)}；window 取 {'/'.join(WINDOW_FIELDS)}")
+    parser.add_argument("start", nargs="?", help="开始日期 YYYY-MM-DD")
+    parser.add_argument("end", nargs="?", help="结束日期（含当天），省略时只查开始日期当天")
+    parser.add_argument("--check", action="store_true", help="随机区间与逐行扫描比对")
+    parser.add_argument("--dates", type=Path, default=OUTPUT_DATES)
+    parser.add_argument("--source", type=Path, default=SOURCE_JSON)
+    args = parser.parse_args()
+
+    index = DateIndex.load(args.dates)
+    with open(args.source, "r", encoding="utf-8") as f:
+        records = json.load(f)["data"]
+
+    if args.check:
+        mismatch = check_parity(index, records)
+        if mismatch:
+            print(f"❌ 与逐行扫描结果不一致: {mismatch}")
+            sys.exit(1)
+        print("✅ 随机 500 组日期区间下索引查询与逐行扫描结果一致")
+        for name, ids in index.invalid.items():
+            if ids:
+                print(f"⚠️  {name} 窗口有 {len(ids)} 条开始晚于截止，未计入: {ids[:10]}{' ...' if len(ids) > 10 else ''}")
+        return
+
+    if not (args.kind and args.field and args.start):
+        parser.print_help()
+        return
+    if args.kind == "event":
+        ids = index.events(args.field, args.start, args.end)
+    else:
+        ids = index.windows(args.field, args.start, args.end)
+    for i in ids:
+        r = records[i]
+        fields = [args.field] if args.kind == "event" else list(WINDOW_FIELDS[args.field])
+        when = " ~ ".join(r.get(f, "")[:10] for f in fields)
+        print(f"{i:5d}  {r.get('name', '')}  {r.get('department', '')}  {r.get('major', '')}  {when}")
+    print(f"共 {len(ids)} 条", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学校总览增量导出：记录每条记录的内容哈希，生成增量补丁（delta）
+
+- 记录键：(大学, 学部, 学科, 第几期)，即 JSON 中的 name / department / major / period；
+  同一键出现多次时按出现顺序追加序号（第二条起为 [..., 1]、[..., 2]）
+- 清单 manifest.json：当前版本号、全量哈希、每条记录的内容哈希
+- 索引 index.json：当前版本号与可用的增量补丁列表（供 /api/school-master/delta 使用）
+- 补丁 delta-<from>-<to>.json：added / modified（整条记录）与 removed（记录键）
+
+由 export_school_data.py --incremental 调用：先 prepare() 判断是否变化，全部导出写完后再 commit() 写清单与补丁；
+内容未变化时不写任何文件。
+客户端按顺序应用补丁：删除 removed、替换 modified、追加 added（新增记录排在末尾，顺序以全量文件为准）。
+"""
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+DELTA_DIR = Path(__file__).parent.parent / "school-master-deltas"
+KEY_FIELDS = ["name", "department", "major", "period"]
+MAX_DELTAS = 20  # 只保留最近的补丁，更旧的客户端回退到全量下载
+
+
+def content_hash(text):
+    """内容哈希（sha256 前 16 位），用于单条记录和全量文件。"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def record_keys(frame):
+    """按列生成每条记录的键（JSON 数组文本），与前端 JSON.stringify([...]) 结果一致。"""
+    columns = [
+        frame[f].fillna("").tolist() if f in frame.columns else [""] * len(frame)
+        for f in KEY_FIELDS
+    ]
+    seen = {}
+    keys = []
+    for parts in zip(*columns):
+        n = seen.get(parts, 0)
+        seen[parts] = n + 1
+        keys.append(json.dumps(list(parts) + [n] if n else list(parts), ensure_ascii=False, separators=(",", ":")))
+    return keys
+
+
+def load_json(path):
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def diff_records(old_hashes, keys, hashes):
+    """比较新旧记录哈希，返回 (新增下标, 修改下标, 删除的键)。"""
+    added, modified = [], []
+    for i, (key, h) in enumerate(zip(keys, hashes)):
+        old = old_hashes.get(key)
+        if old is None:
+            added.append(i)
+        elif old != h:
+            modified.append(i)
+    current = set(keys)
+    removed = [key for key in old_hashes if key not in current]
+    return added, modified, removed
+
+
+def prepare(objects, keys, dataset_hash, delta_dir=DELTA_DIR):
+    """
+    比较本次导出的记录与清单，算出新版本与补丁，但不写任何文件。
+
+    清单要等全部导出文件写完后再由 commit() 写入：中途写入失败时清单仍是旧哈希，
+    下次 --incremental 会重新导出，而不会把没写完的产物当作「数据未变化」留下。
+
+    Args:
+        objects: 每条记录的 JSON 文本（export_school_data.render_objects 的结果）
+        keys: 每条记录的键（record_keys 的结果）
+        dataset_hash: 全量 JSON 的内容哈希
+
+    Returns:
+        dict：version / changed / added / modified / removed / delta（补丁文件名或 None），
+        changed 为 True 时另有 pending（commit 要写入的内容）
+    """
+    manifest = load_json(delta_dir / "manifest.json") or {}
+    index = load_json(delta_dir / "index.json") or {"deltas": []}
+
+    if manifest.get("hash") == dataset_hash:
+        return {"version": manifest["version"], "changed": False, "added": 0, "modified": 0, "removed": 0, "delta": None}
+
+    hashes = [content_hash(o) for o in objects]
+    old_version = manifest.get("version")
+    version = (old_version or 0) + 1
+    now = datetime.now().isoformat(timespec="seconds")
+
+    delta_file, delta = None, None
+    added, modified, removed = [], [], []
+    if old_version is not None:
+        added, modified, removed = diff_records(manifest.get("records", {}), keys, hashes)
+        delta_file = f"delta-{old_version}-{version}.json"
+        delta = {
+            "fromVersion": old_version,
+            "toVersion": version,
+            "fromHash": manifest.get("hash"),
+            "toHash": dataset_hash,
+            "generatedAt": now,
+            "added": [{"key": keys[i], "record": json.loads(objects[i])} for i in added],
+            "modified": [{"key": keys[i], "record": json.loads(objects[i])} for i in modified],
+            "removed": removed,
+        }
+        index["deltas"].append({
+            "from": old_version,
+            "to": version,
+            "file": delta_file,
+            "added": len(added),
+            "modified": len(modified),
+            "removed": len(removed),
+        })
+    index.update({"version": version, "hash": dataset_hash, "count": len(objects), "generatedAt": now})
+
+    return {
+        "version": version,
+        "changed": True,
+        "added": len(added),
+        "modified": len(modified),
+        "removed": len(removed),
+        "delta": delta_file,
+        "pending": {
+            "delta": delta,
+            "index": index,
+            "manifest": {
+                "version": version,
+                "hash": dataset_hash,
+                "count": len(objects),
+                "generatedAt": now,
+                "keyFields": KEY_FIELDS,
+                "records": dict(zip(keys, hashes)),
+            },
+        },
+    }
+
+
+def commit(result, delta_dir=DELTA_DIR):
+    """全部导出文件写完后调用：写出补丁，清理过旧的补丁，最后写清单与索引。"""
+    pending = result.get("pending")
+    if pending is None:
+        return
+    delta_dir.mkdir(parents=True, exist_ok=True)
+    index = pending["index"]
+    if pending["delta"] is not None:
+        write_json(delta_dir / result["delta"], pending["delta"])
+        # 清理过旧的补丁
+        for stale in index["deltas"][:-MAX_DELTAS]:
+            (delta_dir / stale["file"]).unlink(missing_ok=True)
+        index["deltas"] = index["deltas"][-MAX_DELTAS:]
+    write_json(delta_dir / "manifest.json", pending["manifest"])
+    write_json(delta_dir / "index.json", index)
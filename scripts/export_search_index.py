@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学校总览 n-gram 倒排索引（school-master.search-index.json），供 compass_search 按关键字检索
+
+- 对每条记录的 大学 / 学部 / 学科 / 位置（name / department / major / region）取字符 2-gram 与 3-gram
+- 建索引与查询都按 normalize_text 规范化：NFKC、简体 / 繁体逐字换成日本新字体（name_normalizer 的字符表）、
+  转小写，所以「广岛」「廣島」都能查到 広島；字符表随索引导出（variants），浏览器端按同一张表规范化查询词
+- 大学名额外收录 entity_registry 中登记的规范名及其所有已知写法（如 东京大学 ↔ 東京大学），
+  用繁简任一写法都能检索到
+- 记录 id 为 school-master.json 中 data 的下标；每个 gram 的倒排表按 id 升序并做差分编码
+- 查询时只取查询词的若干个 gram 的倒排表求交集，不再扫描全部记录；
+  结果是候选集（可能多于精确匹配），如需精确结果可再用 matches() 校验候选记录
+
+格式（format = "ngram-v2"）：
+    {"format": "ngram-v2", "gramSizes": [2, 3], "count": 3028,
+     "fields": ["name", "department", "major", "region"],
+     "variants": {"东": "東", "國": "国", ...},       # 规范化用的逐字替换表
+     "postings": {"東京": [0, 1, 1, 1, ...], ...}}     # 差分编码：第一个为 id，之后为与前一个 id 的差
+
+用法：
+    python3 export_school_data.py --search-index
+    python3 scripts/export_search_index.py 東京大学 法学部      # 用已导出的索引查询
+"""
+import argparse
+import json
+import sys
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+
+from entity_registry import load_registry
+from name_normalizer import TRANSLATION
+
+FORMAT = "ngram-v2"
+GRAM_SIZES = (2, 3)
+INDEX_FIELDS = ["name", "department", "major", "region"]
+OUTPUT_INDEX = Path(__file__).parent.parent / "school-master.search-index.json"
+SOURCE_JSON = Path(__file__).parent.parent / "school-master.json"
+
+
+def normalize_text(text):
+    """全角/半角统一、简繁统一为日本新字体并转小写，建索引与查询使用同一规则（逐字替换，长度不变）。"""
+    return unicodedata.normalize("NFKC", text).translate(TRANSLATION).lower()
+
+
+def university_variants(name):
+    return load_registry().university_variants(name)
+
+
+def searchable_texts(record):
+    """一条记录参与检索的所有文本（已规范化）。"""
+    texts = set()
+    for field in INDEX_FIELDS:
+        value = record.get(field)
+        if not value:
+            continue
+        if field == "name":
+            texts.update(normalize_text(v) for v in university_variants(value))
+        else:
+            texts.add(normalize_text(value))
+    return texts
+
+
+def grams(text, sizes=GRAM_SIZES):
+    out = set()
+    for n in sizes:
+        for i in range(len(text) - n + 1):
+            out.add(text[i:i + n])
+    return out
+
+
+def delta_encode(ids):
+    out, prev = [], 0
+    for i, rid in enumerate(ids):
+        out.append(rid if i == 0 else rid - prev)
+        prev = rid
+    return out
+
+
+def delta_decode(deltas):
+    out, total = [], 0
+    for i, d in enumerate(deltas):
+        total = d if i == 0 else total + d
+        out.append(total)
+    return out
+
+
+def build_index(records):
+    """records：与 school-master.json 的 data 顺序一致的记录列表。"""
+    postings = defaultdict(list)
+    for rid, record in enumerate(records):
+        record_grams = set()
+        for text in searchable_texts(record):
+            record_grams |= grams(text)
+        for g in record_grams:
+            postings[g].append(rid)  # rid 递增，列表天然有序
+    return {
+        "format": FORMAT,
+        "gramSizes": list(GRAM_SIZES),
+        "count": len(records),
+        "fields": INDEX_FIELDS,
+        "variants": {chr(code): target for code, target in sorted(TRANSLATION.items())},
+        "postings": {g: delta_encode(ids) for g, ids in sorted(postings.items())},
+    }
+
+
+def write(records, path=OUTPUT_INDEX):
+    index = build_index(records)
+    text = json.dumps(index, ensure_ascii=False, separators=(",", ":"))
+    path.write_text(text, encoding="utf-8")
+    return len(index["postings"]), len(text.encode("utf-8"))
+
+
+class SearchIndex:
+    """查询已导出的倒排索引。"""
+
+    def __init__(self, index):
+        if index.get("format") != FORMAT:
+            raise ValueError(f"不支持的索引格式: {index.get('format')}")
+        self.count = index["count"]
+        self.max_gram = max(index["gramSizes"])
+        self.min_gram = min(index["gramSizes"])
+        self._postings = index["postings"]
+
+    @classmethod
+    def load(cls, path=OUTPUT_INDEX):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def postings(self, gram):
+        return delta_decode(self._postings.get(gram, []))
+
+    def candidates(self, query):
+        """返回包含查询词所有 gram 的记录 id（升序）；查询词短于最小 gram 时返回 None，由调用方退回全表扫描。"""
+        q = normalize_text(query.strip())
+        if len(q) < self.min_gram:
+            return None
+        size = min(len(q), self.max_gram)
+        query_grams = {q[i:i + size] for i in range(len(q) - size + 1)}
+        # 从最短的倒排表开始求交集
+        lists = sorted((self._postings.get(g, []) for g in query_grams), key=len)
+        if not lists or not lists[0]:
+            return []
+        result = set(delta_decode(lists[0]))
+        for deltas in lists[1:]:
+            result.intersection_update(delta_decode(deltas))
+            if not result:
+                break
+        return sorted(result)
+
+
+def matches(record, query):
+    """精确校验：查询词是否为记录某个检索文本的子串。"""
+    q = normalize_text(query.strip())
+    return any(q in text for text in searchable_texts(record))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用已导出的 n-gram 索引检索学校总览")
+    parser.add_argument("queries", nargs="+", help="查询词（多个词取交集）")
+    parser.add_argument("--index", type=Path, default=OUTPUT_INDEX)
+    parser.add_argument("--source", type=Path, default=SOURCE_JSON)
+    args = parser.parse_args()
+
+    index = SearchIndex.load(args.index)
+    with open(args.source, "r", encoding="utf-8") as f:
+        records = json.load(f)["data"]
+    ids = None
+    for q in args.queries:
+        found = index.candidates(q)
+        if found is None:
+            found = range(len(records))
+        found = {i for i in found if matches(records[i], q)}
+        ids = found if ids is None else ids & found
+    for i in sorted(ids):
+        r = records[i]
+        print(f"{i:5d}  {r.get('name', '')}  {r.get('department', '')}  {r.get('major', '')}  {r.get('region', '')}")
+    print(f"共 {len(ids)} 条", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学校总览分片导出：每所大学一个分片，外加地区索引与总目录，供前端按需加载
+
+输出目录 school-master-shards/：
+- catalog.json：大学 → 分片文件、记录数、内容哈希、所在地区
+- regions.json：地区（位置）→ 该地区有记录的大学及记录数
+- u-<哈希>.json：单所大学的记录，格式 {"university": ..., "data": [...]}，记录与 school-master.json 中一致
+
+分片文件名由大学名哈希决定，与记录顺序、其他大学的增删无关，因此分片边界在多次导出间保持稳定；
+内容未变化的分片不会重写（文件与 mtime 不变），浏览器和 CDN 的缓存继续有效。
+
+由 export_school_data.py --shards 调用。
+"""
+import hashlib
+import json
+from collections import defaultdict
+from datetime import datetime
+from json.encoder import encode_basestring
+from pathlib import Path
+
+SHARD_DIR = Path(__file__).parent.parent / "school-master-shards"
+UNKNOWN_REGION = "未填写"
+
+
+def shard_file_name(university):
+    """分片文件名只取决于大学名，保证多次导出间稳定。"""
+    return "u-" + hashlib.sha1(university.encode("utf-8")).hexdigest()[:12] + ".json"
+
+
+def render_shard(university, objects):
+    return '{"university": ' + encode_basestring(university) + ', "data": [\n' + ",\n".join(objects) + "\n]}"
+
+
+def load_catalog(shard_dir):
+    path = shard_dir / "catalog.json"
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("universities", {})
+
+
+def write_shards(frame, objects, shard_dir=SHARD_DIR):
+    """
+    Args:
+        frame: export_school_data.normalize_frame 的结果
+        objects: export_school_data.render_objects 的结果（与 frame 行一一对应）
+
+    Returns:
+        dict：universities / written / unchanged / removed
+    """
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    names = frame["name"].tolist()
+    regions = frame["region"].tolist() if "region" in frame.columns else [None] * len(frame)
+
+    by_university = defaultdict(list)
+    university_regions = defaultdict(lambda: defaultdict(int))
+    for name, region, obj in zip(names, regions, objects):
+        by_university[name].append(obj)
+        university_regions[name][region if isinstance(region, str) else UNKNOWN_REGION] += 1
+
+    files = {shard_file_name(u): u for u in by_university}
+    if len(files) != len(by_university):
+        raise ValueError("分片文件名冲突，请调整 shard_file_name 的哈希长度")
+
+    previous = load_catalog(shard_dir)
+    catalog = {}
+    written = unchanged = 0
+    for university, shard_objects in by_university.items():
+        text = render_shard(university, shard_objects)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        file_name = shard_file_name(university)
+        path = shard_dir / file_name
+        old = previous.get(university)
+        if old and old.get("hash") == digest and path.exists():
+            unchanged += 1
+        else:
+            path.write_text(text, encoding="utf-8")
+            written += 1
+        catalog[university] = {
+            "file": file_name,
+            "records": len(shard_objects),
+            "hash": digest,
+            "regions": sorted(university_regions[university]),
+        }
+
+    # 清理已不存在的大学的分片
+    removed = 0
+    for university, entry in previous.items():
+        if university not in catalog:
+            (shard_dir / entry["file"]).unlink(missing_ok=True)
+            removed += 1
+
+    region_index = defaultdict(dict)
+    for university, counts in university_regions.items():
+        for region, n in counts.items():
+            region_index[region][university] = n
+    regions = {
+        region: {"records": sum(unis.values()), "universities": dict(sorted(unis.items()))}
+        for region, unis in sorted(region_index.items())
+    }
+
+    now = datetime.now().isoformat(timespec="seconds")
+    with open(shard_dir / "catalog.json", "w", encoding="utf-8") as f:
+        json.dump({"generatedAt": now, "count": len(objects), "universities": catalog}, f, ensure_ascii=False, indent=0)
+    with open(shard_dir / "regions.json", "w", encoding="utf-8") as f:
+        json.dump({"generatedAt": now, "regions": regions}, f, ensure_ascii=False, indent=0)
+
+    return {"universities": len(catalog), "written": written, "unchanged": unchanged, "removed": removed}
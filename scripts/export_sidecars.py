@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+为导出文件生成预压缩副本（.gz / .br）与 ETag 清单 school-master.manifest.json
+
+- gzip 使用最高压缩级别 9（mtime 固定为 0，同样内容得到同样字节）
+- brotli 使用最高质量 11（需 pip install brotli；未安装时只生成 .gz）
+- 清单记录每个文件及其各压缩副本的强 ETag（内容 sha256）、字节数和记录数（索引类文件不记），
+  server.js 的 /api/school-master 据此直接返回预压缩字节并支持 If-None-Match（304），
+  请求时不再重新压缩或序列化
+
+由 export_school_data.py --compress 调用；源文件未变化时沿用已有副本，不重复压缩。
+"""
+import gzip
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+# 可选依赖
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+ROOT = Path(__file__).parent.parent
+MANIFEST_PATH = ROOT / "school-master.manifest.json"
+
+CONTENT_TYPES = {
+    ".json": "application/json; charset=utf-8",
+    ".csv": "text/csv; charset=utf-8",
+}
+
+
+def sha256_hex(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def strong_etag(data):
+    """强 ETag：内容哈希，不同压缩编码各自不同。"""
+    return '"' + sha256_hex(data)[:32] + '"'
+
+
+def compress(encoding, data):
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    raise ValueError(f"未知的压缩编码: {encoding}")
+
+
+SIDECAR_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not path.exists():
+        return {"files": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_entry(path, records, previous=None):
+    """为单个文件生成（或沿用）压缩副本，返回清单条目。"""
+    data = path.read_bytes()
+    digest = sha256_hex(data)
+    entry = {
+        "etag": strong_etag(data),
+        "sha256": digest,
+        "bytes": len(data),
+        "contentType": CONTENT_TYPES.get(path.suffix, "application/octet-stream"),
+        "encodings": {},
+    }
+    if records is not None:
+        entry["records"] = records
+    encodings = ["gzip"] + (["br"] if BROTLI_AVAILABLE else [])
+    for encoding in encodings:
+        sidecar = path.with_name(path.name + SIDECAR_SUFFIXES[encoding])
+        cached = (previous or {}).get("encodings", {}).get(encoding)
+        if (previous or {}).get("sha256") == digest and cached and sidecar.exists() \
+                and sidecar.stat().st_size == cached["bytes"]:
+            entry["encodings"][encoding] = cached
+            continue
+        packed = compress(encoding, data)
+        sidecar.write_bytes(packed)
+        entry["encodings"][encoding] = {"file": sidecar.name, "etag": strong_etag(packed), "bytes": len(packed)}
+    return entry
+
+
+def write_sidecars(files, manifest_path=MANIFEST_PATH):
+    """
+    Args:
+        files: {Path: 记录数}，需要生成压缩副本的导出文件（检索 / 分面 / 日期索引等不按记录计的文件为 None）
+
+    Returns:
+        新的清单 dict
+    """
+    previous = load_manifest(manifest_path).get("files", {})
+    manifest = {
+        "generatedAt": datetime.now().isoformat(timespec="seconds"),
+        "files": {path.name: build_entry(path, records, previous.get(path.name)) for path, records in files.items()},
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
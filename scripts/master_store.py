@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学校总览 SQLite 主库（school-master.db）：导入后作为主数据，Excel 只作为老师编辑用的导入/导出视图
+
+表结构：
+    programs      每条记录一行：id（稳定的记录编号，删除后不复用）、position（表内顺序）、
+                  university / department（大学、学部，建有联合索引）、data（全部列的 JSON）、updated_at
+    program_dates 日期列的值（program_id, field, value），按 (field, value) 建索引，供按日期/时间段查询
+    columns       列顺序与 pandas 类型，读出的 DataFrame 与直接解析 xlsx 完全一致（值与 dtype 都相同）
+    change_log    逐格变更日志：program_id、action（insert/update/delete）、column、old、new、changed_at、source；
+                  delete 在 old 中保留整行，可据此找回
+    meta          excel_revision：Excel 视图最后一次与主库同步时的 change_log 位置
+
+写入（save_frame）在一个事务内逐行 upsert：按 大学+学部（同键多行按出现顺序）对应到已有记录，
+只改有变化的行并写变更日志；新行插入并分配新编号，表中已不存在的记录删除。
+
+主库存在时，合并脚本、create_review_table.py、export_school_data.py、analyze_period_data.py、
+analyze_selection_method_data.py 都直接读写主库（load_master / save_master）；不存在时仍读写 学部学校一览表.xlsx，
+合并只把变化的行追加到编辑日志（scripts/edit_log.py），由 edit_log.py compact 一次写回。
+合并只写主库，之后 Excel 视图会落后：运行 export-excel 更新；主库有 Excel 视图之外的变更时，
+import 拒绝用旧的 Excel 覆盖（--force 强制）。
+
+用法：
+    python3 scripts/master_store.py import                 # 首次：从 学部学校一览表.xlsx 建库；之后：导入老师在 Excel 中的修改
+    python3 scripts/master_store.py export-excel           # 用主库重写 学部学校一览表.xlsx
+    python3 scripts/master_store.py check                  # 校验主库读出的表与 Excel 解析结果完全一致
+    python3 scripts/master_store.py log -n 20              # 最近的变更
+    python3 scripts/master_store.py dates 校内考时间1 2026-02-01 2026-02-28
+"""
+import argparse
+import json
+import sqlite3
+import sys
+from collections import defaultdict
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from entity_registry import REGISTRY_PATH, register_master
+from merge_engine import write_workbook
+from workbook_cache import read_sheet
+
+ROOT = Path(__file__).resolve().parent.parent
+MASTER_DB = ROOT / "school-master.db"
+MAIN_EXCEL = ROOT / "学部学校一览表.xlsx"
+SHEET_NAME = "学校总览"
+KEY_COLUMNS = ("大学", "学部")
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS programs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    position INTEGER NOT NULL,
+    university TEXT,
+    department TEXT,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS programs_university_department ON programs (university, department);
+CREATE INDEX IF NOT EXISTS programs_position ON programs (position);
+CREATE TABLE IF NOT EXISTS program_dates (
+    program_id INTEGER NOT NULL REFERENCES programs (id) ON DELETE CASCADE,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS program_dates_field_value ON program_dates (field, value);
+CREATE INDEX IF NOT EXISTS program_dates_program ON program_dates (program_id);
+CREATE TABLE IF NOT EXISTS columns (
+    position INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    dtype TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS change_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    program_id INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    "column" TEXT,
+    old TEXT,
+    new TEXT,
+    changed_at TEXT NOT NULL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS change_log_program ON change_log (program_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class StaleWorkbookError(Exception):
+    """主库有 Excel 视图之外的变更，拒绝用旧的 Excel 覆盖。"""
+
+
+# ---------- 单元格编码 ----------
+
+def encode_value(value):
+    """单元格 → JSON 值：空值为 None，日期时间带标记以便原样还原。"""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, (float, np.floating)) and np.isnan(value):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return {"$datetime": pd.Timestamp(value).isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def decode_value(value):
+    if isinstance(value, dict):
+        if "$datetime" in value:
+            return pd.Timestamp(value["$datetime"])
+        if "$date" in value:
+            return date.fromisoformat(value["$date"])
+    return value
+
+
+def encode_row(columns, values):
+    """一行 → {列名: JSON 值}，空值不存（读出时缺的列即为空）。"""
+    record = {}
+    for col, value in zip(columns, values):
+        value = encode_value(value)
+        if value is not None:
+            record[col] = value
+    return record
+
+
+def _key_text(value):
+    value = encode_value(value)
+    return None if value is None else str(value)
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _match_rows(existing, rows):
+    """同一 大学+学部 下新旧行的对应：先配内容完全相同的行（老师调整行序不算修改），
+    其余按出现顺序一一对应，多出的新行为插入。返回 [(position, record, (id, old) 或 None)]。"""
+    def canonical(record):
+        return json.dumps(record, ensure_ascii=False, sort_keys=True)
+
+    unused = defaultdict(list)
+    for item in existing:
+        unused[canonical(item[1])].append(item)
+    matched, pending = [], []
+    for position, record in rows:
+        same = unused.get(canonical(record))
+        if same:
+            matched.append((position, record, same.pop(0)))
+        else:
+            pending.append((position, record))
+    taken = {id(m[2]) for m in matched}
+    remaining = [item for item in existing if id(item) not in taken]
+    for (position, record), match in zip(pending, remaining + [None] * len(pending)):
+        matched.append((position, record, match))
+    return matched
+
+
+class MasterStore:
+    """主库连接；save_frame / read_frame 与 DataFrame 互转。"""
+
+    def __init__(self, path=MASTER_DB):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 读 ----------
+
+    def columns(self):
+        return self.conn.execute("SELECT name, dtype FROM columns ORDER BY position").fetchall()
+
+    def read_frame(self):
+        """按 position 顺序读出整张表，列顺序与类型同导入时的 DataFrame。"""
+        columns = self.columns()
+        rows = self.conn.execute("SELECT data FROM programs ORDER BY position").fetchall()
+        records = [json.loads(data) for data, in rows]
+        frame = {}
+        for name, dtype in columns:
+            if dtype.startswith("datetime64"):
+                # 整列一次解析，比逐格 pd.Timestamp 快得多
+                stamps = [record[name]["$datetime"] if name in record else None for record in records]
+                frame[name] = pd.Series(pd.to_datetime(stamps, format="ISO8601"), dtype=dtype)
+                continue
+            values = [decode_value(record.get(name)) for record in records]
+            frame[name] = pd.Series(values, dtype=object if dtype == "object" else dtype)
+        return pd.DataFrame(frame, index=pd.RangeIndex(len(records)))
+
+    def ids(self):
+        """按表内顺序的记录编号列表（与 read_frame 的行一一对应）。"""
+        return [rid for rid, in self.conn.execute("SELECT id FROM programs ORDER BY position")]
+
+    def revision(self):
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM change_log").fetchone()[0]
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def excel_is_stale(self):
+        """合并等写入后 Excel 视图尚未重新导出。"""
+        return self.revision() > int(self.get_meta("excel_revision", 0))
+
+    def changes(self, limit=20):
+        return self.conn.execute(
+            'SELECT c.id, c.changed_at, c.source, c.action, c.program_id, p.university, p.department, c."column", c.old, c.new '
+            "FROM change_log c LEFT JOIN programs p ON p.id = c.program_id ORDER BY c.id DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    def programs_between(self, field, start, end):
+        """日期列 field 落在 [start, end] 内的记录编号（用 program_dates 索引）。"""
+        rows = self.conn.execute(
+            "SELECT program_id FROM program_dates WHERE field = ? AND value BETWEEN ? AND ? ORDER BY program_id",
+            (field, pd.Timestamp(start).isoformat(), pd.Timestamp(end).isoformat()),
+        )
+        return [rid for rid, in rows]
+
+    # ---------- 写 ----------
+
+    def save_frame(self, df, source):
+        """在一个事务内把 df 逐行 upsert 进主库，返回统计 {inserted, updated, deleted, unchanged, changedCells}。"""
+        columns = [str(c) for c in df.columns]
+        date_columns = [c for c, dtype in zip(columns, df.dtypes) if str(dtype).startswith("datetime64")]
+        now = datetime.now().isoformat(timespec="seconds")
+
+        existing = defaultdict(list)  # (大学, 学部) → [(id, data)]，按表内顺序
+        for rid, uni, dept, data in self.conn.execute(
+                "SELECT id, university, department, data FROM programs ORDER BY position"):
+            existing[(uni, dept)].append((rid, json.loads(data)))
+
+        key_idx = [columns.index(k) if k in columns else None for k in KEY_COLUMNS]
+        incoming = defaultdict(list)  # (大学, 学部) → [(position, record)]
+        for position, values in enumerate(df.itertuples(index=False, name=None)):
+            key = tuple(None if i is None else _key_text(values[i]) for i in key_idx)
+            incoming[key].append((position, encode_row(columns, values)))
+
+        inserts, updates, moves, logs, kept = [], [], [], [], set()
+        stats = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0, "changedCells": 0}
+        for key, rows in incoming.items():
+            for position, record, match in _match_rows(existing[key], rows):
+                if match is None:
+                    inserts.append((position, key, record))
+                    continue
+                rid, old = match
+                kept.add(rid)
+                changed = [c for c in dict.fromkeys([*old, *record]) if old.get(c) != record.get(c)]
+                if changed:
+                    updates.append((position, _dumps(record), now, rid, record))
+                    logs.extend((rid, "update", c, _dumps(old.get(c)), _dumps(record.get(c)), now, source)
+                                for c in changed)
+                    stats["updated"] += 1
+                    stats["changedCells"] += len(changed)
+                else:
+                    moves.append((position, rid))
+                    stats["unchanged"] += 1
+        inserts.sort(key=lambda item: item[0])  # 新编号按表内顺序分配
+        removed = [(rid, old) for rows in existing.values() for rid, old in rows if rid not in kept]
+
+        with self.conn:
+            self.conn.execute("DELETE FROM columns")
+            self.conn.executemany("INSERT INTO columns (position, name, dtype) VALUES (?, ?, ?)",
+                                  [(i, c, str(dtype)) for i, (c, dtype) in enumerate(zip(columns, df.dtypes))])
+            self.conn.executemany("UPDATE programs SET position = ? WHERE id = ?", moves)
+            for rid, old in removed:
+                self.conn.execute("DELETE FROM programs WHERE id = ?", (rid,))
+                logs.append((rid, "delete", None, _dumps(old), None, now, source))
+                stats["deleted"] += 1
+            for position, data, updated_at, rid, record in updates:
+                self.conn.execute("UPDATE programs SET position = ?, data = ?, updated_at = ? WHERE id = ?",
+                                  (position, data, updated_at, rid))
+                self._write_dates(rid, record, date_columns)
+            for position, key, record in inserts:
+                cur = self.conn.execute(
+                    "INSERT INTO programs (position, university, department, data, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (position, key[0], key[1], _dumps(record), now))
+                self._write_dates(cur.lastrowid, record, date_columns)
+                logs.append((cur.lastrowid, "insert", None, None, None, now, source))
+                stats["inserted"] += 1
+            self.conn.executemany(
+                'INSERT INTO change_log (program_id, action, "column", old, new, changed_at, source) '
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", logs)
+        return stats
+
+    def _write_dates(self, rid, record, date_columns):
+        self.conn.execute("DELETE FROM program_dates WHERE program_id = ?", (rid,))
+        self.conn.executemany(
+            "INSERT INTO program_dates (program_id, field, value) VALUES (?, ?, ?)",
+            [(rid, c, record[c]["$datetime"]) for c in date_columns if isinstance(record.get(c), dict)])
+
+    def import_excel(self, path, source="import", force=False):
+        """导入 Excel 视图；主库有视图之外的变更时抛 StaleWorkbookError（force 时照常导入）。"""
+        if self.excel_is_stale() and not force:
+            raise StaleWorkbookError(
+                f"主库有 {path.name} 之外的新变更（如合并脚本写入），直接导入会覆盖它们；"
+                "请先运行 master_store.py export-excel 更新 Excel 视图，或用 --force 强制导入")
+        stats = self.save_frame(read_sheet(path, SHEET_NAME), source)
+        with self.conn:
+            self._set_meta("excel_revision", self.revision())
+        return stats
+
+    def export_excel(self, path):
+        """用主库重写 Excel 视图（先写临时文件再替换）。"""
+        write_workbook(self.read_frame(), path, SHEET_NAME)
+        with self.conn:
+            self._set_meta("excel_revision", self.revision())
+
+
+# ---------- 供各脚本使用 ----------
+
+def master_path(excel_path=MAIN_EXCEL):
+    """主数据所在的文件：已建主库时为 school-master.db，否则为 Excel。"""
+    return MASTER_DB if MASTER_DB.exists() else Path(excel_path)
+
+
+def load_master(excel_path=MAIN_EXCEL, sheet_name=SHEET_NAME):
+    """读主数据：已建主库时直接读库（不解析 xlsx），否则读 Excel（经 workbook_cache 缓存）并重放尚未写回的编辑日志。"""
+    if MASTER_DB.exists():
+        with MasterStore(MASTER_DB) as store:
+            return store.read_frame()
+    from edit_log import EditLog
+    return EditLog(excel_path, sheet_name).read()
+
+
+def exported_rows(df):
+    """只保留会导出到 学校总览.json / .csv 的行：大学 非空且不是纯空白（与 export_school_data.normalize_frame 一致）。"""
+    if "大学" not in df.columns:
+        return df
+    names = df["大学"]
+    keep = names.notna() & (names.astype(str).str.strip() != "")
+    return df[keep].reset_index(drop=True)
+
+
+def save_master(df, excel_path=MAIN_EXCEL, source=None, base=None):
+    """写主数据：已建主库时逐行 upsert 进库并返回统计。
+
+    未建主库时：给出 base（load_master 读入、df 由它合并而来）则只把变化的行追加到编辑日志（scripts/edit_log.py），
+    返回含 batch 的统计；否则原子重写 Excel 并返回 None。写入后在 entity_registry 中登记新出现的大学、学部。"""
+    source = source or Path(sys.argv[0]).name
+    if MASTER_DB.exists():
+        with MasterStore(MASTER_DB) as store:
+            stats = store.save_frame(df, source)
+    else:
+        from edit_log import EditLog, diff_rows
+        log = EditLog(excel_path)
+        rows = None if base is None else diff_rows(base, df)
+        if rows is None:
+            log.rewrite(df)
+            stats = None
+        else:
+            inserted = len(df) - len(base)
+            updated = rows[:len(rows) - inserted]
+            stats = {**log.append(rows, source), "updated": len(updated), "inserted": inserted,
+                     "changedCells": sum(len(r["values"]) for r in updated)}
+    describe_registered(register_master(df))
+    return stats
+
+
+def describe_registered(added):
+    if any(added):
+        print(f"🆔 登记表新增大学 {added[0]} 所、学部 {added[1]} 个（{REGISTRY_PATH.relative_to(ROOT)}）")
+
+
+def describe_save(stats):
+    if stats is None:
+        return "✅ 已写入主Excel"
+    if "batch" in stats:
+        if stats["batch"] is None:
+            return "✅ 主表没有变化，未写入"
+        return (f"✅ 已追加到编辑日志（第 {stats['batch']} 批）：更新 {stats['updated']} 行（{stats['changedCells']} 格），"
+                f"新增 {stats['inserted']} 行\n"
+                f"   共 {stats['pending']} 批尚未写回 Excel，需要时运行: python3 scripts/edit_log.py compact")
+    return (f"✅ 已写入主库 {MASTER_DB.name}：更新 {stats['updated']} 行（{stats['changedCells']} 格），"
+            f"新增 {stats['inserted']} 行，删除 {stats['deleted']} 行\n"
+            f"   Excel 视图尚未更新，需要时运行: python3 scripts/master_store.py export-excel")
+
+
+def check(store, excel_path):
+    """主库读出的表与直接解析 Excel 的结果逐格、逐类型比较，返回差异说明列表。"""
+    expected = read_sheet(excel_path, SHEET_NAME)
+    actual = store.read_frame()
+    problems = []
+    if list(actual.columns) != list(expected.columns):
+        problems.append("列名或列顺序不同")
+    elif list(map(str, actual.dtypes)) != list(map(str, expected.dtypes)):
+        problems.extend(f"列 {c} 类型 {a} ≠ {e}" for c, a, e in zip(actual.columns, actual.dtypes, expected.dtypes)
+                        if str(a) != str(e))
+    elif not actual.equals(expected):
+        problems.append("单元格内容不同")
+    if len(actual) != len(expected):
+        problems.append(f"行数 {len(actual)} ≠ {len(expected)}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="学校总览 SQLite 主库")
+    parser.add_argument("--db", type=Path, default=MASTER_DB, help=f"主库路径（默认 {MASTER_DB.name}）")
+    parser.add_argument("--excel", type=Path, default=MAIN_EXCEL, help=f"Excel 视图（默认 {MAIN_EXCEL.name}）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="导入 Excel（首次即建库）")
+    p.add_argument("--force", action="store_true", help="主库有 Excel 之外的变更时也导入")
+    sub.add_parser("export-excel", help="用主库重写 Excel 视图")
+    sub.add_parser("check", help="校验主库与 Excel 视图一致")
+    p = sub.add_parser("log", help="最近的变更")
+    p.add_argument("-n", "--limit", type=int, default=20)
+    p = sub.add_parser("dates", help="按日期列查询记录")
+    p.add_argument("field", help="日期列名，如 校内考时间1")
+    p.add_argument("start")
+    p.add_argument("end", nargs="?", help="默认与 start 同一天")
+    args = parser.parse_args(argv)
+
+    if args.command != "import" and not args.db.exists():
+        print(f"❌ 找不到主库 {args.db}，请先运行: python3 scripts/master_store.py import")
+        return 1
+    with MasterStore(args.db) as store:
+        if args.command == "import":
+            print(f"📖 导入 {args.excel} → {args.db}")
+            try:
+                stats = store.import_excel(args.excel, source="import", force=args.force)
+            except StaleWorkbookError as e:
+                print(f"❌ {e}")
+                return 1
+            print(f"✅ 新增 {stats['inserted']} 行，更新 {stats['updated']} 行（{stats['changedCells']} 格），"
+                  f"删除 {stats['deleted']} 行，未变化 {stats['unchanged']} 行")
+            describe_registered(register_master(store.read_frame()))
+        elif args.command == "export-excel":
+            store.export_excel(args.excel)
+            print(f"✅ 已导出 {len(store.ids())} 行到 {args.excel}")
+        elif args.command == "check":
+            problems = check(store, args.excel)
+            if problems:
+                print("❌ 主库与 Excel 视图不一致：" + "；".join(problems))
+                if store.excel_is_stale():
+                    print("   （主库有 Excel 视图之外的新变更，运行 export-excel 后再比较）")
+                return 1
+            print(f"✅ 主库 {len(store.ids())} 行与 {args.excel.name} 的解析结果完全一致（值与类型）")
+        elif args.command == "log":
+            for cid, at, source, action, rid, uni, dept, column, old, new in store.changes(args.limit):
+                where = f"#{rid} {uni or ''} {dept or ''}".strip()
+                detail = f" {column}: {old} → {new}" if action == "update" else ""
+                print(f"{cid:>6} {at} {source or '':<24} {action:<6} {where}{detail}")
+        elif args.command == "dates":
+            end = args.end or f"{args.start} 23:59:59"
+            ids = store.programs_between(args.field, args.start, end)
+            frame = store.read_frame().assign(id=store.ids()).set_index("id")
+            print(f"📊 {args.field} 在 {args.start} ~ {end} 之间: {len(ids)} 条")
+            for rid in ids[:50]:
+                row = frame.loc[rid]
+                print(f"   #{rid} {row.get('大学')} {row.get('学部')} {row.get(args.field)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,38 +3,39 @@
 """
 安全合并爬取数据到主Excel文件
 只添加新数据，不覆盖现有数据
+
+由 merge_engine 按（大学, 学部）键哈希去重（已登记的写法按 entity_registry 编号匹配）：与主表重复的跳过，爬取数据内部重复的只保留第一条并列出行号，
+并在 backups/reports/ 生成差异报告（*.diff.json）；性能基准见 scripts/benchmarks/bench_merge_dedup.py。
 """
-import pandas as pd
+import argparse
 from pathlib import Path
-from datetime import datetime
-import shutil
+
+from backup_store import describe as describe_backup
+from merge_engine import (
+    KEEP_MASTER, MergeSpec, backup_workbook, diff_report_path, merge, print_report,
+    read_workbook, write_report,
+)
+from master_store import describe_save, load_master, master_path, save_master
 
 # 文件路径
 MAIN_EXCEL = Path(__file__).parent.parent / "学部学校一览表.xlsx"
 CRAWLED_EXCEL = Path(__file__).parent.parent / "crawled_data" / "crawled_schools_review.xlsx"
 BACKUP_DIR = Path(__file__).parent.parent / "backups"
 
+# 只添加新数据：键去首尾空格后按登记表编号匹配（繁简等写法视为同一所大学），已有记录的所有列都保持主表的值；爬取数据独有的列追加到表末尾
+CRAWL_SPEC = MergeSpec(normalize_keys=True, default_policy=KEEP_MASTER, columns="union", resolve_entities=True)
+
+
 def backup_excel():
     """备份主Excel文件"""
-    if not BACKUP_DIR.exists():
-        BACKUP_DIR.mkdir(parents=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = BACKUP_DIR / f"学部学校一览表_{timestamp}.xlsx"
-    shutil.copy2(MAIN_EXCEL, backup_path)
-    print(f"✅ 已备份主Excel到: {backup_path}")
-    return backup_path
+    backup = backup_workbook(master_path(MAIN_EXCEL), BACKUP_DIR)
+    print(describe_backup(backup))
+    return backup
 
-def is_duplicate(row1, row2):
-    """判断两条记录是否重复（基于大学+学部）"""
-    return (
-        row1.get("大学", "").strip() == row2.get("大学", "").strip() and
-        row1.get("学部", "").strip() == row2.get("学部", "").strip()
-    )
 
-def merge_data():
+def merge_data(assume_yes=False):
     """合并数据"""
-    if not MAIN_EXCEL.exists():
+    if not master_path(MAIN_EXCEL).exists():
         print(f"❌ 找不到主Excel文件: {MAIN_EXCEL}")
         return False
     
@@ -44,70 +45,60 @@ def merge_data():
         return False
     
     # 备份
-    backup_path = backup_excel()
+    backup = backup_excel()
     
     # 读取主Excel
     print("📖 读取主Excel文件...")
-    main_df = pd.read_excel(MAIN_EXCEL, sheet_name="学校总览")
+    main_df = load_master(MAIN_EXCEL)
     print(f"   现有数据: {len(main_df)} 条")
     
     # 读取爬取数据
     print("📖 读取爬取数据...")
-    crawled_df = pd.read_excel(CRAWLED_EXCEL, sheet_name="学校总览")
+    crawled_df = read_workbook(CRAWLED_EXCEL)
     print(f"   爬取数据: {len(crawled_df)} 条")
     
     # 找出新数据（不重复的）
-    new_rows = []
-    duplicate_count = 0
-    
-    for _, crawled_row in crawled_df.iterrows():
-        is_dup = False
-        for _, main_row in main_df.iterrows():
-            if is_duplicate(crawled_row.to_dict(), main_row.to_dict()):
-                is_dup = True
-                duplicate_count += 1
-                break
-        
-        if not is_dup:
-            new_rows.append(crawled_row)
-    
-    print(f"\n📊 统计:")
-    print(f"   - 新数据: {len(new_rows)} 条")
-    print(f"   - 重复数据: {duplicate_count} 条（已跳过）")
-    
-    if len(new_rows) == 0:
+    merged_df, report = merge(main_df, crawled_df, CRAWL_SPEC)
+    new_count = report["summary"]["added"]
+    report_path = write_report(report, diff_report_path(BACKUP_DIR, backup))
+
+    print()
+    print_report(report)
+    print(f"   - 与主表重复的 {report['summary']['matched']} 条、内部重复的后续行均已跳过")
+    print(f"   - 差异报告: {report_path}")
+
+    if new_count == 0:
         print("\n✅ 没有新数据需要合并")
         return True
     
     # 确认合并
-    print(f"\n⚠️  准备添加 {len(new_rows)} 条新数据到主Excel")
-    confirm = input("确认合并？(y/n): ").strip().lower()
+    print(f"\n⚠️  准备添加 {new_count} 条新数据到主Excel")
+    confirm = "y" if assume_yes else input("确认合并？(y/n): ").strip().lower()
     
     if confirm != 'y':
         print("❌ 已取消合并")
         return False
     
-    # 合并数据
-    new_df = pd.DataFrame(new_rows)
-    merged_df = pd.concat([main_df, new_df], ignore_index=True)
-    
     # 保存
-    with pd.ExcelWriter(MAIN_EXCEL, engine='openpyxl') as writer:
-        merged_df.to_excel(writer, sheet_name="学校总览", index=False)
+    print(describe_save(save_master(merged_df, MAIN_EXCEL, base=main_df)))
     
     print(f"\n✅ 合并完成！")
     print(f"   - 原数据: {len(main_df)} 条")
-    print(f"   - 新增: {len(new_rows)} 条")
+    print(f"   - 新增: {new_count} 条")
     print(f"   - 总计: {len(merged_df)} 条")
-    print(f"   - 备份文件: {backup_path}")
+    print(f"   - 备份版本: {backup['sha256'][:12]}（恢复: python3 scripts/backup_store.py restore {backup['sha256'][:12]}）")
     print(f"\n📝 下一步: 运行 python3 export_school_data.py 更新JSON文件")
     
     return True
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="合并爬取数据到主Excel（只添加新数据）")
+    parser.add_argument("--yes", action="store_true", help="不询问，直接保存（供 scripts/run_pipeline.py 等非交互调用）")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("数据合并工具")
     print("=" * 60)
     print()
     
-    merge_data()
+    merge_data(assume_yes=args.yes)
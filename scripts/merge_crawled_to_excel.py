@@ -3,28 +3,35 @@
 """
 将统一爬取框架的输出数据合并到现有Excel结构
 智能合并策略：优先使用爬取数据，保留现有数据（如果爬取数据缺失）
+
+合并由 merge_engine 按 大学+学部 一次批量完成，并在 backups/reports/ 生成差异报告（*.diff.json）。
 """
+import argparse
 import pandas as pd
 import json
 from pathlib import Path
-from datetime import datetime
-import shutil
+
+from backup_store import describe as describe_backup
+from merge_engine import (
+    PREFER_INCOMING, MergeSpec, backup_workbook, diff_report_path, merge, print_report,
+    write_report,
+)
+from master_store import describe_save, load_master, master_path, save_master
 
 # 文件路径
 EXCEL_PATH = Path(__file__).parent.parent / "学部学校一览表.xlsx"
 CRAWLED_DATA_DIR = Path(__file__).parent.parent / "crawled_data" / "unified_crawl_results"
 BACKUP_DIR = Path(__file__).parent.parent / "backups"
 
+# 爬取数据非空时优先；大学/学部按登记表编号匹配；爬取数据独有的新字段追加到表末尾
+CRAWL_TO_EXCEL_SPEC = MergeSpec(default_policy=PREFER_INCOMING, columns="union", resolve_entities=True)
+
+
 def backup_excel():
     """备份Excel文件"""
-    if not BACKUP_DIR.exists():
-        BACKUP_DIR.mkdir(parents=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = BACKUP_DIR / f"学部学校一览表_{timestamp}.xlsx"
-    shutil.copy2(EXCEL_PATH, backup_path)
-    print(f"✅ 已备份Excel到: {backup_path}")
-    return backup_path
+    backup = backup_workbook(master_path(EXCEL_PATH), BACKUP_DIR)
+    print(describe_backup(backup))
+    return backup
 
 def load_crawled_data():
     """加载爬取的数据"""
@@ -118,14 +125,14 @@ def map_crawled_to_excel_format(crawled_item):
     
     return excel_row
 
-def merge_data():
+def merge_data(assume_yes=False):
     """合并数据"""
     print("=" * 60)
     print("数据合并工具")
     print("=" * 60)
     print()
     
-    if not EXCEL_PATH.exists():
+    if not master_path(EXCEL_PATH).exists():
         print(f"❌ 找不到Excel文件: {EXCEL_PATH}")
         return False
     
@@ -135,11 +142,11 @@ def merge_data():
         return False
     
     # 备份Excel
-    backup_path = backup_excel()
+    backup = backup_excel()
     
     # 读取现有Excel
     print("📖 读取现有Excel...")
-    df_existing = pd.read_excel(EXCEL_PATH, sheet_name="学校总览")
+    df_existing = load_master(EXCEL_PATH)
     print(f"   现有数据: {len(df_existing)} 条")
     print()
     
@@ -164,59 +171,29 @@ def merge_data():
     print("   策略：优先使用爬取数据，保留现有数据（如果爬取数据缺失）")
     print()
     
-    # 创建合并后的DataFrame
-    # 以现有Excel的列为基础
-    merged_df = df_existing.copy()
-    
-    # 为每个大学/学部更新数据
-    update_count = 0
-    add_count = 0
-    
-    for _, crawled_row in df_crawled.iterrows():
-        uni = crawled_row.get("大学", "")
-        dept = crawled_row.get("学部", "")
-        
-        if not uni:
-            continue
-        
-        # 查找现有数据中是否有匹配的记录
-        mask = (merged_df["大学"] == uni) & (merged_df["学部"] == dept)
-        matching_rows = merged_df[mask]
-        
-        if len(matching_rows) > 0:
-            # 更新现有记录
-            for idx in matching_rows.index:
-                # 只更新爬取数据中有的字段（非空）
-                for col in crawled_row.index:
-                    if pd.notna(crawled_row[col]) and str(crawled_row[col]).strip():
-                        merged_df.at[idx, col] = crawled_row[col]
-                update_count += 1
-        else:
-            # 添加新记录
-            merged_df = pd.concat([merged_df, pd.DataFrame([crawled_row])], ignore_index=True)
-            add_count += 1
-    
-    print(f"📊 合并统计:")
-    print(f"   - 更新记录: {update_count} 条")
-    print(f"   - 新增记录: {add_count} 条")
+    merged_df, report = merge(df_existing, df_crawled, CRAWL_TO_EXCEL_SPEC)
+    update_count, add_count = report["summary"]["updated"], report["summary"]["added"]
+    report_path = write_report(report, diff_report_path(BACKUP_DIR, backup))
+    
+    print_report(report)
     print(f"   - 总记录数: {len(merged_df)} 条")
+    print(f"   - 差异报告: {report_path}")
     print()
     
     # 确认保存
     print(f"⚠️  准备保存合并后的数据")
-    confirm = input("确认保存？(y/n): ").strip().lower()
+    confirm = "y" if assume_yes else input("确认保存？(y/n): ").strip().lower()
     
     if confirm != 'y':
         print("❌ 已取消保存")
         return False
     
     # 保存
-    with pd.ExcelWriter(EXCEL_PATH, engine='openpyxl') as writer:
-        merged_df.to_excel(writer, sheet_name="学校总览", index=False)
+    print(describe_save(save_master(merged_df, EXCEL_PATH, base=df_existing)))
     
     print()
     print("✅ 合并完成！")
-    print(f"   - 备份文件: {backup_path}")
+    print(f"   - 备份版本: {backup['sha256'][:12]}（恢复: python3 scripts/backup_store.py restore {backup['sha256'][:12]}）")
     print(f"   - 更新记录: {update_count} 条")
     print(f"   - 新增记录: {add_count} 条")
     print()
@@ -228,4 +205,6 @@ def merge_data():
     return True
 
 if __name__ == "__main__":
-    merge_data()
+    parser = argparse.ArgumentParser(description="将统一爬取框架的输出合并到主Excel")
+    parser.add_argument("--yes", action="store_true", help="不询问，直接保存（供 scripts/run_pipeline.py 等非交互调用）")
+    merge_data(assume_yes=parser.parse_args().yes)
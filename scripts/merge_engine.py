@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合并引擎：把外部数据（爬取结果、飞书审核表）按键合并进主Excel 学校总览
+
+merge_crawled_data.py / merge_reviewed_data.py / merge_crawled_to_excel.py 共用：
+备份（backup_store 内容寻址，内容未变化不占空间）→ 读取（workbook_cache）→ 按键批量合并 → 差异报告 → 原子写回；
+已建 SQLite 主库时，读写由各脚本经 master_store 的 load_master / save_master 改为读主库、逐行 upsert；
+未建主库时 save_master 只把变化的行追加到编辑日志（scripts/edit_log.py），整表写回由 edit_log.py compact 一次完成。
+
+合并过程：
+- 按 key_columns（默认 大学+学部）把外部数据与主表做一次哈希连接；外部数据中第一列键为空的行跳过
+- resolve_entities=True 时 大学/学部 先经 entity_registry 解析为整数编号再连接（繁简、异体等已登记写法视为同一所大学），
+  未登记的写法仍按文本匹配；差异报告中的键仍显示规范名
+- 主表已有的键：同键的外部行按顺序逐列套用冲突策略，写入主表中该键的每一行
+- 新键：第一条外部行整行追加，同键后续外部行再按冲突策略覆盖追加的这一行
+- 精确匹配模式下键含空值的外部行无法匹配，每行单独追加
+
+冲突策略（按列配置，未配置的列用 default_policy）：
+- keep-master：已有的值不动（新键的行仍按第一条外部行追加）
+- prefer-incoming-if-nonempty：外部值非空（非 NaN 且去首尾空格后不为空串）时覆盖，同键多行取最后一个非空值
+- newest-timestamp-wins：外部值非空且其 timestamp_column 比目标行的新时覆盖（目标行没有时间戳时视为最旧），
+  同键多行取时间戳最新的非空值；外部行没有时间戳时视为最旧
+
+差异报告（dict，可 write_report 保存为 JSON）：
+    {"generatedAt": ..., "keyColumns": [...], "policies": {...},
+     "summary": {"incoming": 外部行数, "skipped": 键为空跳过, "matched": 命中主表的外部行, "updated": 外部行 × 命中主表行,
+                 "added": 追加行数, "duplicates": 与前面外部行同键的行数, "changedRows": ..., "changedCells": ...},
+     "changes": [{"row": Excel 行号, "key": [...], "column": 列名, "old": 原值, "new": 新值}, ...],
+     "added": [{"row": Excel 行号, "key": [...]}, ...],
+     "incomingDuplicates": [{"key": [...], "rows": [外部数据的行索引, ...]}, ...]}
+"""
+import json
+import os
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from backup_store import BackupStore
+from entity_registry import load_registry
+from workbook_cache import read_sheet
+
+KEEP_MASTER = "keep-master"
+PREFER_INCOMING = "prefer-incoming-if-nonempty"
+NEWEST_WINS = "newest-timestamp-wins"
+POLICIES = (KEEP_MASTER, PREFER_INCOMING, NEWEST_WINS)
+
+SHEET_NAME = "学校总览"
+
+
+class MergeSpec:
+    """
+    Args:
+        key_columns: 匹配键列
+        normalize_keys: True 时键转为文本并去首尾空格、空值视为空串；False 时按原值精确匹配
+        default_policy / policies: 冲突策略，policies 为 {列名: 策略}
+        timestamp_column: newest-timestamp-wins 比较的时间列（主表与外部数据中的同名列）
+        columns: "master" 只写主表已有的列；"union" 外部数据独有的列追加到主表末尾
+        missing_fill: 追加的新行中主表有而外部数据没有的列的取值
+        resolve_entities: True 时前两个键列（大学、学部）按 entity_registry 的编号匹配
+    """
+
+    def __init__(self, key_columns=("大学", "学部"), normalize_keys=False, default_policy=PREFER_INCOMING,
+                 policies=None, timestamp_column=None, columns="master", missing_fill=None, resolve_entities=False):
+        self.key_columns = list(key_columns)
+        self.normalize_keys = normalize_keys
+        self.resolve_entities = resolve_entities
+        self.default_policy = default_policy
+        self.policies = dict(policies or {})
+        self.timestamp_column = timestamp_column
+        self.columns = columns
+        self.missing_fill = missing_fill
+        for policy in [default_policy, *self.policies.values()]:
+            if policy not in POLICIES:
+                raise ValueError(f"未知的冲突策略: {policy}（可选 {', '.join(POLICIES)}）")
+        if NEWEST_WINS in [default_policy, *self.policies.values()] and not timestamp_column:
+            raise ValueError(f"{NEWEST_WINS} 需要指定 timestamp_column")
+        if columns not in ("master", "union"):
+            raise ValueError(f"未知的列模式: {columns}")
+        if resolve_entities and self.key_columns[:2] != ["大学", "学部"]:
+            raise ValueError("resolve_entities 要求前两个键列为 大学、学部")
+
+    def policy(self, column):
+        return self.policies.get(column, self.default_policy)
+
+
+# ---------- 合并 ----------
+
+def filled(series):
+    """有值的单元格：非空且去首尾空格后不为空串。"""
+    return series.notna() & (series.astype(str).str.strip() != "")
+
+
+def row_keys(df, spec):
+    """每行的键元组；精确模式下含空值的键返回 None（不与任何行相等）。"""
+    parts = []
+    for col in spec.key_columns:
+        values = df[col].tolist() if col in df.columns else [""] * len(df)
+        if spec.normalize_keys:
+            values = ["" if pd.isna(v) else str(v).strip() for v in values]
+        parts.append(values)
+    keys = list(zip(*parts))
+    if not spec.normalize_keys:
+        keys = [None if any(pd.isna(v) for v in key) else key for key in keys]
+    if spec.resolve_entities:
+        keys = _entity_keys(keys)
+    return keys
+
+
+def _entity_keys(keys):
+    """把键的 (大学, 学部) 换成登记表编号；未登记的部分保留原值，同一对写法只解析一次。"""
+    registry = load_registry()
+    resolved = {}
+    out = []
+    for key in keys:
+        if key is None:
+            out.append(None)
+            continue
+        pair = key[:2]
+        ids = resolved.get(pair)
+        if ids is None:
+            uid, did = registry.resolve(*pair)
+            ids = resolved[pair] = (pair[0] if uid is None else uid, pair[1] if did is None else did)
+        out.append(ids + key[2:])
+    return out
+
+
+def key_label(key):
+    """报告中显示的键：登记表编号换回规范名。"""
+    if key is None:
+        return None
+    registry = load_registry()
+    university, department, *rest = key
+    if isinstance(university, int):
+        university = registry.university_name(university)
+        if isinstance(department, int):
+            department = registry.department_name(department)
+    return (university, department, *rest)
+
+
+def _timestamps(df, spec):
+    if spec.timestamp_column and spec.timestamp_column in df.columns:
+        return pd.to_datetime(df[spec.timestamp_column], errors="coerce").reset_index(drop=True)
+    return pd.Series(pd.NaT, index=range(len(df)), dtype="datetime64[ns]")
+
+
+def _assign(df, positions, col, values):
+    """按行位置批量写入一列；取值与原列类型不兼容时（如日期列写入文本）先转为 object 列。"""
+    try:
+        df.iloc[positions, df.columns.get_loc(col)] = values
+    except (TypeError, ValueError):
+        df[col] = df[col].astype(object)
+        df.iloc[positions, df.columns.get_loc(col)] = values
+
+
+def _same(a, b):
+    if pd.isna(a) and pd.isna(b):
+        return True
+    if pd.isna(a) or pd.isna(b):
+        return False
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+def _json_value(v):
+    if v is None or (not isinstance(v, (list, dict)) and pd.isna(v)):
+        return None
+    if isinstance(v, np.datetime64):  # .item() 得到的 datetime 不能直接写 JSON
+        v = pd.Timestamp(v)
+    if hasattr(v, "strftime"):
+        return v.strftime("%Y-%m-%d %H:%M:%S")
+    if hasattr(v, "item"):  # numpy 标量
+        return v.item()
+    return v
+
+
+def _apply(df, targets, keys, aligned, columns, allow, changes):
+    """aligned 第 k 行的取值写入 df 第 targets[k] 行；allow(col) 返回该列每个目标是否允许覆盖的布尔数组。"""
+    if not targets:
+        return
+    for col in columns:
+        values = aligned[col].to_numpy()
+        mask = aligned[col].notna().to_numpy() & allow(col)
+        if not mask.any():
+            continue
+        positions = [t for t, m in zip(targets, mask) if m]
+        old = df[col].iloc[positions].tolist()
+        new = values[mask]
+        for pos, key, a, b in zip(positions, [k for k, m in zip(keys, mask) if m], old, new):
+            if not _same(a, b):
+                changes.append({"row": pos, "key": key, "column": col, "old": a, "new": b})
+        _assign(df, positions, col, new)
+
+
+def merge(master, incoming, spec):
+    """
+    按 spec 把 incoming 合并进 master（均不修改）
+
+    Returns:
+        (merged_df, report)
+    """
+    if spec.columns == "union":
+        extra = [c for c in incoming.columns if c not in master.columns]
+        columns = list(incoming.columns)
+    else:
+        extra = []
+        columns = [c for c in master.columns if c in incoming.columns]
+    update_columns = [c for c in columns if spec.policy(c) != KEEP_MASTER]
+    if spec.resolve_entities:
+        # 按编号匹配时外部数据的 大学/学部 可能是其它写法，已有行保留主表的写法
+        update_columns = [c for c in update_columns if c not in spec.key_columns[:2]]
+    newest_columns = [c for c in update_columns if spec.policy(c) == NEWEST_WINS]
+
+    first = spec.key_columns[0]
+    present = incoming[first].notna() & incoming[first].astype(bool) if first in incoming.columns \
+        else pd.Series(False, index=incoming.index)
+    # 报告中的外部行用原 DataFrame 的索引（从 Excel 读入且只做过筛选时，索引 + 2 即 Excel 行号）
+    source_rows = incoming.index[present.to_numpy()].tolist()
+    rows = incoming[present.to_numpy()].reset_index(drop=True)
+    keys = row_keys(rows, spec)
+
+    # 主表键 → 行位置
+    master_positions = defaultdict(list)
+    for pos, key in enumerate(row_keys(master, spec)):
+        if key is not None:
+            master_positions[key].append(pos)
+
+    # 给每个键编号；appended 为整行追加的外部行，group 为参与覆盖的外部行所属的键编号
+    codes, code_keys, code_rows = {}, [], []
+    appended, group = [], [-1] * len(rows)
+    matched = updated = duplicates = 0
+    for i, key in enumerate(keys):
+        if key is None:
+            appended.append(i)
+            continue
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(code_keys)
+            code_keys.append(key)
+            code_rows.append([])
+        else:
+            duplicates += 1
+        code_rows[code].append(source_rows[i])
+        if key in master_positions:
+            matched += 1
+        elif len(code_rows[code]) == 1:
+            appended.append(i)
+            continue
+        group[i] = code
+        updated += len(master_positions.get(key, ())) or 1
+
+    # 各键每列的覆盖值：prefer-incoming 取最后一个非空值，newest-timestamp-wins 取时间戳最新的非空值
+    ts = _timestamps(rows, spec)
+    grouped = pd.Series(group)
+    in_group = (grouped >= 0).to_numpy()
+    values = rows[update_columns].where(pd.DataFrame({c: filled(rows[c]) for c in update_columns}))
+    updates = values[in_group].groupby(grouped[in_group], sort=False).last()
+    update_ts = {}
+    if newest_columns:
+        order = ts[in_group].sort_values(kind="stable", na_position="first").index
+        newest = values.loc[order, newest_columns].groupby(grouped[order], sort=False).last()
+        updates[newest_columns] = newest.reindex(updates.index)
+        for col in newest_columns:
+            col_ts = ts.where(values[col].notna())
+            update_ts[col] = col_ts.loc[order].groupby(grouped[order], sort=False).last().reindex(updates.index)
+
+    def allow_for(target_ts, sources):
+        def allow(col):
+            if col not in update_ts:
+                return True
+            incoming_ts = update_ts[col].loc[sources].to_numpy()
+            # 双方都没有时间戳时按外部数据顺序覆盖；只有一方有时，有时间戳的一方为新
+            return np.where(pd.isna(incoming_ts), pd.isna(target_ts), pd.isna(target_ts) | (incoming_ts > target_ts))
+        return allow
+
+    merged = master.copy()
+    if extra:
+        merged = merged.reindex(columns=list(master.columns) + extra)
+    changes = []
+
+    # 更新主表已有的键
+    targets, sources = [], []
+    for code in updates.index:
+        for pos in master_positions.get(code_keys[code], ()):
+            targets.append(pos)
+            sources.append(code)
+    master_ts = _timestamps(master, spec).to_numpy()[targets] if targets else []
+    _apply(merged, targets, [code_keys[c] for c in sources], updates.loc[sources], update_columns,
+           allow_for(master_ts, sources), changes)
+
+    # 追加新行：先取整行，再用同键后续外部行覆盖，最后一次性拼接
+    base = rows.iloc[appended]
+    if spec.columns == "union":
+        new_df = base.reset_index(drop=True)
+    else:
+        new_df = base[columns].reindex(columns=list(master.columns), fill_value=spec.missing_fill).reset_index(drop=True)
+    new_keys = [keys[i] for i in appended]
+    new_codes = [codes.get(k) if k is not None else None for k in new_keys]
+    targets = [j for j, code in enumerate(new_codes) if code is not None and code in updates.index]
+    sources = [new_codes[j] for j in targets]
+    base_ts = ts.iloc[appended].to_numpy()[targets] if targets else []
+    # 新行本身不在主表中，覆盖它不计入差异
+    _apply(new_df, targets, [new_keys[j] for j in targets], updates.loc[sources], update_columns,
+           allow_for(base_ts, sources), [])
+    if len(new_df):
+        merged = pd.concat([merged, new_df], ignore_index=True)
+
+    label = key_label if spec.resolve_entities else (lambda key: key)
+    report = {
+        "generatedAt": datetime.now().isoformat(timespec="seconds"),
+        "keyColumns": spec.key_columns,
+        "policies": {c: spec.policy(c) for c in columns},
+        "summary": {
+            "incoming": len(incoming),
+            "skipped": len(incoming) - len(rows),
+            "matched": matched,
+            "updated": updated,
+            "added": len(appended),
+            "duplicates": duplicates,
+            "changedRows": len({c["row"] for c in changes}),
+            "changedCells": len(changes),
+        },
+        # Excel 行号：表头为第 1 行
+        "changes": [{**c, "row": c["row"] + 2, "key": label(c["key"])} for c in changes],
+        "added": [{"row": len(master) + j + 2, "key": label(k)} for j, k in enumerate(new_keys)],
+        "incomingDuplicates": [
+            {"key": label(code_keys[code]), "rows": r} for code, r in enumerate(code_rows) if len(r) > 1
+        ],
+    }
+    return merged, report
+
+
+# ---------- 读写 ----------
+
+def backup_workbook(path, backup_dir):
+    """存入 backup_dir/workbooks 内容寻址备份库（内容未变化时只记一行日志），返回备份记录。"""
+    return BackupStore(backup_dir / "workbooks").backup(path)
+
+
+def diff_report_path(backup_dir, backup):
+    """差异报告路径：backup_dir/reports/<文件名>_<备份时间>.diff.json。"""
+    stamp = datetime.fromisoformat(backup["time"]).strftime("%Y%m%d_%H%M%S")
+    return backup_dir / "reports" / f"{Path(backup['file']).stem}_{stamp}.diff.json"
+
+
+def read_workbook(path, sheet_name=SHEET_NAME):
+    return read_sheet(path, sheet_name)
+
+
+def write_workbook(df, path, sheet_name=SHEET_NAME):
+    """先写临时文件再替换，写入中途失败不会损坏主Excel。"""
+    tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.tmp{path.suffix}")
+    try:
+        with pd.ExcelWriter(tmp_path, engine="openpyxl") as writer:
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def write_report(report, path):
+    def convert(obj):
+        if isinstance(obj, dict):
+            return {k: convert(v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [convert(v) for v in obj]
+        return _json_value(obj)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(convert(report), f, ensure_ascii=False, indent=1)
+    return path
+
+
+def print_report(report, limit=10):
+    s = report["summary"]
+    print("📊 合并统计:")
+    print(f"   - 外部数据: {s['incoming']} 条（键为空跳过 {s['skipped']} 条）")
+    print(f"   - 命中主表: {s['matched']} 条，更新记录: {s['updated']} 条（实际变化 {s['changedRows']} 行 {s['changedCells']} 格）")
+    print(f"   - 新增记录: {s['added']} 条")
+    if report["incomingDuplicates"]:
+        print(f"   - 外部数据内部同键: {len(report['incomingDuplicates'])} 组，{s['duplicates']} 条")
+        for item in report["incomingDuplicates"][:limit]:
+            # 行号按 Excel 计（表头为第 1 行）
+            print(f"     · {' '.join(str(k) for k in item['key'])}: 第 {', '.join(str(r + 2) for r in item['rows'])} 行")
+        if len(report["incomingDuplicates"]) > limit:
+            print(f"     · ……其余 {len(report['incomingDuplicates']) - limit} 组略")
@@ -6,29 +6,38 @@
 1. 读取飞书导出的审核表格（Excel或CSV）
 2. 提取已审核/已确认的记录
 3. 合并到主Excel（优先使用审核后的数据）
+
+合并由 merge_engine 按 大学+学部 一次批量 upsert（审核值非空时优先），结果与逐条处理一致，
+并在 backups/reports/ 生成差异报告（*.diff.json）；性能基准见 scripts/benchmarks/bench_merge_reviewed.py。
 """
+import argparse
 import pandas as pd
 from pathlib import Path
-from datetime import datetime
-import shutil
+
+from backup_store import describe as describe_backup
+from merge_engine import (
+    PREFER_INCOMING, MergeSpec, backup_workbook, diff_report_path, merge, print_report,
+    read_workbook, write_report,
+)
+from master_store import describe_save, load_master, master_path, save_master
 
 # 文件路径
 MAIN_EXCEL = Path(__file__).parent.parent / "学部学校一览表.xlsx"
 REVIEWED_EXCEL = Path(__file__).parent.parent / "crawled_data" / "审核表格_完整版.xlsx"  # 飞书导出后的文件
 BACKUP_DIR = Path(__file__).parent.parent / "backups"
 
+# 审核后的数据优先；大学/学部按登记表编号匹配；只写主Excel已有的列，新记录中审核表没有的列填空串
+REVIEW_SPEC = MergeSpec(default_policy=PREFER_INCOMING, columns="master", missing_fill="", resolve_entities=True)
+
+
 def backup_excel():
     """备份主Excel"""
-    if not BACKUP_DIR.exists():
-        BACKUP_DIR.mkdir(parents=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = BACKUP_DIR / f"学部学校一览表_{timestamp}.xlsx"
-    shutil.copy2(MAIN_EXCEL, backup_path)
-    print(f"✅ 已备份主Excel到: {backup_path}")
-    return backup_path
+    backup = backup_workbook(master_path(MAIN_EXCEL), BACKUP_DIR)
+    print(describe_backup(backup))
+    return backup
+
 
-def merge_reviewed_data():
+def merge_reviewed_data(assume_yes=False):
     """合并审核后的数据"""
     print("=" * 60)
     print("合并审核后的数据")
@@ -36,7 +45,7 @@ def merge_reviewed_data():
     print()
     
     # 检查文件
-    if not MAIN_EXCEL.exists():
+    if not master_path(MAIN_EXCEL).exists():
         print(f"❌ 找不到主Excel文件: {MAIN_EXCEL}")
         return False
     
@@ -56,11 +65,11 @@ def merge_reviewed_data():
             return False
     
     # 备份主Excel
-    backup_path = backup_excel()
+    backup = backup_excel()
     
     # 读取主Excel
     print("📖 读取主Excel...")
-    df_main = pd.read_excel(MAIN_EXCEL, sheet_name="学校总览")
+    df_main = load_master(MAIN_EXCEL)
     print(f"   主Excel记录数: {len(df_main)} 条")
     
     # 读取审核表格
@@ -68,7 +77,7 @@ def merge_reviewed_data():
     if reviewed_file.suffix == '.csv':
         df_reviewed = pd.read_csv(reviewed_file, encoding='utf-8-sig')
     else:
-        df_reviewed = pd.read_excel(reviewed_file, sheet_name="审核表格")
+        df_reviewed = read_workbook(reviewed_file, "审核表格")
     print(f"   审核表格记录数: {len(df_reviewed)} 条")
     print()
     
@@ -91,72 +100,29 @@ def merge_reviewed_data():
     print("   策略：优先使用审核后的数据，保留主Excel中审核表格没有的记录")
     print()
     
-    # 获取主Excel的列（只更新主Excel中存在的列）
-    main_columns = list(df_main.columns)
-    
-    # 创建合并后的DataFrame
-    merged_df = df_main.copy()
-    
-    # 更新记录数统计
-    update_count = 0
-    add_count = 0
-    
-    # 遍历审核后的记录
-    for _, reviewed_row in df_confirmed.iterrows():
-        uni = reviewed_row.get("大学", "")
-        dept = reviewed_row.get("学部", "")
-        
-        if not uni or pd.isna(uni):
-            continue
-        
-        # 查找主Excel中匹配的记录（基于大学+学部）
-        mask = (merged_df["大学"] == uni) & (merged_df["学部"] == dept)
-        matching_rows = merged_df[mask]
-        
-        if len(matching_rows) > 0:
-            # 更新现有记录
-            for idx in matching_rows.index:
-                # 只更新主Excel中存在的列，且审核表格中有值的字段
-                for col in main_columns:
-                    if col in reviewed_row.index:
-                        reviewed_val = reviewed_row[col]
-                        # 如果审核表格中的值不为空，则更新
-                        if pd.notna(reviewed_val) and str(reviewed_val).strip():
-                            merged_df.at[idx, col] = reviewed_val
-                update_count += 1
-        else:
-            # 添加新记录（只添加主Excel列中存在的字段）
-            new_row = {}
-            for col in main_columns:
-                if col in reviewed_row.index:
-                    new_row[col] = reviewed_row[col]
-                else:
-                    new_row[col] = ""
-            
-            merged_df = pd.concat([merged_df, pd.DataFrame([new_row])], ignore_index=True)
-            add_count += 1
-    
-    print(f"📊 合并统计:")
-    print(f"   - 更新记录: {update_count} 条")
-    print(f"   - 新增记录: {add_count} 条")
+    merged_df, report = merge(df_main, df_confirmed, REVIEW_SPEC)
+    update_count, add_count = report["summary"]["updated"], report["summary"]["added"]
+    report_path = write_report(report, diff_report_path(BACKUP_DIR, backup))
+    
+    print_report(report)
     print(f"   - 总记录数: {len(merged_df)} 条")
+    print(f"   - 差异报告: {report_path}")
     print()
     
     # 确认保存
     print(f"⚠️  准备保存合并后的数据")
-    confirm = input("确认保存？(y/n): ").strip().lower()
+    confirm = "y" if assume_yes else input("确认保存？(y/n): ").strip().lower()
     
     if confirm != 'y':
         print("❌ 已取消保存")
         return False
     
     # 保存
-    with pd.ExcelWriter(MAIN_EXCEL, engine='openpyxl') as writer:
-        merged_df.to_excel(writer, sheet_name="学校总览", index=False)
+    print(describe_save(save_master(merged_df, MAIN_EXCEL, base=df_main)))
     
     print()
     print("✅ 合并完成！")
-    print(f"   - 备份文件: {backup_path}")
+    print(f"   - 备份版本: {backup['sha256'][:12]}（恢复: python3 scripts/backup_store.py restore {backup['sha256'][:12]}）")
     print(f"   - 更新记录: {update_count} 条")
     print(f"   - 新增记录: {add_count} 条")
     print()
@@ -168,4 +134,6 @@ def merge_reviewed_data():
     return True
 
 if __name__ == "__main__":
-    merge_reviewed_data()
+    parser = argparse.ArgumentParser(description="将飞书导出的审核表格合并回主Excel")
+    parser.add_argument("--yes", action="store_true", help="不询问，直接保存（供 scripts/run_pipeline.py 等非交互调用）")
+    merge_reviewed_data(assume_yes=parser.parse_args().yes)
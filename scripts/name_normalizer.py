@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大学 / 学部名的字符级规范化：简体字、繁体字（旧字体）统一为日本新字体，生成跨数据源一致的查找键
+
+normalize_name() 依次做：
+- NFKC：全角英数、半角片假名、全角括号等统一宽度（"ＩＣＵ" → "ICU"，"（" → "("）
+- 可选去掉括号备注（"法政大学(指定校推荐)" → "法政大学"）
+- 查 TRANSLATION 表逐字替换：简体 / 繁体 → 日本新字体（横滨 → 横浜，广岛 → 広島，國學院大學 → 国学院大学）
+- 去掉全部空白，再 NFC 合成浊点（"マネシ゛メント" → "マネジメント"），拉丁字母转小写
+
+结果只用作比较和查找的键，不用于显示。字符表在导入时一次编译为 str.translate 的映射表；
+同一写法只计算一次（lru_cache）。normalize_series() 对整列先去重再逐个规范化，
+10 万行的 合格实绩 导出也远低于 1 秒（基准见 scripts/benchmarks/bench_normalize.py）。
+
+用法：
+    python3 scripts/name_normalizer.py 广岛大学 國學院大學 "早稲田大学（政経）"
+"""
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+# 每个词：第一个字是日本新字体，其后是它的简体 / 繁体写法。
+# 只收录在简繁日三者间一一对应的字，以下几类不收录（逐字替换会把别的字也改掉）：
+# - 一个简体字合并了多个繁体字：复（複/復）、发（發/髮）、历（歷/曆）、冲（沖/衝）、舍（舍/捨）、钟（鐘/鍾）
+# - 简体字本身也是常用的日本字：叶（かなう）、机（つくえ）、范（姓）
+# - 日本新字体合并了多个字：台（臺/颱/檯）
+# 这些写法的大学名（千叶大学、二松学舍大学等）在 data/entity_registry.json 中按整个名称登记为别名。
+VARIANT_TABLE = """
+東东 国國 際际 学學 会會 経经經 済济濟 営营營 語语 産产 業业 関关關 愛爱 楽乐樂 薬药藥 医醫 歯齿齒
+護护 環环 観观觀 現现 広广廣 島岛 浜滨濱 横橫 岡冈 児儿兒 徳德 縄绳繩 長长 宮宫 県县縣
+賀贺 静靜 駒驹 沢泽澤 稲稻 桜樱櫻 聖圣 館馆舘 紀纪 総综總綜 体體 芸艺藝 術术 設设 計计 報报
+電电 気气氣 農农 図图圖 書书 湾灣 華华 蘭兰 亜亚亞 細细 応应應 義义 慶庆 独獨 協协 師师
+専专專 門门 伝传傳 統统 戸户 鉄铁鐵 鋼钢 運运 輸输 訳译譯 読读讀 売卖賣 買买 資资 価价價
+値值 権权權 収收 憲宪 貿贸 発發 開开 創创 険险險 栄荣榮 養养 衛卫衞 歴歷 倫伦 礼禮 園园 員员
+職职 実实實 践踐 習习 験验驗 試试 検检檢 認认 証证證 数數 類类 論论 説说 話话 詞词 調调 課课 談谈
+講讲 議议 謝谢 記记 録录錄 銀银 錦锦 陽阳 陰阴 鳥鸟 馬马 庫库 蔵藏 駿骏 順顺 鴎鸥鷗
+岳嶽 龍龙 辺边邊邉 条條 閣阁 間间 聞闻 問问 陸陆 隊队 階阶 雑杂雜 離离 難难 響响 頭头 題题 願愿
+飛飞 飯饭 魚鱼 鮮鲜 黄黃 黒黑 点點 齢龄齡 亀龟龜 区區 単单單 参參 双雙 号號 呉吴 啓启 団团團 圏圈
+圧压壓 場场 声聲 変变變 夢梦 奥奧 奨奖奬 姫姬 婦妇 孫孙 宝寶 寿壽 対对對 導导 将將 層层 峡峽 巻卷
+帯带帶 帰归歸 庁厅廳 廃废 弁辩辯 弾弹彈 当當 従从從 恋戀 恵惠 悪恶惡 態态 戦战戰 戯戏戲 拡扩擴
+択择擇 担擔 挙举擧 損损 摂摄攝 斉齐齊 斎斋齋 断斷 旧舊 昼晝 時时 晩晚 暁晓 暦曆 来來 枢樞 楼樓
+様样樣 樹树 橋桥 欧歐 歓欢歡 歩步 残殘 毎每 浄淨 浅淺 涙泪 渋涩澀 渓溪 温溫 満满滿 滝泷瀧 漢汉
+潜潛 瀬濑瀨 灯燈 焼烧燒 犠牺 状狀 狭狹 猟猎 献獻 獣兽獸 真眞 研硏 確确 禅禪 秘祕 称稱 穏稳穩 穂穗
+窓窗 競竞 筆笔 節节 篤笃 簡简 粋粹 糸丝絲 紅红 約约 級级 納纳 純纯 紙纸 紹绍 結结 給给 絵绘繪
+絶绝 継继繼 続续續 維维 網网 緑绿綠 練练 縁缘 縦纵縱 績绩 繊纤纖 織织 聴听聽 脳脑腦 臓脏臟 臨临
+与與 興兴 荘莊 万萬 処处處 虚虛 虫蟲 蛍萤螢 装裝 補补 覚觉覺 覧览覽 規规 視视 親亲 触觸 訓训 許许
+訴诉 診诊 評评 詩诗 誠诚 誤误 諸诸 謙谦 識识 譲让讓 豊丰豐 貝贝 負负 財财 貢贡 貧贫 責责 貯贮
+貴贵 貸贷 費费 賞赏 賢贤 質质 購购 贈赠 転转轉 軽轻輕 較较 載载 輪轮 轄辖 連连 進进 遅迟遲 過过
+達达 違违 遠远 適适 選选 遺遗 還还 郵邮 郷乡鄕 醸酿 釈释釋 針针 鈴铃 鉱矿鑛 銭钱錢 鏡镜
+鑑鉴 閉闭 閲阅 陳陈 随隨 隠隐隱 霊灵靈 頂顶 項项 預预 領领 額额 顕显顯 風风 飲饮 飼饲 飾饰
+駅驿驛 騒骚騷 鳴鸣 鶏鸡雞鷄 麦麥 潟泻 栃枥 濃浓 漁渔 灘滩
+ケヶ カヵ
+"""
+
+_BRACKETED = re.compile(r"\([^)]*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def compile_table(text):
+    """把 VARIANT_TABLE 编译为 str.translate 的映射表 {码位: 目标字}。"""
+    table = {}
+    for word in text.split():
+        target = word[0]
+        for ch in word[1:]:
+            if ord(ch) in table and table[ord(ch)] != target:
+                raise ValueError(f"「{ch}」同时对应 {table[ord(ch)]} 和 {target}")
+            table[ord(ch)] = target
+    # 目标字本身不能再被替换，否则结果取决于替换次数
+    chained = {chr(c) for c in table} & set(table.values())
+    if chained:
+        raise ValueError(f"这些字既是目标又被替换: {''.join(sorted(chained))}")
+    return table
+
+
+TRANSLATION = compile_table(VARIANT_TABLE)
+
+
+@lru_cache(maxsize=65536)
+def normalize_name(name, strip_brackets=False):
+    """大学 / 学部名的查找键（见模块说明）；None / NaN 为空串。"""
+    if name is None or name != name:  # None / NaN
+        return ""
+    text = unicodedata.normalize("NFKC", str(name))
+    if strip_brackets:
+        text = _BRACKETED.sub("", text)
+    # 去掉空白后再做一次 NFC：NFKC 把独立的浊点「゛」拆成空格 + 组合浊点，去掉空格后才能与前一个假名合成
+    return unicodedata.normalize("NFC", _WHITESPACE.sub("", text.translate(TRANSLATION))).lower()
+
+
+def normalize_series(values, strip_brackets=False):
+    """整列规范化：先按取值去重，每个不同的写法只规范化一次，返回与 values 等长、同索引的 Series。"""
+    import pandas as pd
+
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    keys = [normalize_name(v, strip_brackets) for v in uniques]
+    keys.append("")  # 空值的 code 为 -1，取到末尾的空串
+    return pd.Series([keys[c] for c in codes], index=series.index, dtype=object)
+
+
+def main(argv=None):
+    names = sys.argv[1:] if argv is None else argv
+    if not names:
+        print("用法: python3 scripts/name_normalizer.py 名称 [名称 ...]")
+        return 1
+    for name in names:
+        print(f"{name} → {normalize_name(name)}（去括号: {normalize_name(name, strip_brackets=True)}）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
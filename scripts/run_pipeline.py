@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据流水线：按依赖关系（DAG）非交互地运行 爬取 → 合并 → 审核表 → 导出 → 合格分析 各阶段
+
+- 每个阶段声明脚本、输入文件（可用通配符）、输出文件和上游阶段；需要确认的合并脚本以 --yes 运行，不再等待 input()
+- 阶段成功后把输入文件（含阶段脚本本身）的 sha256 记录到 .cache/pipeline-state.json；
+  下次运行时输入哈希未变且输出仍在则跳过，所以夜间刷新只做输入变化所需的工作
+- 上游都已完成（运行或跳过）的阶段并行运行（--jobs）；某阶段失败时其下游全部不运行，退出码为 1
+- 输入缺失（如尚未放入飞书导出的审核表）的阶段跳过，不算失败
+- 未建 SQLite 主库时合并阶段只向编辑日志追加变化的行，compact_edit_log 在全部合并之后一次写回 学部学校一览表.xlsx
+
+飞书审核是人工环节，不在进程内等待：把飞书导出的文件保存为 crawled_data/审核表格_完整版.xlsx（或 .csv）后，
+下次运行时 merge_reviewed_data 检测到输入变化而运行。它排在 create_review_table 之前，
+避免新生成的审核表覆盖尚未合并的飞书导出。
+
+用法：
+    python3 scripts/run_pipeline.py --dry-run                    # 只列出各阶段将运行还是跳过及原因
+    python3 scripts/run_pipeline.py --yes                        # 不询问，直接运行（夜间任务）
+    python3 scripts/run_pipeline.py --yes --only export_school_data analyze_admission_scores
+    python3 scripts/run_pipeline.py --yes --force                # 忽略记录的哈希，全部重跑（--force 阶段名 只重跑指定阶段）
+"""
+import argparse
+import fnmatch
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+from workbook_cache import file_hash  # noqa: E402
+
+STATE_PATH = ROOT / ".cache" / "pipeline-state.json"
+MAIN_EXCEL = "学部学校一览表.xlsx"
+MASTER_DB = "school-master.db"
+# 已建 SQLite 主库（scripts/master_store.py）时各阶段读写主库，Excel 只是给老师的导出视图；
+# 否则主数据是 Excel 加上合并追加、尚未写回的编辑日志 学部学校一览表.editlog.jsonl（scripts/edit_log.py）
+MASTER = MASTER_DB if (ROOT / MASTER_DB).exists() else "学部学校一览表.*"
+# 读主数据的阶段排在它之后：未建主库时由 compact_edit_log 把各合并阶段的编辑日志一次写回 Excel
+MERGED = "merge_reviewed_data" if MASTER == MASTER_DB else "compact_edit_log"
+REVIEW_FILES = "crawled_data/审核表格_完整版.*"
+REGISTRY = "data/entity_registry.json"
+CRAWL_RESULTS = "crawled_data/unified_crawl_results/crawl_results_*.json"
+
+
+class Stage:
+    """流水线中的一个阶段；路径均相对于仓库根目录。"""
+
+    def __init__(self, name, script, inputs, outputs, after=(), args=(), refreshes=()):
+        self.name = name
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        self.args = list(args)
+        # 本阶段的输出也是这些阶段的输入、但不应触发它们重跑时，成功后顺带更新它们记录的输入哈希
+        self.refreshes = list(refreshes)
+
+    def command(self):
+        return [sys.executable, str(ROOT / self.script), *self.args]
+
+
+STAGES = [
+    Stage("crawl", "scripts/crawlers/unified_crawler_framework.py",
+          inputs=["学校总览.csv", "crawled_data/university_urls.json"],
+          outputs=[CRAWL_RESULTS]),
+    Stage("merge_crawled_to_excel", "scripts/merge_crawled_to_excel.py",
+          inputs=[CRAWL_RESULTS], outputs=[MASTER], after=["crawl"], args=["--yes"]),
+    # 与上一阶段写同一份主数据，必须串行
+    Stage("merge_reviewed_data", "scripts/merge_reviewed_data.py",
+          inputs=[REVIEW_FILES], outputs=[MASTER], after=["merge_crawled_to_excel"], args=["--yes"]),
+    # 新生成的审核表只是待审核的模板，不应让 merge_reviewed_data 下次重跑
+    Stage("create_review_table", "scripts/create_review_table.py",
+          inputs=[MASTER], outputs=["crawled_data/审核表格_完整版.xlsx", "crawled_data/审核表格_完整版.csv"],
+          after=[MERGED], refreshes=["merge_reviewed_data"]),
+    Stage("export_school_data", "export_school_data.py",
+          inputs=[MASTER, REGISTRY], outputs=["学校总览.json", "school-master.json", "学校总览.csv"],
+          after=[MERGED]),
+    # 合并阶段会在登记表中登记新大学，模型的 schoolId 要与导出的一致
+    Stage("analyze_admission_scores", "scripts/analyze_admission_scores.py",
+          inputs=["合格实绩.xlsx", REGISTRY], outputs=["data/admission_score_model.json"],
+          after=["merge_reviewed_data"]),
+]
+if MASTER == MASTER_DB:
+    STAGES.append(Stage("export_excel_view", "scripts/master_store.py", inputs=[MASTER_DB], outputs=[MAIN_EXCEL],
+                        after=["merge_reviewed_data"], args=["export-excel"]))
+else:
+    # 写回后日志被删除、Excel 改变，顺带更新自己记录的输入哈希，下次不因此重跑
+    STAGES.append(Stage("compact_edit_log", "scripts/edit_log.py", inputs=[MASTER], outputs=[MAIN_EXCEL],
+                        after=["merge_reviewed_data"], args=["compact"], refreshes=["compact_edit_log"]))
+
+
+def topological_order(stages):
+    """按依赖排序；依赖不存在或有环时报错。"""
+    by_name = {stage.name: stage for stage in stages}
+    order, state = [], {}
+
+    def visit(stage):
+        if state.get(stage.name) == "done":
+            return
+        if state.get(stage.name) == "visiting":
+            raise ValueError(f"阶段依赖有环: {stage.name}")
+        state[stage.name] = "visiting"
+        for dep in stage.after:
+            if dep not in by_name:
+                raise ValueError(f"阶段 {stage.name} 依赖未知阶段 {dep}")
+            visit(by_name[dep])
+        state[stage.name] = "done"
+        order.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return order
+
+
+def expand(pattern):
+    """通配符展开为排好序的相对路径。"""
+    return sorted(str(p.relative_to(ROOT)) for p in ROOT.glob(pattern) if p.is_file())
+
+
+def input_hashes(stage):
+    """返回 ({相对路径: sha256}, 缺失的输入)；阶段脚本本身也算输入，改了脚本会重跑。"""
+    hashes, missing = {stage.script: file_hash(ROOT / stage.script)}, []
+    for pattern in stage.inputs:
+        paths = expand(pattern)
+        if not paths:
+            missing.append(pattern)
+        for path in paths:
+            hashes[path] = file_hash(ROOT / path)
+    return hashes, missing
+
+
+def outputs_present(stage):
+    return all(expand(pattern) for pattern in stage.outputs)
+
+
+def feeds(upstream, stage):
+    """upstream 的输出是否落在 stage 的输入里。"""
+    return any(fnmatch.fnmatch(out, pattern) or fnmatch.fnmatch(pattern, out)
+               for out in upstream.outputs for pattern in stage.inputs)
+
+
+def load_state(path):
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("stages", {})
+    except (OSError, ValueError):
+        print(f"⚠️  无法读取流水线状态 {path}，全部阶段视为未运行")
+        return {}
+
+
+def save_state(path, stages):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"stages": stages}, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def decide(stage, state, forced):
+    """返回 (动作, 原因, 输入哈希)；动作为 run / skip / missing。"""
+    hashes, missing = input_hashes(stage)
+    if missing:
+        return "missing", "缺少输入 " + "、".join(missing), hashes
+    if forced:
+        return "run", "--force", hashes
+    previous = state.get(stage.name)
+    if previous is None:
+        return "run", "从未成功运行", hashes
+    changed = sorted(p for p in set(hashes) | set(previous["inputs"]) if hashes.get(p) != previous["inputs"].get(p))
+    if changed:
+        shown = "、".join(changed[:3]) + (f" 等 {len(changed)} 个" if len(changed) > 3 else "")
+        return "run", f"输入变化: {shown}", hashes
+    if not outputs_present(stage):
+        return "run", "输出缺失", hashes
+    return "skip", f"输入未变化（上次成功 {previous['finishedAt']}）", hashes
+
+
+def plan(stages, state, forced):
+    """--dry-run：按依赖顺序推演；上游将运行且输出是本阶段输入时，本阶段记为可能运行。"""
+    by_name = {stage.name: stage for stage in stages}
+    actions = {}
+    for stage in topological_order(stages):
+        action, reason, _ = decide(stage, state, stage.name in forced)
+        if action != "run":
+            upstream = [dep for dep in all_upstream(stage, by_name)
+                        if actions.get(dep) in ("run", "maybe") and feeds(by_name[dep], stage)]
+            if upstream:
+                action, reason = "maybe", f"上游 {'、'.join(upstream)} 运行后输入可能变化"
+        actions[stage.name] = action
+        label = {"run": "▶️  运行", "maybe": "❔ 可能运行", "skip": "⏭️  跳过", "missing": "⚠️  跳过"}[action]
+        deps = f"（依赖 {'、'.join(stage.after)}）" if stage.after else ""
+        print(f"{label} {stage.name}{deps}: {reason}")
+        print(f"      {' '.join([Path(stage.script).name, *stage.args])}")
+    return actions
+
+
+def all_upstream(stage, by_name):
+    seen, stack = [], list(stage.after)
+    while stack:
+        name = stack.pop()
+        if name not in seen:
+            seen.append(name)
+            stack.extend(by_name[name].after)
+    return seen
+
+
+class Runner:
+    """调度各阶段：上游都已结束的阶段提交到线程池，每个阶段在独立子进程中运行。"""
+
+    def __init__(self, stages, state_path, forced, jobs):
+        self.stages = topological_order(stages)
+        self.by_name = {stage.name: stage for stage in self.stages}
+        self.state_path = state_path
+        self.state = load_state(state_path)
+        self.forced = forced
+        self.jobs = jobs
+        self.lock = threading.Lock()
+        self.results = {}
+
+    def run_stage(self, stage):
+        action, reason, hashes = decide(stage, self.state, stage.name in self.forced)
+        if action != "run":
+            return action, reason, 0.0
+        start = time.perf_counter()
+        env = dict(os.environ, PYTHONIOENCODING="utf-8")
+        proc = subprocess.run(stage.command(), cwd=ROOT, env=env, stdin=subprocess.DEVNULL,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8")
+        seconds = time.perf_counter() - start
+        with self.lock:
+            print(f"──── {stage.name}（{reason}）────")
+            print(proc.stdout.rstrip())
+            if proc.returncode != 0:
+                return "failed", f"退出码 {proc.returncode}", seconds
+            self.state[stage.name] = {
+                "inputs": hashes,
+                "finishedAt": datetime.now().isoformat(timespec="seconds"),
+                "seconds": round(seconds, 2),
+            }
+            for name in stage.refreshes:
+                if name in self.state and name in self.by_name:
+                    self.state[name]["inputs"] = input_hashes(self.by_name[name])[0]
+            save_state(self.state_path, self.state)
+        return "ran", reason, seconds
+
+    def run(self):
+        pending = list(self.stages)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                for stage in list(pending):
+                    statuses = [self.results.get(dep, (None,))[0] for dep in stage.after]
+                    if any(s in ("failed", "blocked") for s in statuses):
+                        self.results[stage.name] = ("blocked", "上游失败", 0.0)
+                        pending.remove(stage)
+                    elif all(s is not None for s in statuses):
+                        running[pool.submit(self.run_stage, stage)] = stage
+                        pending.remove(stage)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        self.results[stage.name] = future.result()
+                    except Exception as e:
+                        self.results[stage.name] = ("failed", str(e), 0.0)
+        return self.results
+
+    def print_summary(self):
+        icons = {"ran": "✅", "skip": "⏭️ ", "missing": "⚠️ ", "failed": "❌", "blocked": "⛔"}
+        print()
+        print("=" * 60)
+        print("流水线结果")
+        print("=" * 60)
+        for stage in self.stages:
+            status, reason, seconds = self.results[stage.name]
+            timing = f"，{seconds:.1f}s" if status in ("ran", "failed") else ""
+            print(f"{icons[status]} {stage.name}: {reason}{timing}")
+
+
+def select(stages, only):
+    """--only 时只保留指定阶段，依赖指向未选中阶段的视为已满足。"""
+    if not only:
+        return stages
+    unknown = set(only) - {stage.name for stage in stages}
+    if unknown:
+        raise SystemExit(f"❌ 未知阶段: {'、'.join(sorted(unknown))}")
+    return [Stage(s.name, s.script, s.inputs, s.outputs, [d for d in s.after if d in only], s.args, s.refreshes)
+            for s in stages if s.name in only]
+
+
+def main(argv=None):
+    names = [stage.name for stage in STAGES]
+    parser = argparse.ArgumentParser(description="按依赖关系运行数据流水线，输入未变化的阶段跳过")
+    parser.add_argument("--yes", action="store_true", help="不询问，直接运行（合并脚本一律以 --yes 运行）")
+    parser.add_argument("--dry-run", action="store_true", help="只列出各阶段将运行还是跳过，不执行")
+    parser.add_argument("--only", nargs="+", metavar="STAGE", choices=names, help="只运行这些阶段")
+    parser.add_argument("--force", nargs="*", metavar="STAGE", choices=names,
+                        help="忽略记录的输入哈希强制运行；不带阶段名时全部强制")
+    parser.add_argument("--jobs", type=int, default=4, help="最多同时运行的阶段数（默认 4）")
+    parser.add_argument("--state", type=Path, default=STATE_PATH, help=f"状态文件（默认 {STATE_PATH.relative_to(ROOT)}）")
+    args = parser.parse_args(argv)
+
+    stages = select(STAGES, args.only)
+    forced = set(names if args.force == [] else args.force or [])
+    state = load_state(args.state)
+
+    print("📊 流水线计划")
+    actions = plan(stages, state, forced)
+    if args.dry_run:
+        return 0
+    if not any(action in ("run", "maybe") for action in actions.values()):
+        print("\n✅ 所有阶段的输入都未变化，无需运行")
+        return 0
+    if not args.yes:
+        try:
+            confirm = input("\n确认运行？(y/n): ").strip().lower()
+        except EOFError:
+            confirm = ""
+        if confirm != "y":
+            print("❌ 已取消")
+            return 1
+    print()
+
+    runner = Runner(stages, args.state, forced, max(1, args.jobs))
+    results = runner.run()
+    runner.print_summary()
+    return 1 if any(status in ("failed", "blocked") for status, _, _ in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
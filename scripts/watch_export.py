@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监视 学部学校一览表.xlsx，保存后自动增量导出（常驻进程）
+
+- 进程常驻：pandas 与各导出模块只导入一次
+- 变化检测：优先用 inotify（需 pip install inotify_simple，仅 Linux），否则按 --interval 轮询文件大小与修改时间
+- 防抖：收到变化后等待 --debounce 秒内不再有新的变化才导出，Excel 连续保存/先写临时文件再改名只触发一次
+- 内容哈希与上次相同（只改了 mtime）时不重新解析
+- 导出固定使用 --incremental：数据未变化时不写文件，变化时生成增量补丁；其余参数原样传给 export_school_data.py
+- 每轮输出各阶段耗时（哈希、解析、规范化、拼接 JSON、增量、写文件及各附加产物）
+- 已建 SQLite 主库（scripts/master_store.py）时先把修改逐行导入主库再导出；主库有 Excel 之外的新变更时不导入，
+  提示先运行 master_store.py export-excel
+
+用法：
+    python3 scripts/watch_export.py                               # 监视并导出 JSON/CSV
+    python3 scripts/watch_export.py --columnar --facets           # 附加产物参数同 export_school_data.py
+    python3 scripts/watch_export.py --poll --interval 2           # 强制轮询
+按 Ctrl+C 退出。
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+import export_school_data  # noqa: E402
+from edit_log import EditLog  # noqa: E402
+from master_store import MASTER_DB, MasterStore  # noqa: E402
+from workbook_cache import file_hash, read_sheet  # noqa: E402
+
+# 可选依赖
+try:
+    import inotify_simple
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+
+SHEET_NAME = "学校总览"
+
+
+class PollingWatcher:
+    """按固定间隔比较文件大小与修改时间。"""
+
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self.signature = self._signature()
+
+    def _signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def wait(self, timeout=None):
+        """阻塞到文件变化（返回 True）或超时（返回 False）。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            signature = self._signature()
+            if signature != self.signature:
+                self.signature = signature
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.monotonic())))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """监视所在目录：Excel / WPS 保存时常先写临时文件再改名覆盖，直接监视文件会丢失事件。"""
+
+    def __init__(self, path):
+        self.name = path.name
+        self.inotify = inotify_simple.INotify()
+        flags = inotify_simple.flags
+        self.inotify.add_watch(str(path.parent), flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.DELETE)
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            events = self.inotify.read(timeout=None if remaining is None else int(remaining * 1000))
+            if any(e.name == self.name for e in events):
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def close(self):
+        self.inotify.close()
+
+
+def make_watcher(path, poll=False, interval=1.0):
+    if INOTIFY_AVAILABLE and not poll:
+        try:
+            return InotifyWatcher(path), "inotify"
+        except OSError as e:
+            print(f"⚠️  inotify 不可用（{e}），改为轮询")
+    return PollingWatcher(path, interval), f"轮询（每 {interval:g} 秒）"
+
+
+def format_timings(timings):
+    return "，".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items())
+
+
+class ExportLoop:
+    """记住上一次成功导出的工作簿内容哈希，内容未变化时不重新解析。"""
+
+    def __init__(self, path, export_args):
+        self.path = path
+        self.export_args = export_args
+        self.digest = None
+
+    def run_cycle(self):
+        timings = {}
+        start = time.perf_counter()
+        stamp = datetime.now().strftime("%H:%M:%S")
+        if not self.path.exists():
+            print(f"[{stamp}] ⚠️  未找到 {self.path.name}，等待文件出现")
+            return
+        with export_school_data.timed_stage(timings, "hash"):
+            digest = file_hash(self.path)
+        if digest == self.digest:
+            print(f"[{stamp}] 工作簿内容未变化，跳过")
+            return
+        print(f"[{stamp}] 📖 检测到 {self.path.name} 变化，开始导出")
+        try:
+            with export_school_data.timed_stage(timings, "parse"):
+                # 未建主库时重放尚未写回的编辑日志（scripts/edit_log.py），导出不漏掉合并结果
+                df = read_sheet(self.path, SHEET_NAME) if MASTER_DB.exists() else EditLog(self.path, SHEET_NAME).read()
+            if MASTER_DB.exists():
+                with export_school_data.timed_stage(timings, "import"), MasterStore(MASTER_DB) as store:
+                    store.import_excel(self.path, source="watch_export")
+            written = export_school_data.export(df, self.export_args, timings)
+        except Exception as e:
+            # 文件仍在写入或表结构有误时不退出，等待下一次保存
+            print(f"[{stamp}] ❌ 导出失败: {e}")
+            return
+        self.digest = digest
+        total = time.perf_counter() - start
+        status = "✅ 已导出" if written else "✅ 数据未变化"
+        print(f"[{stamp}] {status}，共 {total:.2f}s（{format_timings(timings)}）")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="监视 学部学校一览表.xlsx，保存后自动增量导出；未识别的参数传给 export_school_data.py")
+    parser.add_argument("--debounce", type=float, default=1.5, help="最后一次变化后等待的秒数（默认 1.5）")
+    parser.add_argument("--interval", type=float, default=1.0, help="轮询间隔秒数（默认 1.0）")
+    parser.add_argument("--poll", action="store_true", help="不使用 inotify，强制轮询")
+    parser.add_argument("--excel", type=Path, default=export_school_data.EXCEL_PATH)
+    args, rest = parser.parse_known_args()
+    export_args = export_school_data.build_parser().parse_args(["--incremental", *rest])
+
+    loop = ExportLoop(args.excel, export_args)
+    watcher, mode = make_watcher(args.excel, args.poll, args.interval)
+    print(f"👀 监视 {args.excel}（{mode}，防抖 {args.debounce:g} 秒），按 Ctrl+C 退出")
+    if not INOTIFY_AVAILABLE and not args.poll:
+        print("   安装 inotify_simple 可即时响应：pip install inotify_simple")
+    try:
+        loop.run_cycle()
+        while True:
+            watcher.wait()
+            # 防抖：直到连续 debounce 秒没有新的变化
+            while watcher.wait(timeout=args.debounce):
+                pass
+            loop.run_cycle()
+    except KeyboardInterrupt:
+        print("\n已停止监视")
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main()
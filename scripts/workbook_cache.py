@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工作表解析缓存：按「工作簿内容哈希 + 表名」缓存 pd.read_excel 的结果
+
+openpyxl 解析 学部学校一览表.xlsx 是导出、合并、审核表各脚本中最慢的一步。
+首次读取后把 DataFrame 以 pickle 保存在 .cache/workbooks/ 下，之后只要工作簿内容不变，
+各脚本都直接从缓存加载（毫秒级）；工作簿一旦被修改，哈希变化，自动重新解析。
+
+选用 pickle 而非 Parquet/Feather：学校总览 中大量列混有文本与数字（object 列），
+pickle 能原样保留每个单元格的类型，导出结果与直接 read_excel 完全一致。
+
+用法（替代 pd.read_excel）：
+    from workbook_cache import read_sheet
+    df = read_sheet(EXCEL_PATH, "学校总览")
+
+    python3 scripts/workbook_cache.py --clear     # 清空缓存
+"""
+import argparse
+import hashlib
+import os
+from pathlib import Path
+
+import pandas as pd
+
+CACHE_DIR = Path(__file__).parent.parent / ".cache" / "workbooks"
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_prefix(path, sheet_name, kwargs):
+    """同一工作簿同一张表（同样的读取参数）的缓存文件共用前缀，便于替换旧版本。"""
+    spec = repr((Path(path).name, sheet_name, sorted(kwargs.items()), pd.__version__))
+    return Path(path).stem + "-" + hashlib.sha1(spec.encode("utf-8")).hexdigest()[:12]
+
+
+def read_sheet(path, sheet_name, **kwargs):
+    """与 pd.read_excel(path, sheet_name=sheet_name, **kwargs) 等价，命中缓存时不解析 xlsx。"""
+    path = Path(path)
+    prefix = _cache_prefix(path, sheet_name, kwargs)
+    cache_path = CACHE_DIR / f"{prefix}-{file_hash(path)[:16]}.pkl"
+    if cache_path.exists():
+        try:
+            return pd.read_pickle(cache_path)
+        except Exception:
+            cache_path.unlink(missing_ok=True)  # 缓存损坏时重新解析
+
+    df = pd.read_excel(path, sheet_name=sheet_name, **kwargs)
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    for stale in CACHE_DIR.glob(f"{prefix}-*.pkl"):
+        stale.unlink(missing_ok=True)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, cache_path)
+    return df
+
+
+def clear():
+    removed = 0
+    if CACHE_DIR.exists():
+        for p in CACHE_DIR.glob("*.pkl"):
+            p.unlink()
+            removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="工作表解析缓存")
+    parser.add_argument("--clear", action="store_true", help="清空缓存")
+    args = parser.parse_args()
+    if args.clear:
+        print(f"已清除 {clear()} 个缓存文件（{CACHE_DIR}）")
+    else:
+        parser.print_help()
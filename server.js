@@ -1,6 +1,7 @@
 require('dotenv').config();
 const path = require('path');
 const fs = require('fs');
+const crypto = require('crypto');
 const express = require('express');
 const cors = require('cors');
 
@@ -47,6 +48,34 @@ function getSchoolMasterPath() {
   console.warn('[school-master] 未找到数据文件：请确保存在 school-master.json 或 学校总览.json（可运行 python3 export_school_data.py 生成）');
   return null;
 }
+// 预压缩副本与 ETag 清单（由 python3 export_school_data.py --compress 生成）
+// 存在且与数据文件一致时，直接返回 .br/.gz/原始字节，不在请求时解析、序列化或压缩
+const schoolMasterManifestPath = path.join(__dirname, 'school-master.manifest.json');
+let schoolMasterPrecompressed = null;
+function loadPrecompressedSchoolMaster(p) {
+  if (!fs.existsSync(schoolMasterManifestPath)) return null;
+  const cacheKey = [p, fs.statSync(schoolMasterManifestPath).mtimeMs, fs.statSync(p).mtimeMs].join('|');
+  if (schoolMasterPrecompressed && schoolMasterPrecompressed.cacheKey === cacheKey) {
+    return schoolMasterPrecompressed.variants ? schoolMasterPrecompressed : null;
+  }
+  schoolMasterPrecompressed = { cacheKey };
+  const manifest = JSON.parse(fs.readFileSync(schoolMasterManifestPath, 'utf8'));
+  const entry = manifest.files && manifest.files[path.basename(p)];
+  if (!entry) return null;
+  const body = fs.readFileSync(p);
+  // 导出后未重新生成副本时清单已过期，回退到普通读取
+  if (crypto.createHash('sha256').update(body).digest('hex') !== entry.sha256) {
+    console.warn('[school-master] 预压缩清单与数据文件不一致，请重新运行 python3 export_school_data.py --compress');
+    return null;
+  }
+  const variants = { identity: { body, etag: entry.etag } };
+  for (const [encoding, info] of Object.entries(entry.encodings || {})) {
+    const file = path.join(__dirname, info.file);
+    if (fs.existsSync(file)) variants[encoding] = { body: fs.readFileSync(file), etag: info.etag };
+  }
+  Object.assign(schoolMasterPrecompressed, { entry, variants });
+  return schoolMasterPrecompressed;
+}
 app.get('/api/school-master', (req, res) => {
   console.log('[school-master] GET /api/school-master 被请求');
   const p = getSchoolMasterPath();
@@ -54,6 +83,19 @@ app.get('/api/school-master', (req, res) => {
     return res.status(404).json({ message: '学校总览数据未就绪' });
   }
   try {
+    const pre = loadPrecompressedSchoolMaster(p);
+    if (pre) {
+      const encoding = req.acceptsEncodings(['br', 'gzip', 'identity'].filter((e) => pre.variants[e])) || 'identity';
+      const variant = pre.variants[encoding];
+      res.set('Vary', 'Accept-Encoding');
+      res.set('Cache-Control', 'no-cache');
+      res.set('ETag', variant.etag);
+      res.set('Content-Type', pre.entry.contentType);
+      if (encoding !== 'identity') res.set('Content-Encoding', encoding);
+      console.log('[school-master] 返回', pre.entry.records, '条（' + encoding + '）');
+      // res.send 会按 If-None-Match 与 ETag 判断新鲜度，命中时返回 304
+      return res.send(variant.body);
+    }
     const raw = fs.readFileSync(p, 'utf8');
     const data = JSON.parse(raw);
     const count = (data && data.data && data.data.length) || 0;
@@ -65,6 +107,74 @@ app.get('/api/school-master', (req, res) => {
   }
 });
 
+// 学校总览增量补丁（由 python3 export_school_data.py --incremental 生成于 school-master-deltas/）
+// 客户端持有版本 since 时，只需获取 since → 当前版本 之间的新增/修改/删除记录
+const schoolMasterDeltaDir = path.join(__dirname, 'school-master-deltas');
+function readSchoolMasterDeltaIndex() {
+  const p = path.join(schoolMasterDeltaDir, 'index.json');
+  if (!fs.existsSync(p)) return null;
+  return JSON.parse(fs.readFileSync(p, 'utf8'));
+}
+app.get('/api/school-master/version', (req, res) => {
+  try {
+    const index = readSchoolMasterDeltaIndex();
+    if (!index) return res.status(404).json({ message: '增量清单未生成' });
+    res.json({ version: index.version, hash: index.hash, count: index.count, generatedAt: index.generatedAt });
+  } catch (err) {
+    console.error('school-master version read error:', err);
+    res.status(500).json({ message: '读取失败' });
+  }
+});
+app.get('/api/school-master/delta', (req, res) => {
+  const since = parseInt(req.query.since, 10);
+  if (!Number.isInteger(since)) {
+    return res.status(400).json({ message: '缺少 since 版本号' });
+  }
+  try {
+    const index = readSchoolMasterDeltaIndex();
+    if (!index) return res.status(404).json({ message: '增量清单未生成' });
+    // 按版本顺序串起 since → 当前版本 的补丁链，链条不完整时让客户端重新获取全量
+    const chain = [];
+    let v = since;
+    while (v < index.version) {
+      const step = index.deltas.find((d) => d.from === v);
+      if (!step) break;
+      chain.push(step);
+      v = step.to;
+    }
+    if (v !== index.version) {
+      return res.status(409).json({ message: '版本过旧，请重新获取全量数据', full: true, version: index.version });
+    }
+    // 合并多个补丁：同一记录只保留最终状态
+    const changes = new Map();
+    for (const step of chain) {
+      const delta = JSON.parse(fs.readFileSync(path.join(schoolMasterDeltaDir, step.file), 'utf8'));
+      for (const key of delta.removed) {
+        const prev = changes.get(key);
+        if (prev && prev.op === 'added') changes.delete(key);
+        else changes.set(key, { op: 'removed' });
+      }
+      for (const item of delta.modified) {
+        const prev = changes.get(item.key);
+        changes.set(item.key, { op: prev && prev.op === 'added' ? 'added' : 'modified', record: item.record });
+      }
+      for (const item of delta.added) {
+        const prev = changes.get(item.key);
+        changes.set(item.key, { op: prev && prev.op === 'removed' ? 'modified' : 'added', record: item.record });
+      }
+    }
+    const result = { fromVersion: since, toVersion: index.version, hash: index.hash, added: [], modified: [], removed: [] };
+    for (const [key, change] of changes) {
+      if (change.op === 'removed') result.removed.push(key);
+      else result[change.op].push({ key, record: change.record });
+    }
+    res.json(result);
+  } catch (err) {
+    console.error('school-master delta read error:', err);
+    res.status(500).json({ message: '读取失败' });
+  }
+});
+
 // 首页：优先显式返回，避免部署后 404
 app.get('/', (req, res) => {
   res.sendFile(path.join(__dirname, 'index.html'));